@@ -0,0 +1,2 @@
+from airsystem.engine import evaluate
+from airsystem.project import load_project, normalize_project, parse_project, read_project
@@ -0,0 +1,58 @@
+import sys
+import json
+import argparse
+
+from airsystem.engine import evaluate
+from airsystem.project import load_project
+
+
+COLUMNS = (
+    ('floor', 'Этаж', '{:d}'),
+    ('flow', 'L, м³/ч', '{:.0f}'),
+    ('height', 'h, м', '{:.2f}'),
+    ('velocity', 'v, м/с', '{:.2f}'),
+    ('full_pressure', 'ΣΔP, Па', '{:.3f}'),
+    ('available_pressure', 'Pрасп, Па', '{:.3f}'),
+)
+
+
+def fmt(value, spec) -> str:
+    return '' if value is None else spec.format(value)
+
+
+def print_table(result, file=sys.stdout) -> None:
+    rows = [[title for _, title, _ in COLUMNS] + ['Тяга']]
+    for floor in result['floors']:
+        draft = {True: 'да', False: 'нет', None: ''}[floor['draft']]
+        rows.append([fmt(floor[key], spec) for key, _, spec in COLUMNS] + [draft])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print('  '.join(cell.rjust(width) for cell, width in zip(row, widths)), file=file)
+    if result['cap_pressure'] is not None:
+        print(f'Потери в зонте: {result["cap_pressure"]:.3f} Па', file=file)
+    if result['deflector'] is not None and result['deflector']['pressure'] is not None:
+        print(f'Давление дефлектора: {result["deflector"]["pressure"]:.3f} Па', file=file)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m airsystem', description='Расчёт проекта (*.json)')
+    parser.add_argument('project')
+    parser.add_argument('--json', action='store_true', help='вывести полный результат в JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        result = evaluate(load_project(args.project))
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f'Не удалось рассчитать {args.project}: {type(e).__name__}: {e}', file=sys.stderr)
+        return 1
+
+    if args.json:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print_table(result)
+    return 0 if all(floor['draft'] is not False for floor in result['floors']) else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
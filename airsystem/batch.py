@@ -0,0 +1,263 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from airsystem.engine import evaluate
+from airsystem.project import load_project
+
+
+def find_projects(directory) -> object:
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith('.json'):
+                yield os.path.join(root, name)
+
+
+def evaluate_file(path) -> dict:
+    try:
+        result = evaluate(load_project(path))
+    except Exception as e:
+        return {'file': path, 'error': f'{type(e).__name__}: {e}'}
+    floors = [
+        {
+            'floor': floor['floor'],
+            'full_pressure': floor['full_pressure'],
+            'available_pressure': floor['available_pressure'],
+            'draft': floor['draft'],
+        }
+        for floor in result['floors']
+    ]
+    return {'file': path, 'floors': floors}
+
+
+def evaluate_files(paths) -> list:
+    return [evaluate_file(path) for path in paths]
+
+
+def chunked(paths, size) -> object:
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(paths, jobs=None, chunk_size=16, worker=evaluate_files) -> object:
+    # a bounded number of chunks is in flight, results are yielded as they complete
+    jobs = jobs or os.cpu_count() or 1
+    window = jobs * 4
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = set()
+        for chunk in chunked(paths, chunk_size):
+            pending.add(executor.submit(worker, chunk))
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        for future in wait(pending).done:
+            yield from future.result()
+
+
+# a resumable job: plan.json (the project files split into chunks, fixed at creation),
+# chunk-NNNNN.jsonl (the records of one chunk, written whole by rename, so rerunning a chunk is harmless)
+# and manifest.jsonl (one line per finished chunk with the checksum of its output)
+PLAN_FILE = 'plan.json'
+MANIFEST_FILE = 'manifest.jsonl'
+JOB_CHUNK_SIZE = 64
+
+
+def chunk_name(index) -> str:
+    return f'chunk-{index:05d}.jsonl'
+
+
+def write_file(path, data) -> None:
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def file_digest(path) -> object:
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def evaluate_chunk(task) -> dict:
+    job_dir, index, paths = task
+    records = evaluate_files(paths)
+    data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode('utf-8')
+    write_file(os.path.join(job_dir, chunk_name(index)), data)
+    return {
+        'chunk': index,
+        'records': len(records),
+        'errors': sum('error' in record for record in records),
+        'sha256': hashlib.sha256(data).hexdigest(),
+    }
+
+
+def evaluate_chunks(tasks) -> list:
+    return [evaluate_chunk(task) for task in tasks]
+
+
+class Job:
+    def __init__(self, job_dir) -> None:
+        self.job_dir = job_dir
+        with open(os.path.join(job_dir, PLAN_FILE), encoding='utf-8') as file:
+            self.plan = json.load(file)
+        self.chunks = self.plan['chunks']
+        self.finished = self.read_manifest()
+
+
+    @classmethod
+    def create(cls, job_dir, directory, chunk_size=JOB_CHUNK_SIZE) -> object:
+        if os.path.exists(os.path.join(job_dir, PLAN_FILE)):
+            raise FileExistsError(f'{job_dir}: задание уже создано, продолжить: --resume')
+        os.makedirs(job_dir, exist_ok=True)
+        plan = {
+            'directory': os.path.abspath(directory),
+            'chunk_size': chunk_size,
+            'chunks': list(chunked(find_projects(directory), chunk_size)),
+        }
+        write_file(os.path.join(job_dir, PLAN_FILE), json.dumps(plan, ensure_ascii=False).encode('utf-8'))
+        return cls(job_dir)
+
+
+    def read_manifest(self) -> dict:
+        finished = {}
+        try:
+            with open(os.path.join(self.job_dir, MANIFEST_FILE), encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line torn by a crash, its chunk is simply redone
+                        continue
+                    finished[entry['chunk']] = entry
+        except FileNotFoundError:
+            pass
+        return finished
+
+
+    def verify(self) -> list:
+        # finished chunks whose output is missing or differs from the manifest are redone
+        broken = []
+        for name in os.listdir(self.job_dir):
+            if name.startswith('chunk-') and name.endswith('.tmp'):
+                os.remove(os.path.join(self.job_dir, name))
+        for index, entry in list(self.finished.items()):
+            if file_digest(os.path.join(self.job_dir, chunk_name(index))) != entry['sha256']:
+                broken.append(index)
+                del self.finished[index]
+        return broken
+
+
+    def pending(self) -> list:
+        return [index for index in range(len(self.chunks)) if index not in self.finished]
+
+
+    def run(self, jobs=None, progress=None) -> None:
+        tasks = [(self.job_dir, index, self.chunks[index]) for index in self.pending()]
+        with open(os.path.join(self.job_dir, MANIFEST_FILE), 'a', encoding='utf-8') as manifest:
+            for entry in run(tasks, jobs, chunk_size=1, worker=evaluate_chunks):
+                manifest.write(json.dumps(entry) + '\n')
+                manifest.flush()
+                os.fsync(manifest.fileno())
+                self.finished[entry['chunk']] = entry
+                if progress is not None:
+                    progress(len(self.finished), len(self.chunks))
+
+
+    def records(self) -> object:
+        for index in range(len(self.chunks)):
+            with open(os.path.join(self.job_dir, chunk_name(index)), encoding='utf-8') as file:
+                for line in file:
+                    yield json.loads(line)
+
+
+def run_job(args) -> object:
+    if args.resume:
+        job = Job(args.job)
+        broken = job.verify()
+        print(
+            f'Готово частей: {len(job.finished)} из {len(job.chunks)}, повреждённых: {len(broken)}',
+            file=sys.stderr,
+        )
+    else:
+        try:
+            job = Job.create(args.job, args.directory, args.chunk)
+        except FileExistsError as e:
+            raise SystemExit(str(e))
+
+    def progress(done, total):
+        print(f'\r{done}/{total}', end='', file=sys.stderr, flush=True)
+
+    job.run(args.jobs, progress)
+    print(file=sys.stderr)
+    return job.records()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m airsystem.batch',
+        description='Пересчёт всех проектов (*.json) в каталоге',
+    )
+    parser.add_argument('directory', nargs='?')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='число процессов')
+    parser.add_argument('-o', '--output', default=None, help='файл JSON Lines (по умолчанию stdout)')
+    parser.add_argument('--job', default=None, help='каталог задания: расчёт по частям с возможностью продолжить')
+    parser.add_argument('--resume', action='store_true', help='продолжить задание --job, готовые части проверяются')
+    parser.add_argument('--chunk', type=int, default=JOB_CHUNK_SIZE, help='проектов в одной части задания')
+    args = parser.parse_args(argv)
+    if args.resume and not args.job:
+        parser.error('--resume требует --job')
+    if not args.resume and args.directory is None:
+        parser.error('не указан каталог проектов')
+
+    records = run_job(args) if args.job else run(find_projects(args.directory), args.jobs)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    projects = errors = floors = no_draft = no_draft_projects = 0
+    try:
+        for record in records:
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            output.flush()
+            projects += 1
+            if 'error' in record:
+                errors += 1
+                continue
+            failed = sum(floor['draft'] is False for floor in record['floors'])
+            floors += len(record['floors'])
+            no_draft += failed
+            no_draft_projects += bool(failed)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(
+        f'Проектов: {projects}, ошибок: {errors}, этажей: {floors}, '
+        f'этажей без тяги: {no_draft} (в {no_draft_projects} проектах)',
+        file=sys.stderr,
+    )
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
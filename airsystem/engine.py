@@ -0,0 +1,452 @@
+import math
+from bisect import bisect_left
+from functools import lru_cache
+
+from airsystem import reference
+
+
+# every value is rounded the way the GUI shows it, and the next formula takes the rounded one,
+# so a project evaluated here matches the table cell by cell
+
+CACHE_SIZE = 16_384
+
+
+def key_value(value) -> object:
+    # 300, 300.0 and -0.0 share an entry; inputs are not rounded, a rounded flow like
+    # 67.3 * 5 = 336.49999999999994 -> 336.5 would change the rounded velocity
+    return None if value is None else float(value) + 0.0
+
+
+def np_round(value, digits) -> float:
+    # numpy.around semantics, used by the GUI for interpolated values
+    scale = 10 ** digits
+    return round(value * scale) / scale
+
+
+def density(temperature) -> float:
+    return 353 / (273.15 + temperature)
+
+
+def air_velocity(flow, a, b) -> object:
+    if flow is None or a is None:
+        return None
+    try:
+        if b is not None:
+            velocity = flow / (3_600 * ((a * b / 1_000_000)))
+        else:
+            velocity = flow / (3_600 * (3.1415 * (a / 1_000) * (a / 1_000) / 4))
+    except ZeroDivisionError:
+        return None
+    return round(velocity, 2)
+
+
+def equivalent_diameter(a, b) -> object:
+    if a is None:
+        return None
+    try:
+        if b is not None:
+            return round(2 * a * b / (a + b) / 1_000, 3)
+        return round(a / 1_000, 3)
+    except ZeroDivisionError:
+        return None
+
+
+def dynamic_pressure(velocity, temperature) -> object:
+    if velocity is None or temperature is None:
+        return None
+    return round(velocity * velocity * density(temperature) / 2, 3)
+
+
+def specific_pressure_loss(velocity, diameter, dynamic, temperature, surface) -> object:
+    if None in (velocity, diameter, dynamic, temperature, surface):
+        return None
+    try:
+        mu = 1.458 * pow(10, -6) * pow((273.15 + temperature), 1.5) / ((273.15 + temperature) + 110.4)
+        v = mu / density(temperature)
+        re = velocity * diameter / v
+        lam = 0.11 * pow(((surface / 1_000) / diameter + 68 / re), 0.25)
+        return round((lam / diameter) * dynamic, 4)
+    except ZeroDivisionError:
+        return None
+
+
+def _grid_cell(grid, value) -> tuple:
+    i = min(max(bisect_left(grid, value) - 1, 0), len(grid) - 2)
+    return i, (value - grid[i]) / (grid[i + 1] - grid[i])
+
+
+def interpolate_m(b, a) -> float:
+    # bilinear over (M.Y, M.X), the same weights as scipy's RegularGridInterpolator
+    table = reference.REFERENCE_DATA.M.TABLE
+    i, ty = _grid_cell(reference.REFERENCE_DATA.M.Y, b)
+    j, tx = _grid_cell(reference.REFERENCE_DATA.M.X, a)
+    return (
+        table[i][j] * (1 - ty) * (1 - tx)
+        + table[i][j + 1] * (1 - ty) * tx
+        + table[i + 1][j] * ty * (1 - tx)
+        + table[i + 1][j + 1] * ty * tx
+    )
+
+
+def m_coefficient(a, b) -> object:
+    return _m_coefficient(None if a is None else int(a), None if b is None else int(b))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _m_coefficient(a, b) -> object:
+    if a is not None and b is not None and 100 <= a <= 1_500 and 100 <= b <= 1_500:
+        return np_round(interpolate_m(b, a), 3)
+    if a is not None and 100 <= a <= 1_500:
+        return np_round(interpolate_m(a, a), 3)
+    return None
+
+
+def linear_pressure_loss(length, r, m) -> object:
+    if None in (length, r, m):
+        return None
+    return round(length * r * m, 4)
+
+
+def segment(flow, a, b, length, temperature, surface) -> dict:
+    # a copy, the caller is free to change it
+    return dict(_segment(*map(key_value, (flow, a, b, length, temperature, surface))))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _segment(flow, a, b, length, temperature, surface) -> dict:
+    velocity = air_velocity(flow, a, b)
+    diameter = equivalent_diameter(a, b)
+    dynamic = dynamic_pressure(velocity, temperature)
+    r = specific_pressure_loss(velocity, diameter, dynamic, temperature, surface)
+    m = m_coefficient(a, b)
+    return {
+        'velocity': velocity,
+        'diameter': diameter,
+        'specific_pressure_loss': r,
+        'm': m,
+        'linear_pressure_loss': linear_pressure_loss(length, r, m),
+        'dynamic': dynamic,
+    }
+
+
+def klapan_pressure_loss(klapan_flow, klapan_capacity) -> object:
+    if not klapan_flow or not klapan_capacity:
+        return None
+    return round(10 * pow(klapan_flow / klapan_capacity, 2), 3)
+
+
+def sputnik(project) -> dict:
+    sides = [
+        tuple(key_value(project[side][key]) for key in ('flow', 'a', 'b', 'length', 'kms'))
+        for side in ('one_side', 'two_side')
+    ]
+    result = _sputnik(
+        *map(key_value, (project['temperature'], project['surface'], project['klapan_flow'], project['klapan_capacity'])),
+        project['sides'],
+        *sides,
+    )
+    return {key: dict(value) if isinstance(value, dict) else value for key, value in result.items()}
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _sputnik(t, surface, klapan_flow, klapan_capacity, sides, one_side, two_side) -> dict:
+    klapan = klapan_pressure_loss(klapan_flow, klapan_capacity)
+    result = {'klapan_pressure_loss': klapan}
+    for side, (flow, a, b, length, kms_value) in (('one_side', one_side), ('two_side', two_side)):
+        values = segment(flow, a, b, length, t, surface)
+        dynamic = values['dynamic']
+        local = round(dynamic * kms_value, 3) if None not in (dynamic, kms_value) else None
+        linear = values['linear_pressure_loss']
+        full = round(linear + local, 3) if None not in (linear, local) else None
+        values.update({
+            'local_pressure_loss': local,
+            'full_pressure_loss': full,
+            'result_pressure': round(klapan + full, 3) if None not in (klapan, full) else None,
+        })
+        result[side] = values
+
+    one, two = result['one_side']['result_pressure'], result['two_side']['result_pressure']
+    if sides == 1:
+        result['pressure'] = one
+    else:
+        result['pressure'] = max(one, two) if None not in (one, two) else None
+    return result
+
+
+def shaft_flows(project) -> list:
+    one_flow, two_flow = project['one_side']['flow'], project['two_side']['flow']
+    n_rows = len(project['rows'])
+    if project['sides'] == 1 and one_flow is not None:
+        flow, top_flow = one_flow, one_flow
+    elif project['sides'] == 2 and None not in (one_flow, two_flow):
+        flow, top_flow = one_flow + two_flow, max(one_flow, two_flow)
+    else:
+        return [None] * n_rows
+    return [top_flow] + [flow * (n_rows - i) for i in range(1, n_rows)]
+
+
+def heights(project) -> list:
+    rows = project['rows']
+    result = [None] * len(rows)
+    if project['shaft_height'] is None or project['floor_height'] is None:
+        return result
+    result[-1] = round(project['shaft_height'], 2)
+    for i in range(len(rows) - 2, -1, -1):
+        floor_height, previous = rows[i + 1]['floor_height'], result[i + 1]
+        if floor_height is not None and previous is not None and previous - floor_height >= 0:
+            result[i] = round(previous - floor_height, 2)
+    return result
+
+
+def gravi_pressure(height, temperature) -> object:
+    if height is None or temperature is None:
+        return None
+    g = reference.ACCELERATION_OF_GRAVITY
+    return round(g * height * ((353 / (273 + 5)) - (353 / (273 + temperature))), 3)
+
+
+def available_pressure(gravi, deflector) -> object:
+    if gravi is None:
+        return None
+    if deflector is not None:
+        return round(0.9 * gravi + deflector, 3)
+    return round(0.9 * gravi, 3)
+
+
+def kms(sputnik_flow, sputnik_a, sputnik_b, flows, rows) -> tuple:
+    n_rows = len(rows)
+    pass_kms, branch_kms = [None] * n_rows, [None] * n_rows
+    if None in (sputnik_flow, sputnik_a):
+        return pass_kms, branch_kms
+    sputnik_b = sputnik_a if sputnik_b is None else sputnik_b
+    for i in range(n_rows - 1, 0, -1):
+        pass_flow, branch_flow = flows[i - 1], flows[i]
+        main_a, main_b = rows[i]['a'], rows[i]['b']
+        main_b = main_a if main_b is None else main_b
+        if None in (pass_flow, branch_flow, main_a):
+            continue
+        Fk = (int(main_a) / 1_000) * (int(main_b) / 1_000)
+        Fs = (int(sputnik_a) / 1_000) * (int(sputnik_b) / 1_000)
+        pass_relation = sputnik_flow / pass_flow
+        branch_relation = sputnik_flow / branch_flow
+        try:
+            kms_1 = (1.55 * pass_relation - pow(pass_relation, 2))
+            pass_kms[i] = round(kms_1 / (pow(1 - pass_relation, 2) * pow(Fk / Fk, 2)), 3)
+        except ZeroDivisionError:
+            pass_kms[i] = 0.0
+        try:
+            if (Fs / Fk <= 0.35) and (branch_relation <= 1):
+                A = 1
+            elif branch_relation <= 0.4:
+                A = 0.9 * (1 - branch_relation)
+            else:
+                A = 0.55
+            kms_2 = A * (1 + pow(branch_relation * (Fk / Fs), 2) - 2 * pow(1 - branch_relation, 2))
+            value = kms_2 / pow(branch_relation * (Fk / Fs), 2)
+            branch_kms[i] = 3.7 if i == n_rows - 1 else round(value, 3)
+            branch_kms[0] = 0.0
+        except ZeroDivisionError:
+            pass
+    return pass_kms, branch_kms
+
+
+def local_pressure(kms_value, velocity, temperature) -> object:
+    if None in (kms_value, velocity, temperature):
+        return None
+    return round(kms_value * velocity * velocity * (353 / (273 + temperature)) / 2, 3)
+
+
+def deflector_pressure_relation(velocity_relation) -> object:
+    # linear over DEFLECTOR_PRESSURE_RELATION, the same as scipy's interp1d, None outside the table
+    x_axis = reference.REFERENCE_DATA.DEFLECTOR_PRESSURE_RELATION.X
+    y_axis = reference.REFERENCE_DATA.DEFLECTOR_PRESSURE_RELATION.TABLE
+    if not x_axis[0] <= velocity_relation <= x_axis[-1]:
+        return None
+    hi = min(max(bisect_left(x_axis, velocity_relation), 1), len(x_axis) - 1)
+    slope = (y_axis[hi] - y_axis[hi - 1]) / (x_axis[hi] - x_axis[hi - 1])
+    return np_round(slope * (velocity_relation - x_axis[hi - 1]) + y_axis[hi - 1], 2)
+
+
+def deflector(wind_velocity, flow) -> dict:
+    result = dict.fromkeys((
+        'wind_velocity', 'recommended_velocity', 'flow', 'required_square',
+        'diameter', 'real_velocity', 'velocity_relation', 'pressure_relation', 'pressure',
+    ))
+    result['wind_velocity'], result['flow'] = wind_velocity, flow
+    if wind_velocity is None:
+        return result
+    recommended = round(wind_velocity * 0.3, 2)
+    result['recommended_velocity'] = recommended
+    if flow is None or not recommended:
+        return result
+    square = round(flow / (3_600 * recommended), 3)
+    result['required_square'] = square
+    diameter = next((float(d) for k, d in reference.DEFLECTOR_DIAMETERS.items() if square <= k), None)
+    result['diameter'] = diameter
+    if diameter is None:
+        return result
+    real = round(flow / (3_600 * math.pi * (pow(diameter / 1_000, 2) / 4)), 2)
+    result['real_velocity'] = real
+    if not wind_velocity:
+        return result
+    relation = round(real / wind_velocity, 2)
+    result['velocity_relation'] = relation
+
+    pressure_relation = deflector_pressure_relation(relation)
+    if pressure_relation is None:
+        return result
+    result['pressure_relation'] = pressure_relation
+    result['pressure'] = round(pressure_relation * ((353 / (273.15 + 5)) * pow(wind_velocity, 2) / 2), 3)
+    return result
+
+
+def cap_relation_kms(cap, relation) -> object:
+    # ζ at the actual h/Do: linear between the rows of CAP_RELATIONS, the last row above them, None below them
+    x_axis, y_axis = reference.CAP_RELATION_CURVES[cap]
+    if not relation >= x_axis[0]:
+        return None
+    relation = min(relation, x_axis[-1])
+    hi = min(max(bisect_left(x_axis, relation), 1), len(x_axis) - 1)
+    slope = (y_axis[hi] - y_axis[hi - 1]) / (x_axis[hi] - x_axis[hi - 1])
+    return np_round(slope * (relation - x_axis[hi - 1]) + y_axis[hi - 1], 2)
+
+
+def cap_kms(project, diameter) -> object:
+    # with the cap height h, ζ follows h/Do of the channel; without it, the h/Do chosen from the table
+    cap = project['cap']
+    if cap == reference.CAP_TYPES[1]:
+        return 1
+    if cap not in reference.CAP_TYPES[2:4]:
+        return None
+    if project['cap_h'] is not None:
+        return cap_relation_kms(cap, project['cap_h'] / diameter) if diameter else None
+    return reference.CAP_RELATIONS[cap].get(project['cap_relation']) or None
+
+
+def cap_pressure(project, velocity, diameter) -> object:
+    t = project['temperature']
+    if None in (velocity, diameter, t):
+        return None
+    kms_value = cap_kms(project, diameter)
+    if kms_value is None:
+        return None
+    return round(kms_value * (353 / (273.15 + t)) * pow(velocity, 2) / 2, 3)
+
+
+def evaluate(project) -> dict:
+    t, surface = project['temperature'], project['surface']
+    rows = project['rows']
+    n_rows = len(rows)
+    is_deflector = project['cap'] == reference.CAP_TYPES[-1]
+
+    sputnik_result = sputnik(project)
+    flows = shaft_flows(project)
+    segments = []
+    for i, row in enumerate(rows):
+        # the top floor runs the whole height of its section, the others one floor
+        length = None if i == 0 else row['floor_height']
+        segments.append(segment(flows[i], row['a'], row['b'], length, t, surface))
+    floor_heights = heights(project)
+    if segments:
+        top = segments[0]
+        top['linear_pressure_loss'] = linear_pressure_loss(
+            floor_heights[0], top['specific_pressure_loss'], top['m']
+        )
+
+    one_side, two_side = project['one_side'], project['two_side']
+    if project['sides'] == 1:
+        sputnik_flow = one_side['flow']
+        sputnik_velocity = sputnik_result['one_side']['velocity']
+    else:
+        sputnik_flow = max(one_side['flow'], two_side['flow']) if None not in (one_side['flow'], two_side['flow']) else None
+        v1, v2 = sputnik_result['one_side']['velocity'], sputnik_result['two_side']['velocity']
+        sputnik_velocity = max(v1, v2) if None not in (v1, v2) else v1
+    pass_kms, branch_kms = kms(sputnik_flow, one_side['a'], one_side['b'], flows, rows)
+    if n_rows:
+        pass_kms[0] = rows[0]['pass_kms']
+
+    deflector_result = None
+    deflector_pressure = None
+    if is_deflector:
+        flow = flows[0] * n_rows if flows and flows[0] is not None else None
+        deflector_result = deflector(project['wind_velocity'], flow)
+        deflector_pressure = deflector_result['pressure']
+
+    cap = None
+    if not is_deflector and n_rows > 1:
+        cap = cap_pressure(project, segments[1]['velocity'], segments[1]['diameter'])
+    cap_value = cap if cap is not None else 0
+
+    floors = []
+    for i, row in enumerate(rows):
+        gravi = gravi_pressure(floor_heights[i], t)
+        values = segments[i]
+        floors.append({
+            'floor': n_rows - i,
+            'floor_height': row['floor_height'],
+            'flow': flows[i],
+            'height': floor_heights[i],
+            'gravi_pressure': gravi,
+            'available_pressure': available_pressure(gravi, deflector_pressure),
+            'pass_kms': pass_kms[i],
+            'branch_kms': branch_kms[i],
+            'a': row['a'],
+            'b': row['b'],
+            **values,
+            'pass_pressure': local_pressure(pass_kms[i], values['velocity'], t),
+            'branch_pressure': local_pressure(branch_kms[i], sputnik_velocity, t),
+        })
+
+    klapan = sputnik_result['pressure']
+    for i in range(n_rows - 1, 0, -1):
+        floor = floors[i]
+        if None in (klapan, floor['branch_pressure']):
+            floor['full_pressure'] = None
+            continue
+        passes = [floors[j]['pass_pressure'] for j in range(i, 0, -1) if floors[j]['pass_pressure'] is not None]
+        linear = [
+            floors[j]['linear_pressure_loss'] for j in range(i, 0, -1)
+            if floors[j]['linear_pressure_loss'] is not None
+        ]
+        result = klapan + floor['branch_pressure'] + sum(passes) + sum(linear) + cap_value
+        floor['full_pressure'] = round(result, 3)
+    if floors:
+        # the top floor only needs its own cells; the GUI also clears it while a floor below has no ΔP,
+        # until the cap is recalculated, which is left out here
+        top = floors[0]
+        parts = (top['linear_pressure_loss'], top['pass_pressure'], top['branch_pressure'])
+        top['full_pressure'] = round(parts[2] + parts[1] + parts[0] + cap_value, 3) if None not in parts else None
+
+    for floor in floors:
+        available, full = floor['available_pressure'], floor['full_pressure']
+        floor['draft'] = available > full if None not in (available, full) else None
+
+    return {
+        'sputnik': sputnik_result,
+        'deflector': deflector_result,
+        'cap_pressure': cap,
+        'floors': floors,
+    }
+
+
+CACHED = {'m': _m_coefficient, 'segment': _segment, 'sputnik': _sputnik}
+
+
+def cache_info() -> dict:
+    stats = {}
+    for name, function in CACHED.items():
+        info = function.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'maxsize': info.maxsize,
+            'hit_rate': round(info.hits / lookups, 4) if lookups else None,
+        }
+    return stats
+
+
+def cache_clear() -> None:
+    for function in CACHED.values():
+        function.cache_clear()
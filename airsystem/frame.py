@@ -0,0 +1,171 @@
+import numpy as np
+
+try:
+    import pandas as pd
+except ImportError:
+    # pandas is not in requirements.txt, the program and the other modules run without it
+    raise ImportError('airsystem.frame needs pandas: pip install pandas') from None
+
+from airsystem import vector
+from airsystem.project import load_project
+
+
+# the columns of the main table of the program, in its order
+LABELS = {
+    'floor': 'Этаж',
+    'floor_height': 'Высота этажа [м]',
+    'flow': 'Lрасч [м3/ч]',
+    'height': 'hрасч [м]',
+    'gravi_pressure': 'Pгр [Па]',
+    'deflector_pressure': 'Рдеф [Па]',
+    'available_pressure': 'Ррасп [Па]',
+    'pass_kms': 'ζпр',
+    'branch_kms': 'ζотв',
+    'a': 'Сторона канала a (большая) [мм]',
+    'b': 'Сторона канала b (меньшая) [мм]',
+    'velocity': 'v [м/с]',
+    'diameter': 'Dэкв [м]',
+    'specific_pressure_loss': 'R [Па/м]',
+    'm': 'm',
+    'linear_pressure_loss': 'R∙l∙m [Па]',
+    'dynamic': 'Рд [Па]',
+    'pass_pressure': 'ΔPпр [Па]',
+    'branch_pressure': 'ΔPотв [Па]',
+    'full_pressure': 'ΔP [Па]',
+    'draft': 'Результат',
+}
+SHAFT = (
+    'sputnik_klapan_pressure_loss', 'sputnik_pressure', 'deflector_pressure', 'cap_pressure',
+)
+# scenario frames: one row per shaft with the same section and height on every floor
+REQUIRED = (
+    'floors', 'temperature', 'surface', 'floor_height', 'shaft_height', 'klapan_flow', 'klapan_capacity',
+    'sides', 'one_side_flow', 'one_side_length', 'one_side_a', 'one_side_kms', 'a', 'pass_kms',
+)
+CHUNK_SIZE = 50_000
+
+
+def labelled(frame) -> pd.DataFrame:
+    return frame.rename(columns=LABELS)
+
+
+def column(frame, name, default=np.nan) -> np.ndarray:
+    if name in frame:
+        return pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=np.float64)
+    return np.full(len(frame), default, dtype=np.float64)
+
+
+def scalars_of(frame) -> dict:
+    scalars = {key: column(frame, key) for key in vector.SCALARS}
+    if 'deflector' not in frame:
+        scalars['deflector'] = np.isfinite(scalars['wind_velocity']).astype(np.float64)
+    return scalars
+
+
+def evaluate_floors(frame) -> pd.DataFrame:
+    # long format: one row per floor, 'project' groups the floors of one shaft, 'floor' orders them.
+    # Per floor: floor_height, a, b, pass_kms (top floor only); per shaft, repeated on every row:
+    # vector.SCALARS with 'typical_floor_height' in place of the project's floor height.
+    codes, projects = pd.factorize(frame['project'], sort=False)
+    floors = column(frame, 'floor')
+    sizes = np.bincount(codes)
+    order = np.lexsort((-floors, codes, sizes[codes]))
+    scalars = scalars_of(frame)
+    scalars['floor_height'] = column(frame, 'typical_floor_height', 1.0)
+    rows = {key: column(frame, key) for key in vector.ROWS}
+
+    out = {key: np.empty(len(frame)) for key in LABELS if key not in ('floor_height', 'a', 'b')}
+    start = 0
+    for n in np.unique(sizes):
+        count = int(np.count_nonzero(sizes == n)) * n
+        block = order[start:start + count]
+        start += count
+        tops = block[::n]
+        shaft, floor = vector.evaluate_arrays(
+            {key: value[tops] for key, value in scalars.items()},
+            {key: value[block].reshape(-1, n) for key, value in rows.items()},
+        )
+        floor['deflector_pressure'] = np.repeat(shaft['deflector_pressure'][:, None], n, axis=1)
+        for key in out:
+            out[key][block] = floor[key].ravel()
+
+    result = pd.DataFrame({'project': frame['project'].to_numpy()})
+    for key in LABELS:
+        result[key] = out[key] if key in out else rows.get(key, column(frame, key))
+    result['floor'] = result['floor'].astype(np.int64)
+    result['draft'] = pd.array(
+        np.where(np.isnan(out['draft']), None, out['draft'] == 1), dtype='boolean'
+    )
+    sort = np.lexsort((-floors, codes))
+    return result.iloc[sort].reset_index(drop=True)
+
+
+def evaluate_scenarios(frame, chunk_size=CHUNK_SIZE) -> pd.DataFrame:
+    # one row per shaft: the REQUIRED columns, optional b, one_side_b, two_side_*, cap_kms (or cap_type and cap_h), wind_velocity.
+    # Floors are not kept, each shaft is reduced to its shaft values and draft summary.
+    missing = [name for name in REQUIRED if name not in frame]
+    if missing:
+        raise KeyError(f'missing columns: {", ".join(missing)}')
+    scalars = scalars_of(frame)
+    floors = column(frame, 'floors').astype(np.int64)
+    a, b, pass_kms = column(frame, 'a'), column(frame, 'b'), column(frame, 'pass_kms')
+
+    keys = SHAFT + ('top_full_pressure', 'bottom_full_pressure', 'min_margin', 'failing_floors', 'top_draft')
+    out = {key: np.full(len(frame), np.nan) for key in keys}
+    for n in np.unique(floors):
+        if n < 1:
+            continue
+        selected = np.flatnonzero(floors == n)
+        for begin in range(0, len(selected), chunk_size):
+            index = selected[begin:begin + chunk_size]
+            m = len(index)
+            rows = {
+                'floor_height': np.repeat(scalars['floor_height'][index][:, None], n, axis=1),
+                'a': np.repeat(a[index][:, None], n, axis=1),
+                'b': np.repeat(b[index][:, None], n, axis=1),
+                'pass_kms': np.full((m, n), np.nan),
+            }
+            rows['pass_kms'][:, 0] = pass_kms[index]
+            shaft, floor = vector.evaluate_arrays({key: value[index] for key, value in scalars.items()}, rows)
+            for key in SHAFT:
+                out[key][index] = shaft[key]
+            full, available, draft = floor['full_pressure'], floor['available_pressure'], floor['draft']
+            with np.errstate(invalid='ignore'):
+                margin = available - full
+            known = np.isfinite(margin)
+            out['top_full_pressure'][index] = full[:, 0]
+            out['bottom_full_pressure'][index] = full[:, -1]
+            out['min_margin'][index] = vector.py_round(
+                np.where(known.any(axis=1), np.min(np.where(known, margin, np.inf), axis=1), np.nan), 3
+            )
+            out['failing_floors'][index] = np.sum(draft == 0, axis=1)
+            out['top_draft'][index] = draft[:, 0]
+
+    result = pd.DataFrame({key: out[key] for key in keys[:-2]}, index=frame.index)
+    result['failing_floors'] = out['failing_floors'].astype(np.int64)
+    result['top_draft'] = pd.array(
+        np.where(np.isnan(out['top_draft']), None, out['top_draft'] == 1), dtype='boolean'
+    )
+    return result
+
+
+def load_frame(paths) -> pd.DataFrame:
+    # saved projects -> the long format of evaluate_floors, 'project' is the file path
+    columns = {key: [] for key in ('project', 'floor', 'typical_floor_height') + vector.SCALARS + vector.ROWS}
+    for path in paths:
+        project = load_project(path)
+        scalars = vector.project_scalars(project)
+        n = len(project['rows'])
+        for i, row in enumerate(project['rows']):
+            columns['project'].append(path)
+            columns['floor'].append(n - i)
+            columns['typical_floor_height'].append(scalars['floor_height'])
+            for key in vector.SCALARS:
+                if key != 'floor_height':
+                    columns[key].append(scalars[key])
+            for key in vector.ROWS:
+                columns[key].append(row[key])
+    frame = pd.DataFrame({key: value for key, value in columns.items() if value or key == 'project'})
+    for key in frame.columns[1:]:
+        frame[key] = pd.to_numeric(frame[key], errors='coerce')
+    return frame
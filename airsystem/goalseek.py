@@ -0,0 +1,241 @@
+import sys
+import math
+import argparse
+
+import numpy as np
+
+from airsystem import engine, vector
+from airsystem.project import load_project
+from airsystem.sizing import margins, repeated
+
+# the numeric inputs of the init data and the sputnik block: the range and the step of their fields,
+# the flows of the satellite in whole m3/h as the main table sums them
+INPUTS = {
+    'temperature': (0.0, 30.0, 0.1),
+    'surface': (0.0, 100.0, 0.001),
+    'floor_height': (1.0, 100.0, 0.01),
+    'shaft_height': (1.0, 100.0, 0.01),
+    'klapan_capacity': (1.0, 100.0, 1.0),
+    'klapan_flow': (1.0, 100.0, 1.0),
+    'one_side_flow': (0.0, 299.0, 1.0),
+    'one_side_length': (0.0, 100.0, 0.001),
+    'one_side_a': (1.0, 2_000.0, 1.0),
+    'one_side_b': (1.0, 2_000.0, 1.0),
+    'one_side_kms': (0.0, 100.0, 0.001),
+    'two_side_flow': (0.0, 299.0, 1.0),
+    'two_side_length': (0.0, 100.0, 0.001),
+    'two_side_kms': (0.0, 100.0, 0.001),
+}
+# values of the first pass over the range, values per refining pass, refining passes
+SCAN = 64
+CANDIDATES = 16
+ITERATIONS = 30
+
+
+def digits(name) -> int:
+    return max(0, -math.floor(math.log10(INPUTS[name][2]) + 1e-9))
+
+
+def value_text(name, value) -> str:
+    text = f'{value:.{digits(name)}f}'
+    return text.rstrip('0').rstrip('.') if '.' in text else text
+
+
+def project_input(project, name) -> object:
+    if name.startswith(('one_side_', 'two_side_')):
+        return project[name[:8]][name[9:]]
+    return project[name]
+
+
+def with_input(project, name, value) -> dict:
+    # a copy of the project with one input changed, hэ goes to every floor as in the main table
+    project = {
+        **project,
+        'one_side': dict(project['one_side']),
+        'two_side': dict(project['two_side']),
+        'rows': [dict(row) for row in project['rows']],
+    }
+    if name.startswith(('one_side_', 'two_side_')):
+        side, key = name[:8], name[9:]
+        project[side][key] = value
+        if side == 'one_side' and key in ('a', 'b'):
+            project['two_side'][key] = value
+    else:
+        project[name] = value
+    if name == 'floor_height':
+        for row in project['rows']:
+            row['floor_height'] = value
+    return project
+
+
+def worst_margins(project, name, values) -> np.ndarray:
+    # the smallest Ррасп - ΔP over the floors for every value of the input, in one vectorized batch
+    scalars, rows = repeated(project, len(values))
+    scalars[name] = values
+    if name == 'floor_height':
+        rows['floor_height'] = np.repeat(values[:, None], rows['floor_height'].shape[1], axis=1)
+    _, floor = vector.evaluate_arrays(scalars, rows)
+    lowest, _ = margins(floor['full_pressure'], floor['available_pressure'])
+    # a value that leaves some floor without ΔP or Ррасп is not a solution, its margin is not defined
+    known = np.all(np.isfinite(floor['full_pressure']) & np.isfinite(floor['available_pressure']), axis=1)
+    return np.where(known, lowest, np.nan)
+
+
+def crossings(x, y) -> np.ndarray:
+    # i where the margin goes over the target between x[i] and x[i + 1], a margin equal to it has no draft at 0 Pa
+    known = np.isfinite(y[:-1]) & np.isfinite(y[1:])
+    return np.flatnonzero(known & ((y[:-1] > 0) != (y[1:] > 0)))
+
+
+def interpolate(a, fa, b, fb, c, fc) -> float:
+    # Brent's step: inverse quadratic through three points, the secant through two, the middle if it leaves (a, b)
+    if c is not None and fa != fc and fb != fc:
+        s = (
+            a * fb * fc / ((fa - fb) * (fa - fc))
+            + b * fa * fc / ((fb - fa) * (fb - fc))
+            + c * fa * fb / ((fc - fa) * (fc - fb))
+        )
+    else:
+        s = b - fb * (b - a) / (fb - fa)
+    if not a < s < b:
+        s = (a + b) / 2
+    return s
+
+
+def goal_seek(project, name, target=0.0, low=None, high=None, scan=SCAN, candidates=CANDIDATES, iterations=ITERATIONS) -> dict:
+    # the value of the input nearest to the current one at which the worst floor has the target margin;
+    # every pass evaluates Brent's estimate, two values around it and a grid over the bracket at once
+    if name not in INPUTS:
+        raise ValueError(f'unknown input: {name}')
+    field_low, field_high, step = INPUTS[name]
+    low = field_low if low is None else low
+    high = field_high if high is None else high
+    if not low < high:
+        raise ValueError('empty range')
+    evaluations = 0
+
+    def f(values):
+        nonlocal evaluations
+        evaluations += len(values)
+        return worst_margins(project, name, values) - target
+
+    x = np.linspace(low, high, scan)
+    y = f(x)
+    found = crossings(x, y)
+    result = {'input': name, 'target': target, 'range': (low, high), 'roots': len(found), 'value': None}
+    if not len(found):
+        known = np.flatnonzero(np.isfinite(y))
+        if len(known):
+            best = known[np.argmax(y[known])]
+            result.update({'best': float(x[best]), 'best_margin': round(float(y[best] + target), 3)})
+        # every value with a defined margin already has the target one
+        everywhere = bool(len(known)) and bool(np.all(y[known] > 0))
+        result.update({'everywhere': everywhere, 'evaluations': evaluations, 'iterations': 0})
+        return result
+    current = project_input(project, name)
+    i = found[0] if current is None else found[np.argmin(np.abs((x[found] + x[found + 1]) / 2 - current))]
+    a, fa, b, fb = x[i], y[i], x[i + 1], y[i + 1]
+    c, fc = None, None
+
+    passes = 0
+    while b - a > step and passes < iterations:
+        passes += 1
+        s = interpolate(a, fa, b, fb, c, fc)
+        around = (b - a) / (4 * candidates)
+        points = np.concatenate([
+            np.linspace(a, b, candidates - 1)[1:-1],
+            [max(a, s - around), s, min(b, s + around)],
+        ])
+        points = np.unique(np.concatenate([[a, b], points]))
+        values = f(points[1:-1])
+        values = np.concatenate([[fa], values, [fb]])
+        inside = crossings(points, values)
+        j = inside[np.argmin(np.abs(points[inside] - s))]
+        # the third point for the next estimate is the neighbour on the side of the larger step
+        k = j - 1 if j > 0 and (j + 2 >= len(points) or abs(values[j - 1]) < abs(values[j + 2])) else j + 2
+        c, fc = (points[k], values[k]) if 0 <= k < len(points) and np.isfinite(values[k]) else (None, None)
+        a, fa, b, fb = points[j], values[j], points[j + 1], values[j + 1]
+
+    # the values of the field around the bracket, the one with the target margin nearest to the other end
+    feasible, other = (a, b) if fa > 0 else (b, a)
+    grid = np.arange(math.floor(a / step + 1e-9), math.ceil(b / step - 1e-9) + 1) * step
+    grid = np.unique(np.round(np.clip(grid, low, high), digits(name)))
+    reached = grid[f(grid) > 0]
+    if len(reached):
+        value = float(reached[np.argmin(np.abs(reached - other))])
+    else:
+        value = math.ceil(feasible / step - 1e-9) * step if feasible > other else math.floor(feasible / step + 1e-9) * step
+        value = round(min(max(value, low), high), digits(name))
+    result.update({
+        'value': value,
+        'bracket': (float(a), float(b)),
+        'evaluations': evaluations,
+        'iterations': passes,
+    })
+    result.update(floor_margins(with_input(project, name, value)))
+    return result
+
+
+def floor_margins(project) -> dict:
+    # the exact calculation at the solution, top floor first
+    floors = []
+    for floor in engine.evaluate(project)['floors']:
+        full, available = floor['full_pressure'], floor['available_pressure']
+        margin = None if None in (full, available) else round(available - full, 3)
+        floors.append({
+            'floor': floor['floor'],
+            'full_pressure': full,
+            'available_pressure': available,
+            'margin': margin,
+            'draft': None if margin is None else available > full,
+        })
+    known = [floor['margin'] for floor in floors if floor['margin'] is not None]
+    return {
+        'floors': floors,
+        'min_margin': min(known) if known else None,
+        'failing_floors': sum(1 for floor in floors if not floor['draft']),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m airsystem.goalseek',
+        description='Подбор значения исходных данных, при котором минимальный запас давления равен заданному',
+    )
+    parser.add_argument('project')
+    parser.add_argument('input', choices=list(INPUTS))
+    parser.add_argument('--target', type=float, default=0.0, help='запас давления на худшем этаже, Па')
+    parser.add_argument('--low', type=float, default=None, help='нижняя граница поиска')
+    parser.add_argument('--high', type=float, default=None, help='верхняя граница поиска')
+    args = parser.parse_args(argv)
+    field_low, field_high, _ = INPUTS[args.input]
+    low = field_low if args.low is None else args.low
+    high = field_high if args.high is None else args.high
+    if not low < high:
+        parser.error(f'пустой диапазон поиска: {low:g}…{high:g}')
+
+    result = goal_seek(load_project(args.project), args.input, args.target, args.low, args.high)
+    low, high = result['range']
+    if result['value'] is None and result['everywhere']:
+        print(f'Запас больше {args.target:g} Па при всех значениях {low:g}…{high:g}, где расчёт определён')
+        return 0
+    if result['value'] is None:
+        print(f'На {low:g}…{high:g} запас {args.target:g} Па не достигается')
+        if 'best' in result:
+            print(f'Наибольший запас {result["best_margin"]:.3f} Па при {value_text(args.input, result["best"])}')
+        return 2
+    print(
+        f'{args.input} = {value_text(args.input, result["value"])}: запас {result["min_margin"]:.3f} Па, '
+        f'без тяги: {result["failing_floors"]} '
+        f'(проходов {result["iterations"]}, расчётов {result["evaluations"]}, пересечений на {low:g}…{high:g}: {result["roots"]})'
+    )
+    for floor in result['floors']:
+        cells = [floor['full_pressure'], floor['available_pressure'], floor['margin']]
+        cells = ['-' if value is None else f'{value:.3f}' for value in cells]
+        draft = '-' if floor['draft'] is None else ('да' if floor['draft'] else 'нет')
+        print(f'{floor["floor"]:>4}  ΔP {cells[0]:>9}  Ррасп {cells[1]:>9}  запас {cells[2]:>9}  тяга {draft}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
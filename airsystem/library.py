@@ -0,0 +1,421 @@
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import threading
+
+from airsystem import reference
+from airsystem.batch import find_projects, run
+from airsystem.engine import _grid_cell, evaluate
+from airsystem.project import read_project
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS projects (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    error TEXT,
+    floors INTEGER,
+    shaft_height REAL,
+    temperature REAL,
+    klapan TEXT,
+    cap TEXT,
+    sides INTEGER,
+    sputnik_a REAL,
+    sputnik_b REAL,
+    main_a REAL,
+    main_b REAL,
+    min_margin REAL,
+    failing_floors INTEGER,
+    top_fails INTEGER,
+    failing TEXT
+);
+CREATE INDEX IF NOT EXISTS projects_floors ON projects (floors);
+CREATE INDEX IF NOT EXISTS projects_shaft_height ON projects (shaft_height);
+CREATE INDEX IF NOT EXISTS projects_temperature ON projects (temperature);
+CREATE INDEX IF NOT EXISTS projects_klapan ON projects (klapan);
+CREATE INDEX IF NOT EXISTS projects_cap ON projects (cap);
+CREATE INDEX IF NOT EXISTS projects_main ON projects (main_a, main_b);
+CREATE INDEX IF NOT EXISTS projects_min_margin ON projects (min_margin);
+CREATE INDEX IF NOT EXISTS projects_failing ON projects (failing_floors, top_fails);
+CREATE TABLE IF NOT EXISTS refs (
+    key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (key, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS refs_path ON refs (path);
+CREATE TABLE IF NOT EXISTS reference (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+'''
+COLUMNS = (
+    'path', 'mtime', 'size', 'error', 'floors', 'shaft_height', 'temperature', 'klapan', 'cap', 'sides',
+    'sputnik_a', 'sputnik_b', 'main_a', 'main_b', 'min_margin', 'failing_floors', 'top_fails', 'failing',
+)
+# below this many changed files indexing stays in the calling thread
+PARALLEL_FROM = 256
+
+
+def largest(values) -> object:
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def reference_values() -> dict:
+    # every reference entry a result can depend on, serialized to compare with the values seen at indexing
+    values = {
+        f'klapan:{name}': value for name, value in reference.KLAPAN_ITEMS.items()
+        if value not in ('', '--')
+    }
+    for cap, relations in reference.CAP_RELATIONS.items():
+        for relation, value in relations.items():
+            if value != '':
+                values[f'cap:{cap}:{relation}'] = value
+    values['deflector:diameters'] = sorted(reference.DEFLECTOR_DIAMETERS.items())
+    relation = reference.REFERENCE_DATA.DEFLECTOR_PRESSURE_RELATION
+    values['deflector:relation'] = [relation.X, relation.TABLE]
+    m = reference.REFERENCE_DATA.M
+    values['m:axes'] = [m.X, m.Y]
+    for i, line in enumerate(m.TABLE):
+        for j, value in enumerate(line):
+            values[f'm:{i},{j}'] = value
+    return {key: json.dumps(value, ensure_ascii=False) for key, value in values.items()}
+
+
+def m_keys(a, b) -> list:
+    # the four M.TABLE entries around the point engine.m_coefficient interpolates at
+    if a is None or not 100 <= int(a) <= 1_500:
+        return []
+    a = int(a)
+    b = int(b) if b is not None and 100 <= int(b) <= 1_500 else a
+    i, _ = _grid_cell(reference.REFERENCE_DATA.M.Y, b)
+    j, _ = _grid_cell(reference.REFERENCE_DATA.M.X, a)
+    return ['m:axes'] + [f'm:{i + di},{j + dj}' for di in (0, 1) for dj in (0, 1)]
+
+
+def reference_keys(project, result) -> set:
+    keys = set()
+    if project.get('klapan_catalog'):
+        keys.add(f'klapan:{project["klapan"]}')
+    if project['cap'] in reference.CAP_TYPES[2:4] and project['cap_h'] is not None:
+        # ζ is interpolated at the actual h/Do over the whole table of the cap
+        keys.update(
+            f'cap:{project["cap"]}:{relation}' for relation, value in reference.CAP_RELATIONS[project['cap']].items() if value
+        )
+    elif project['cap'] in reference.CAP_TYPES[2:4] and project['cap_relation']:
+        keys.add(f'cap:{project["cap"]}:{project["cap_relation"]}')
+    if result['deflector'] is not None:
+        keys.update(('deflector:diameters', 'deflector:relation'))
+    for item in [project['one_side'], project['two_side']] + project['rows']:
+        keys.update(m_keys(item['a'], item['b']))
+    return keys
+
+
+def failing_floors(text) -> set:
+    return {int(floor) for floor in (text or '').split(',') if floor}
+
+
+def index_file(path) -> dict:
+    row = dict.fromkeys(COLUMNS)
+    row['path'] = path
+    row['refs'] = []
+    try:
+        stat = os.stat(path)
+        row['mtime'], row['size'] = stat.st_mtime, stat.st_size
+        with open(path, encoding='utf-8') as file:
+            project = read_project(json.load(file))
+        result = evaluate(project)
+    except Exception as e:
+        row['mtime'] = row['mtime'] or 0.0
+        row['size'] = row['size'] or 0
+        row['error'] = f'{type(e).__name__}: {e}'
+        return row
+
+    floors = result['floors']
+    margins = [
+        floor['available_pressure'] - floor['full_pressure'] for floor in floors
+        if None not in (floor['available_pressure'], floor['full_pressure'])
+    ]
+    failing = [floor['floor'] for floor in floors if floor['draft'] is False]
+    row.update({
+        'floors': len(floors),
+        'shaft_height': project['shaft_height'],
+        'temperature': project['temperature'],
+        'klapan': project.get('klapan'),
+        'cap': project['cap'],
+        'sides': project['sides'],
+        'sputnik_a': project['one_side']['a'],
+        'sputnik_b': project['one_side']['b'],
+        'main_a': largest(item['a'] for item in project['rows']),
+        'main_b': largest(item['b'] for item in project['rows']),
+        'min_margin': round(min(margins), 3) if margins else None,
+        'failing_floors': len(failing),
+        'top_fails': int(bool(floors) and floors[0]['draft'] is False),
+        # ',9,8,' so that one floor can be found with LIKE '%,9,%'
+        'failing': f',{",".join(map(str, failing))},' if failing else '',
+        'refs': sorted(reference_keys(project, result)),
+    })
+    return row
+
+
+def index_files(paths) -> list:
+    return [index_file(path) for path in paths]
+
+
+class Library:
+    def __init__(self, path) -> None:
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+    def version(self) -> int:
+        # changes whenever another connection (the watcher) commits
+        return self.connection.execute('PRAGMA data_version').fetchone()[0]
+
+
+    def count(self) -> int:
+        return self.connection.execute('SELECT count(*) FROM projects').fetchone()[0]
+
+
+    def scan(self, directory, jobs=1) -> dict:
+        root = os.path.abspath(directory)
+        prefix = os.path.join(root, '')
+        stored = {
+            path: (mtime, size) for path, mtime, size in
+            self.connection.execute('SELECT path, mtime, size FROM projects')
+            if path.startswith(prefix)
+        }
+        changed, seen = [], set()
+        for path in find_projects(root):
+            seen.add(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if stored.get(path) != (stat.st_mtime, stat.st_size):
+                changed.append(path)
+        removed = [path for path in stored if path not in seen]
+
+        with self.connection:
+            self.store(self.index(changed, jobs))
+            self.connection.executemany('DELETE FROM projects WHERE path = ?', ((path,) for path in removed))
+            self.connection.executemany('DELETE FROM refs WHERE path = ?', ((path,) for path in removed))
+            if not self.connection.execute('SELECT 1 FROM reference LIMIT 1').fetchone():
+                self.save_reference(reference_values())
+        return {
+            'indexed': len(changed),
+            'new': sum(path not in stored for path in changed),
+            'removed': len(removed),
+            'total': len(seen),
+        }
+
+
+    def index(self, paths, jobs) -> object:
+        if jobs != 1 and len(paths) >= PARALLEL_FROM:
+            return run(paths, jobs, worker=index_files)
+        return map(index_file, paths)
+
+
+    def store(self, rows) -> list:
+        placeholders = ', '.join('?' * len(COLUMNS))
+        stored = []
+        for row in rows:
+            self.connection.execute(
+                f'INSERT OR REPLACE INTO projects ({", ".join(COLUMNS)}) VALUES ({placeholders})',
+                [row[column] for column in COLUMNS],
+            )
+            self.connection.execute('DELETE FROM refs WHERE path = ?', (row['path'],))
+            self.connection.executemany(
+                'INSERT INTO refs (key, path) VALUES (?, ?)', ((key, row['path']) for key in row['refs'])
+            )
+            stored.append(row)
+        return stored
+
+
+    def save_reference(self, values, keys=None) -> None:
+        keys = values.keys() if keys is None else keys
+        for key in keys:
+            if key in values:
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO reference (key, value) VALUES (?, ?)', (key, values[key])
+                )
+            else:
+                self.connection.execute('DELETE FROM reference WHERE key = ?', (key,))
+
+
+    def stale_keys(self) -> list:
+        # reference entries corrected, added or removed since the projects were indexed
+        stored = dict(self.connection.execute('SELECT key, value FROM reference'))
+        if not stored:
+            return []
+        current = reference_values()
+        return sorted(key for key in stored.keys() | current.keys() if stored.get(key) != current.get(key))
+
+
+    def affected(self, keys) -> list:
+        paths = set()
+        for key in keys:
+            paths.update(path for path, in self.connection.execute('SELECT path FROM refs WHERE key = ?', (key,)))
+        return sorted(paths)
+
+
+    def reevaluate(self, keys, jobs=None) -> list:
+        # recomputes only the projects that use the given reference entries and
+        # reports the floors whose draft status changed
+        paths = self.affected(keys)
+        before = {}
+        for path in paths:
+            failing = self.connection.execute('SELECT failing FROM projects WHERE path = ?', (path,)).fetchone()
+            before[path] = failing_floors(failing[0] if failing else '')
+        changes = []
+        with self.connection:
+            for row in self.store(self.index(paths, jobs)):
+                old, new = before.get(row['path'], set()), failing_floors(row['failing'])
+                if row['error'] or old != new:
+                    changes.append({
+                        'path': row['path'],
+                        'error': row['error'],
+                        'lost_draft': sorted(new - old, reverse=True),
+                        'regained_draft': sorted(old - new, reverse=True),
+                    })
+            self.save_reference(reference_values(), keys)
+        return changes
+
+
+    def search(
+        self, floors_min=None, floors_max=None, klapan=None, cap=None, failing=None, top_fails=None,
+        margin_below=None, path=None, limit=1_000,
+    ) -> list:
+        conditions, params = ['error IS NULL'], []
+        if floors_min is not None:
+            conditions.append('floors >= ?')
+            params.append(floors_min)
+        if floors_max is not None:
+            conditions.append('floors <= ?')
+            params.append(floors_max)
+        if klapan:
+            conditions.append('klapan LIKE ?')
+            params.append(f'%{klapan}%')
+        if cap:
+            conditions.append('cap = ?')
+            params.append(cap)
+        if failing is not None:
+            conditions.append('failing_floors > 0' if failing else 'failing_floors = 0')
+        if top_fails is not None:
+            conditions.append('top_fails = ?')
+            params.append(int(top_fails))
+        if margin_below is not None:
+            conditions.append('min_margin < ?')
+            params.append(margin_below)
+        if path:
+            conditions.append('path LIKE ?')
+            params.append(f'%{path}%')
+        params.append(limit)
+        query = f'SELECT * FROM projects WHERE {" AND ".join(conditions)} ORDER BY min_margin, path LIMIT ?'
+        return [dict(row) for row in self.connection.execute(query, params)]
+
+
+class Watcher(threading.Thread):
+    # rescans the directory every interval seconds through its own connection
+    def __init__(self, database, directory, interval) -> None:
+        super().__init__(daemon=True)
+        self.database = database
+        self.directory = directory
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.error = None
+
+
+    def run(self) -> None:
+        library = Library(self.database)
+        try:
+            while True:
+                try:
+                    library.scan(self.directory)
+                    self.error = None
+                except (OSError, sqlite3.Error) as e:
+                    self.error = e
+                if self.stopped.wait(self.interval):
+                    break
+        finally:
+            library.close()
+
+
+    def stop(self) -> None:
+        # a scan in progress is finished in the background, its transaction is atomic either way
+        self.stopped.set()
+
+
+def report_changes(library, keys, jobs) -> None:
+    affected = library.affected(keys)
+    changes = library.reevaluate(keys, jobs)
+    for change in changes:
+        if change['error']:
+            print(f'{change["path"]}: {change["error"]}')
+            continue
+        parts = []
+        if change['lost_draft']:
+            parts.append(f'нет тяги: {", ".join(map(str, change["lost_draft"]))}')
+        if change['regained_draft']:
+            parts.append(f'появилась тяга: {", ".join(map(str, change["regained_draft"]))}')
+        print(f'{change["path"]}: {"; ".join(parts)}')
+    print(
+        f'Изменённых записей справочника: {len(keys)}, пересчитано проектов: {len(affected)}, '
+        f'изменилась тяга: {len(changes)}',
+        file=sys.stderr,
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m airsystem.library',
+        description='Индексация каталога проектов (*.json) в библиотеку SQLite',
+    )
+    parser.add_argument('directory')
+    parser.add_argument('--db', default='library.sqlite3', help='файл библиотеки')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='число процессов')
+    parser.add_argument('--watch', type=float, default=None, metavar='SECONDS', help='пересканировать с интервалом')
+    parser.add_argument(
+        '--refresh', action='store_true',
+        help='пересчитать проекты, использующие изменённые справочные данные',
+    )
+    parser.add_argument(
+        '--key', action='append', default=[],
+        help='пересчитать проекты, использующие эту запись справочника (klapan:<имя>, cap:<тип>:<h/Do: ζ>, m:<i>,<j>)',
+    )
+    args = parser.parse_args(argv)
+
+    library = Library(args.db)
+    try:
+        while True:
+            stats = library.scan(args.directory, args.jobs)
+            print(
+                f'Проектов: {stats["total"]}, проиндексировано: {stats["indexed"]} '
+                f'(новых {stats["new"]}), удалено: {stats["removed"]}',
+                file=sys.stderr,
+            )
+            keys = sorted(set(args.key) | set(library.stale_keys() if args.refresh else []))
+            if keys:
+                report_changes(library, keys, args.jobs)
+            if args.watch is None:
+                break
+            threading.Event().wait(args.watch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        library.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
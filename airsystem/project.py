@@ -0,0 +1,135 @@
+import json
+
+from airsystem import reference
+
+
+def load_project(path) -> dict:
+    with open(path, encoding='utf-8') as file:
+        return read_project(json.load(file))
+
+
+def number(text) -> object:
+    if text is None or text == '':
+        return None
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_project(data) -> dict:
+    # turns the save format of MainWindow._get_data_for_save into numbers, empty cells become None
+    init_data = data['init_data']
+    klapan_flow, one_side, two_side, checked = data['sputnik_data']
+    one_side = one_side['one_side']
+    two_side = two_side['two_side']
+
+    klapan_hand, klapan_name = init_data[4], init_data[5]
+    klapan_item = reference.KLAPAN_ITEMS.get(klapan_name, '')
+    klapan_capacity = klapan_hand if klapan_hand or klapan_item == '--' else klapan_item
+
+    if data.get('deflector'):
+        cap, cap_h, relation = reference.CAP_TYPES[-1], None, None
+    elif data.get('cap_0'):
+        cap, cap_h, relation = data['cap_0'], None, None
+    elif data.get('cap_1'):
+        cap, cap_h, relation = data['cap_1'][0], number(data['cap_1'][1]), data['cap_1'][2]
+    else:
+        cap, cap_h, relation = reference.CAP_TYPES[0], None, None
+
+    last_row = data['last_row']
+    rows = [{
+        'floor_height': number(last_row[0]),
+        'pass_kms': number(last_row[2]),
+        'a': number(last_row[3]),
+        'b': number(last_row[4]),
+    }]
+    for row in data['rows']:
+        rows.append({
+            'floor_height': number(row[0]),
+            'pass_kms': None,
+            'a': number(row[2]),
+            'b': number(row[3]),
+        })
+
+    return {
+        'temperature': number(init_data[0]),
+        'surface': number(init_data[1]),
+        'floor_height': number(init_data[2]),
+        'shaft_height': number(init_data[3]),
+        'klapan_flow': number(klapan_flow),
+        'klapan_capacity': number(klapan_capacity),
+        'klapan': klapan_name if klapan_item != '' else None,
+        # the capacity comes from KLAPAN_ITEMS, a correction there changes the result
+        'klapan_catalog': not klapan_hand and klapan_item not in ('', '--'),
+        'sides': checked['is_checked'],
+        'one_side': {
+            'flow': number(one_side[0]),
+            'length': number(one_side[1]),
+            'a': number(one_side[2]),
+            'b': number(one_side[3]),
+            'kms': number(one_side[4]),
+        },
+        'two_side': {
+            'flow': number(two_side[0]),
+            'length': number(two_side[1]),
+            # the two-sided branch always has the dimensions of the one-sided one
+            'a': number(one_side[2]),
+            'b': number(one_side[3]),
+            'kms': number(two_side[2]),
+        },
+        'cap': cap,
+        'cap_h': cap_h,
+        'cap_relation': relation,
+        'wind_velocity': number(data['deflector'][0]) if data.get('deflector') else None,
+        # top floor first, the same order as the rows of the main table
+        'rows': rows,
+    }
+
+
+def normalize_project(data) -> dict:
+    # a project already in the engine's own shape (the return value of parse_project), e.g. written by scripts
+    sides = int(data.get('sides', 1))
+    if sides not in (1, 2):
+        raise ValueError(f'sides: {sides}')
+    one_side, two_side = data.get('one_side') or {}, data.get('two_side') or {}
+    one_side = {key: number(one_side.get(key)) for key in ('flow', 'length', 'a', 'b', 'kms')}
+    two_side = {key: number(two_side.get(key)) for key in ('flow', 'length', 'kms')}
+    two_side.update({'a': one_side['a'], 'b': one_side['b']})
+    rows = [
+        {key: number(row.get(key)) for key in ('floor_height', 'pass_kms', 'a', 'b')}
+        for row in data['rows']
+    ]
+    for row in rows[1:]:
+        row['pass_kms'] = None
+    # without a capacity the valve is looked up by name
+    klapan, klapan_capacity = data.get('klapan'), number(data.get('klapan_capacity'))
+    klapan_catalog = klapan_capacity is None and reference.KLAPAN_ITEMS.get(klapan) not in (None, '', '--')
+    if klapan_catalog:
+        klapan_capacity = float(reference.KLAPAN_ITEMS[klapan])
+    return {
+        'temperature': number(data.get('temperature')),
+        'surface': number(data.get('surface')),
+        'floor_height': number(data.get('floor_height')),
+        'shaft_height': number(data.get('shaft_height')),
+        'klapan_flow': number(data.get('klapan_flow')),
+        'klapan_capacity': klapan_capacity,
+        'klapan': klapan,
+        'klapan_catalog': klapan_catalog,
+        'sides': sides,
+        'one_side': one_side,
+        'two_side': two_side,
+        'cap': data.get('cap') or reference.CAP_TYPES[0],
+        'cap_h': number(data.get('cap_h')),
+        'cap_relation': data.get('cap_relation'),
+        'wind_velocity': number(data.get('wind_velocity')),
+        'rows': rows,
+    }
+
+
+def read_project(data) -> dict:
+    if not isinstance(data, dict):
+        raise ValueError('project must be a JSON object')
+    if 'init_data' in data:
+        return parse_project(data)
+    return normalize_project(data)
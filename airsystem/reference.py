@@ -0,0 +1,147 @@
+ACCELERATION_OF_GRAVITY = 9.81
+
+KLAPAN_ITEMS = {
+    'Выбрать': '',
+    # 1
+    'КИВ-125 (КПВ-125)': 36,
+    # 3
+    'Air-Box Comfort': 31,
+    'Air-Box Comfort\nс козырьком': 42,
+    'Air-Box Comfort S': 41,
+    'Air-Box Comfort Eco': 26,
+    # 8
+    'Norvind pro': 32,
+    'Norvind optima': 13,
+    'Norvind classic': 16,
+    'Norvind city': 30,
+    'Norvind lite': 26,
+    # 14
+    'Aereco EHT² 5-40': 40,
+    'Aereco EHT² 11-40': 40,
+    'Aereco EHT² 6-30': 30,
+    'Aereco EFT² 24': 24,
+    'Aereco EFT² 40': 40,
+    'Aereco EFTO² 40': 40,
+    # 21
+    'Aereco EHT 5-40': 40,
+    'Aereco EHT 11-40': 40,
+    'Aereco EHT 11-40': 40,
+    'Aereco EFT 40': 40,
+    # 25
+    'Aereco EHA² 5-35': 35,
+    'Aereco EHA² 11-35': 35,
+    'Aereco EHA² 17-35': 35,
+    # 29
+    'Aereco EMM² 5-35': 35,
+    'Aereco EMM² 11-35': 35,
+    'Aereco EMM² 24': 24,
+    'Aereco EMM² 35': 35,
+    'Aereco EMM² 5-35\nс проставкой': 45,
+    'Aereco EMM² 11-35\nс проставкой': 45,
+    'Aereco EMM² 24\nс проставкой': 36,
+    'Aereco EMM² 35\nс проставкой': 45,
+    # 38
+    'Aereco EAH² 5-35': 35,
+    'Aereco EAH² 11-35': 35,
+    'Aereco EAH² 24': 24,
+    'Aereco EAH² 35': 35,
+    'Aereco EAH² 5-35\nс проставкой': 50,
+    'Aereco EAH² 11-35\nс проставкой': 50,
+    'Aereco EAH² 24\nс проставкой': 38,
+    'Aereco EAH² 35\nс проставкой': 50,
+    # 47
+    'Aereco EMM 5-35': 35,
+    'Aereco EMM 11-35': 35,
+    'Aereco EMF 35': 35,
+    # 51
+    'Другой': '--',
+}
+
+CAP_TYPES = (
+    'Выбрать',
+    'Без оголовка',
+    'Зонт',
+    'Плоский экран',
+    'Дефлектор',
+)
+
+CAP_RELATIONS = {
+    'Зонт': {
+        'Выбрать': '',
+        'h/Do: ζ': '',
+        '0.10: 4.00': 4.00,
+        '0.20: 2.30': 2.30,
+        '0.25: 1.90': 1.90,
+        '0.30: 1.60': 1.60,
+        '0.35: 1.40': 1.40,
+        '0.40: 1.30': 1.30,
+        '0.50: 1.15': 1.15,
+        '0.60: 1.10': 1.10,
+        '0.80: 1.00': 1.00,
+        '1.00: 1.00': 1.00,
+    },
+    'Плоский экран': {
+        'Выбрать': '',
+        'h/Do: ζ': '',
+        '0.25: 3.40': 3.40,
+        '0.30: 2.60': 2.60,
+        '0.35: 2.10': 2.10,
+        '0.40: 1.70': 1.70,
+        '0.50: 1.40': 1.40,
+        '0.60: 1.20': 1.20,
+        '0.80: 1.10': 1.10,
+        '1.00: 1.00': 1.00,
+    }
+}
+
+# h/Do and ζ of the rows of CAP_RELATIONS, for ζ at the actual h/Do
+CAP_RELATION_CURVES = {
+    cap: tuple(zip(*[(float(key.partition(':')[0]), float(value)) for key, value in relations.items() if value]))
+    for cap, relations in CAP_RELATIONS.items()
+}
+
+DEFLECTOR_DIAMETERS = {
+    0.007854: '100',
+    0.012272: '125',
+    0.020106: '160',
+    0.031416: '200',
+    0.049087: '250',
+    0.077931: '315',
+    0.125664: '400',
+    0.19635: '500',
+    0.311725: '710',
+    0.395919: '800',
+}
+
+# standard channel sizes, mm: round ones (b is None) and rectangular a×b with a ≥ b, a ≤ 4b;
+# 140 and 270 are the sides of brick channels
+CHANNEL_DIAMETERS = (
+    100, 125, 140, 160, 180, 200, 225, 250, 280, 315, 355, 400, 450, 500, 560, 630, 710, 800, 900, 1000, 1120, 1250,
+)
+CHANNEL_SIDES = (100, 140, 150, 200, 250, 270, 300, 400, 500, 600, 800, 1000, 1200)
+CHANNEL_SIZES = tuple((d, None) for d in CHANNEL_DIAMETERS) + tuple(
+    (a, b) for a in CHANNEL_SIDES for b in CHANNEL_SIDES if b <= a <= 4 * b
+)
+
+
+class REFERENCE_DATA:
+    class M:
+        X = [100, 150, 200, 250, 300, 350, 400, 450, 500, 550, 600, 650, 700, 750, 800, 900, 1000, 1500]  # 18
+        Y = [100, 200, 300, 400, 500, 600, 700, 800, 900, 1000, 1500]  # 11
+        line_1 = [1.13,1.15,1.2,1.25,1.3,1.35,1.4,1.45,1.5,1.55,1.6,1.65,1.7,1.75,1.8,1,1,1]
+        line_2 = [1.2,1.145,1.13,1.145,1.16,1.18,1.2,1.23,1.25,1.27,1.3,1.33,1.36,1.39,1.41,1.46,1.51,1.75]
+        line_3 = [1.3,1.2,1.16,1.14,1.13,1.14,1.148,1.165,1.175,1.195,1.21,1.22,1.245,1.26,1.275,1.32,1.355,1.54]
+        line_4 = [1.4,1.265,1.2,1.17,1.148,1.137,1.13,1.137,1.145,1.149,1.16,1.165,1.17,1.185,1.2,1.225,1.25,1.38]
+        line_5 = [1.5,1.345,1.25,1.205,1.175,1.1505,1.145,1.135,1.13,1.135,1.14,1.145,1.15,1.155,1.165,1.18,1.2,1.3]
+        line_6 = [1.6,1.405,1.3,1.25,1.21,1.18,1.16,1.148,1.14,1.135,1.13,1.135,1.138,1.144,1.148,1.155,1.17,1.25]
+        line_7 = [1.7,1.48,1.36,1.29,1.245,1.21,1.17,1.16,1.15,1.145,1.138,1.135,1.13,1.132,1.138,1.145,1.15,1.22]
+        line_8 = [1.8,1.55,1.41,1.33,1.275,1.24,1.2,1.18,1.165,1.15,1.148,1.141,1.138,1.138,1.13,1.138,1.146,1.2]
+        line_9 = [1,1.6,1.46,1.38,1.32,1.27,1.225,1.2,1.18,1.17,1.155,1.149,1.145,1.147,1.138,1.13,1.137,1.17]
+        line_10 = [1,1.68,1.51,1.42,1.355,1.3,1.25,1.225,1.2,1.18,1.17,1.16,1.15,1.146,1.146,1.137,1.13,1.155]
+        line_11 = [1,1,1.75,1.62,1.54,1.46,1.38,1.345,1.3,1.275,1.25,1.23,1.22,1.2,1.2,1.17,1.155,1.13]
+        TABLE = [line_1, line_2, line_3, line_4, line_5, line_6, line_7, line_8, line_9, line_10, line_11]
+
+
+    class DEFLECTOR_PRESSURE_RELATION:
+        X = [0, 0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5]
+        TABLE = [0.55, 0.48, 0.43, 0.38, 0.35, 0.32, 0.28, 0.24, 0.21, 0.16, 0.1]
@@ -0,0 +1,197 @@
+import sys
+import argparse
+
+import numpy as np
+
+from airsystem import reference, vector
+from airsystem.batch import run
+from airsystem.project import load_project
+from airsystem.sizing import area, margins, repeated, section_text, size_arrays
+
+# the space: cap (with its h/Do relation or a deflector) × valve × main section × sputnik section
+SAMPLES = 200_000
+BLOCK_SIZE = 20_000
+
+
+def cap_options(wind_velocity=None) -> list:
+    # (cap, relation, ζ), the deflector only with a wind velocity
+    options = [(reference.CAP_TYPES[1], None, 1.0)]
+    for cap in reference.CAP_TYPES[2:4]:
+        for relation, value in reference.CAP_RELATIONS[cap].items():
+            if value:
+                options.append((cap, relation, float(value)))
+    if wind_velocity is not None:
+        options.append((reference.CAP_TYPES[-1], None, None))
+    return options
+
+
+def valve_options() -> list:
+    return [name for name, capacity in reference.KLAPAN_ITEMS.items() if isinstance(capacity, (int, float))]
+
+
+def make_space(project, caps=None, valves=None, main_sizes=None, sputnik_sizes=None, wind_velocity=None) -> dict:
+    wind_velocity = project['wind_velocity'] if wind_velocity is None else wind_velocity
+    space = {
+        'project': project,
+        'wind_velocity': wind_velocity,
+        'caps': caps if caps is not None else cap_options(wind_velocity),
+        'valves': valves if valves is not None else valve_options(),
+        'main': list(main_sizes or reference.CHANNEL_SIZES),
+        'sputnik': list(sputnik_sizes or reference.CHANNEL_SIZES),
+    }
+    space['shape'] = tuple(len(space[axis]) for axis in ('caps', 'valves', 'main', 'sputnik'))
+    if 0 in space['shape']:
+        raise ValueError('empty search axis')
+    return space
+
+
+def space_size(space) -> int:
+    return int(np.prod(space['shape'], dtype=np.int64))
+
+
+def design(space, index) -> dict:
+    cap, valve, main, sputnik = (int(i) for i in np.unravel_index(index, space['shape']))
+    cap, relation, _ = space['caps'][cap]
+    return {
+        'cap': cap,
+        'cap_relation': relation,
+        'klapan': space['valves'][valve],
+        'main': tuple(space['main'][main]),
+        'sputnik': tuple(space['sputnik'][sputnik]),
+    }
+
+
+def pareto(index, areas, lowest) -> np.ndarray:
+    # positions of the front: no other design is at most as large and has a larger margin
+    known = np.flatnonzero(np.isfinite(lowest))
+    order = known[np.lexsort((index[known], -lowest[known], areas[known]))]
+    best = np.maximum.accumulate(lowest[order])
+    keep = np.empty(len(order), dtype=bool)
+    keep[:1] = True
+    keep[1:] = lowest[order[1:]] > best[:-1]
+    return order[keep]
+
+
+def evaluate_designs(space, index) -> dict:
+    project = space['project']
+    caps, valves, main, sputnik = np.unravel_index(index, space['shape'])
+    scalars, rows = repeated(project, len(index))
+
+    is_deflector = np.array([option[0] == reference.CAP_TYPES[-1] for option in space['caps']])[caps]
+    kms = np.array([np.nan if option[2] is None else option[2] for option in space['caps']])[caps]
+    scalars['deflector'] = is_deflector.astype(np.float64)
+    scalars['cap_kms'] = kms
+    # the search takes h/Do from the rows of the table, not from the cap height of the project
+    scalars['cap_h'] = np.full(len(index), np.nan)
+    wind = np.nan if space['wind_velocity'] is None else float(space['wind_velocity'])
+    scalars['wind_velocity'] = np.where(is_deflector, wind, np.nan)
+    capacities = np.array([reference.KLAPAN_ITEMS[name] for name in space['valves']], dtype=np.float64)
+    scalars['klapan_capacity'] = capacities[valves]
+
+    main_a, main_b = size_arrays(space['main'])
+    rows = vector.main_section(rows, main_a[main], main_b[main])
+    sputnik_a, sputnik_b = size_arrays(space['sputnik'])
+    scalars['one_side_a'], scalars['one_side_b'] = sputnik_a[sputnik], sputnik_b[sputnik]
+
+    _, floor = vector.evaluate_arrays(scalars, rows)
+    lowest, failing = margins(floor['full_pressure'], floor['available_pressure'])
+    main_area = np.array([area(*size) for size in space['main']])
+    sputnik_area = np.array([area(*size) for size in space['sputnik']])
+    return {
+        'index': index,
+        'area': main_area[main] + sputnik_area[sputnik],
+        'min_margin': lowest,
+        'failing_floors': failing,
+    }
+
+
+def evaluate_block(task) -> dict:
+    # a worker: one block of designs, only its own front goes back
+    space, index = task
+    result = evaluate_designs(space, np.asarray(index, dtype=np.int64))
+    front = pareto(result['index'], result['area'], result['min_margin'])
+    return {
+        'index': result['index'][front],
+        'area': result['area'][front],
+        'min_margin': result['min_margin'][front],
+        'failing_floors': result['failing_floors'][front],
+        'evaluated': len(index),
+        'draft': int(np.sum(result['failing_floors'] == 0)),
+    }
+
+
+def evaluate_blocks(tasks) -> list:
+    return [evaluate_block(task) for task in tasks]
+
+
+def search(space, samples=SAMPLES, jobs=None, seed=0, block_size=BLOCK_SIZE, progress=None) -> dict:
+    # the whole space if it has at most `samples` designs, otherwise a uniform sample of them
+    size = space_size(space)
+    if size <= samples:
+        index = np.arange(size, dtype=np.int64)
+    else:
+        index = np.sort(np.random.default_rng(seed).choice(size, samples, replace=False))
+    tasks = [(space, index[begin:begin + block_size]) for begin in range(0, len(index), block_size)]
+
+    parts, evaluated, draft = [], 0, 0
+    for part in run(tasks, jobs, chunk_size=1, worker=evaluate_blocks):
+        parts.append(part)
+        evaluated += part['evaluated']
+        draft += part['draft']
+        if progress is not None:
+            progress(evaluated, len(index))
+
+    merged = {
+        key: np.concatenate([part[key] for part in parts]) if parts else np.empty(0)
+        for key in ('index', 'area', 'min_margin', 'failing_floors')
+    }
+    front = pareto(merged['index'], merged['area'], merged['min_margin']) if parts else []
+    designs = []
+    for i in front:
+        item = design(space, merged['index'][i])
+        item.update({
+            'area': round(float(merged['area'][i]), 6),
+            'min_margin': float(merged['min_margin'][i]),
+            'failing_floors': int(merged['failing_floors'][i]),
+        })
+        designs.append(item)
+    return {'front': designs, 'evaluated': evaluated, 'size': size, 'draft': draft}
+
+
+def design_text(item) -> str:
+    cap = item['cap'] if item['cap_relation'] is None else f'{item["cap"]} {item["cap_relation"]}'
+    main = section_text({'a': item['main'][0], 'b': item['main'][1]})
+    sputnik = section_text({'a': item['sputnik'][0], 'b': item['sputnik'][1]})
+    return f'{cap}; {item["klapan"].replace(chr(10), " ")}; канал {main}; спутник {sputnik}'
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m airsystem.search',
+        description='Поиск сочетаний оголовка, клапана и сечений: фронт Парето площади и запаса давления',
+    )
+    parser.add_argument('project')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='число процессов')
+    parser.add_argument('--samples', type=int, default=SAMPLES, help='сколько вариантов считать, если их больше')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--wind', type=float, default=None, help='скорость ветра, чтобы включить дефлектор, м/с')
+    args = parser.parse_args(argv)
+
+    space = make_space(load_project(args.project), wind_velocity=args.wind)
+
+    def progress(done, total):
+        print(f'\r{done}/{total}', end='', file=sys.stderr, flush=True)
+
+    result = search(space, args.samples, args.jobs, args.seed, progress=progress)
+    print(file=sys.stderr)
+    print(
+        f'Вариантов: {result["size"]}, рассчитано: {result["evaluated"]}, '
+        f'с тягой на всех этажах: {result["draft"]}, на фронте Парето: {len(result["front"])}'
+    )
+    for item in result['front']:
+        print(f'F={item["area"]:.4f} м2  запас {item["min_margin"]:8.3f} Па  {design_text(item)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,265 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict
+from http import HTTPStatus
+
+from airsystem.engine import cache_info, evaluate
+from airsystem.project import read_project
+from airsystem.vector import evaluate_projects
+
+
+HOST = '127.0.0.1'
+PORT = 8765
+MAX_BODY = 4 * 1_024 * 1_024
+BATCH_WINDOW = 0.005
+BATCH_SIZE = 64
+CACHE_SIZE = 1_024
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.batch_sizes = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+    def observe_request(self, seconds, failed) -> None:
+        self.requests += 1
+        self.errors += failed
+        self.latency_sum += seconds
+        i = 0
+        while i < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[i]:
+            i += 1
+        self.latency[i] += 1
+
+
+    def observe_batch(self, size) -> None:
+        self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+
+
+    def to_dict(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), self.latency):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'uptime': round(time.time() - self.started, 3),
+            'requests': self.requests,
+            'errors': self.errors,
+            'latency_seconds': {'buckets': buckets, 'sum': round(self.latency_sum, 6), 'count': self.requests},
+            'batch_sizes': {str(size): self.batch_sizes[size] for size in sorted(self.batch_sizes)},
+            'cache': {
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'hit_rate': round(self.cache_hits / lookups, 4) if lookups else None,
+            },
+            'engine_cache': cache_info(),
+        }
+
+
+def evaluate_batch(projects) -> list:
+    # the projects with the same number of floors in one vectorized call, bit-identical to the engine;
+    # if that fails, one by one so that only the broken project gets an error
+    try:
+        return [(True, result) for result in evaluate_projects(projects)]
+    except Exception:
+        pass
+    results = []
+    for project in projects:
+        try:
+            results.append((True, evaluate(project)))
+        except Exception as e:
+            results.append((False, f'{type(e).__name__}: {e}'))
+    return results
+
+
+class Batcher:
+    # concurrent requests are queued for a few milliseconds and evaluated together in one worker call,
+    # identical projects within a batch and recently seen ones are evaluated only once
+    def __init__(self, metrics, window=BATCH_WINDOW, size=BATCH_SIZE, cache_size=CACHE_SIZE) -> None:
+        self.metrics = metrics
+        self.window = window
+        self.size = size
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.queue = asyncio.Queue()
+
+
+    async def evaluate(self, project) -> tuple:
+        key = json.dumps(project, sort_keys=True, ensure_ascii=False)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.metrics.cache_hits += 1
+            return self.cache[key]
+        self.metrics.cache_misses += 1
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((key, project, future))
+        return await future
+
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            unique = OrderedDict()
+            for key, project, _ in batch:
+                unique.setdefault(key, project)
+            self.metrics.observe_batch(len(unique))
+            results = await loop.run_in_executor(None, evaluate_batch, list(unique.values()))
+            results = dict(zip(unique, results))
+            for key, result in results.items():
+                if result[0]:
+                    self.cache[key] = result
+                    self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            for key, _, future in batch:
+                if not future.done():
+                    future.set_result(results[key])
+
+
+class Server:
+    def __init__(self, host=HOST, port=PORT) -> None:
+        self.host = host
+        self.port = port
+        self.metrics = Metrics()
+        self.batcher = None
+
+
+    async def serve(self) -> None:
+        self.batcher = Batcher(self.metrics)
+        batcher_task = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        address = server.sockets[0].getsockname()
+        print(f'Сервис расчёта: http://{address[0]}:{address[1]}', file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher_task.cancel()
+
+
+    async def handle_connection(self, reader, writer) -> None:
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                started = time.perf_counter()
+                status, payload = await self.dispatch(method, path, body)
+                self.metrics.observe_request(time.perf_counter() - started, status >= 400)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            await write_response(writer, HTTPStatus.BAD_REQUEST, {'error': str(e)}, False)
+        finally:
+            writer.close()
+
+
+    async def dispatch(self, method, path, body) -> tuple:
+        path = path.split('?', 1)[0]
+        if path == '/metrics':
+            if method != 'GET':
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': method}
+            return HTTPStatus.OK, self.metrics.to_dict()
+        if path == '/evaluate':
+            if method != 'POST':
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': method}
+            return await self.evaluate(body)
+        return HTTPStatus.NOT_FOUND, {'error': path}
+
+
+    async def evaluate(self, body) -> tuple:
+        # one project or a list of projects, each in the save format of the program or already normalized
+        try:
+            data = json.loads(body)
+            many = isinstance(data, list)
+            projects = [read_project(item) for item in (data if many else [data])]
+        except Exception as e:
+            # valid JSON of a wrong shape fails anywhere in the parser, e.g. .get on a list
+            return HTTPStatus.BAD_REQUEST, {'error': f'{type(e).__name__}: {e}'}
+
+        results = await asyncio.gather(*(self.batcher.evaluate(project) for project in projects))
+        payload = [result if ok else {'error': result} for ok, result in results]
+        status = HTTPStatus.OK if all(ok for ok, _ in results) else HTTPStatus.UNPROCESSABLE_ENTITY
+        return status, payload if many else payload[0]
+
+
+async def read_request(reader) -> object:
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, path, _ = line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise ValueError('bad request line')
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length') or 0)
+    if length > MAX_BODY:
+        raise ValueError('request body is too large')
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+
+async def write_response(writer, status, payload, keep_alive) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    status = HTTPStatus(status)
+    head = (
+        f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+        'Content-Type: application/json; charset=utf-8\r\n'
+        f'Content-Length: {len(body)}\r\n'
+        f'Connection: {"keep-alive" if keep_alive else "close"}\r\n'
+        '\r\n'
+    )
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m airsystem.server',
+        description='Локальный HTTP-сервис расчёта: POST /evaluate, GET /metrics',
+    )
+    parser.add_argument('--port', type=int, default=PORT)
+    args = parser.parse_args(argv)
+    try:
+        # no authentication, so the service listens on the loopback address only
+        asyncio.run(Server(HOST, args.port).serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+import sys
+import math
+import argparse
+
+import numpy as np
+
+from airsystem import reference, vector
+from airsystem.project import load_project
+
+OPTIONS = 5
+SECTORS = {'one_side': '1-2', 'two_side': '1*-2*'}
+# the cap height field takes 0…2 m with two decimals
+CAP_HEIGHT_MAX = 2.0
+CAP_HEIGHT_STEP = 0.01
+
+
+def area(a, b) -> float:
+    # m², b None is a round channel of diameter a
+    if b is None:
+        return math.pi * pow(a / 1_000, 2) / 4
+    return a * b / 1_000_000
+
+
+def margins(full, available) -> tuple:
+    # per shaft: the smallest Ррасп - ΔP over the floors and the number of floors without draft
+    with np.errstate(invalid='ignore'):
+        margin = available - full
+        failing = np.sum(~(available > full), axis=1)
+    known = np.isfinite(margin)
+    lowest = np.where(known.any(axis=1), np.min(np.where(known, margin, np.inf), axis=1), np.nan)
+    return vector.py_round(lowest, 3), failing
+
+
+def repeated(project, count) -> tuple:
+    # evaluate_arrays input with the project repeated once per candidate
+    if not project['rows']:
+        raise ValueError('project has no floors')
+    scalars, rows = vector.project_arrays([project])
+    scalars = {key: np.repeat(value, count) for key, value in scalars.items()}
+    rows = {key: np.repeat(value, count, axis=0) for key, value in rows.items()}
+    return scalars, rows
+
+
+def size_arrays(sizes) -> tuple:
+    a = np.array([size[0] for size in sizes], dtype=np.float64)
+    b = np.array([np.nan if size[1] is None else size[1] for size in sizes], dtype=np.float64)
+    return a, b
+
+
+def summary(sizes, floor, velocity) -> list:
+    lowest, failing = margins(floor['full_pressure'], floor['available_pressure'])
+    return [
+        {
+            'a': size[0],
+            'b': size[1],
+            'area': round(area(*size), 6),
+            'velocity': None if np.isnan(velocity[i]) else float(velocity[i]),
+            'min_margin': None if np.isnan(lowest[i]) else float(lowest[i]),
+            'failing_floors': int(failing[i]),
+            'draft': bool(failing[i] == 0),
+        }
+        for i, size in enumerate(sizes)
+    ]
+
+
+def choose(results, options) -> dict:
+    # the smallest section with draft on every floor and the next ones by area;
+    # if none has it, the sections closest to it by the smallest margin
+    passing = sorted((item for item in results if item['draft']), key=lambda item: (item['area'], item['a']))
+    if passing:
+        return {'best': passing[0], 'options': passing[1:options + 1], 'evaluated': len(results)}
+    closest = sorted(
+        results,
+        key=lambda item: (item['min_margin'] is None, -(item['min_margin'] or 0), item['area']),
+    )
+    return {'best': None, 'options': closest[:options], 'evaluated': len(results)}
+
+
+def evaluate_sections(project, sizes) -> list:
+    # every size on the main channel of the project, in one vectorized batch
+    scalars, rows = repeated(project, len(sizes))
+    rows = vector.main_section(rows, *size_arrays(sizes))
+    _, floor = vector.evaluate_arrays(scalars, rows)
+    return summary(sizes, floor, floor['velocity'][:, -1])
+
+
+def size_main_channel(project, sizes=reference.CHANNEL_SIZES, options=OPTIONS) -> dict:
+    return choose(evaluate_sections(project, sizes), options)
+
+
+def sputnik_lengths(project, sides) -> dict:
+    # an empty length is taken as one typical floor, the satellite joins the shaft a floor above
+    lengths = {}
+    for side in ('one_side', 'two_side')[:sides]:
+        length = project[side]['length']
+        lengths[side] = length if length is not None else project['floor_height']
+    return lengths
+
+
+def evaluate_sputnik_sections(project, sizes, sides=None) -> tuple:
+    # every size on the satellite (one- or two-sided block) against the current main channel
+    sides = sides or project['sides']
+    if sides == 2 and project['two_side']['flow'] is None:
+        raise ValueError('two-sided block without the flow of 1*-2*')
+    lengths = sputnik_lengths(project, sides)
+    scalars, rows = repeated(project, len(sizes))
+    scalars['sides'] = np.full(len(sizes), float(sides))
+    for side, length in lengths.items():
+        scalars[f'{side}_length'] = np.full(len(sizes), np.nan if length is None else float(length))
+    scalars['one_side_a'], scalars['one_side_b'] = size_arrays(sizes)
+    shaft, floor = vector.evaluate_arrays(scalars, rows)
+    velocity = shaft['sputnik_one_side_velocity']
+    if sides == 2:
+        velocity = np.fmax(velocity, shaft['sputnik_two_side_velocity'])
+    return summary(sizes, floor, velocity), lengths
+
+
+def size_sputnik(project, sizes=reference.CHANNEL_SIZES, sides=None, options=OPTIONS) -> dict:
+    results, lengths = evaluate_sputnik_sections(project, sizes, sides)
+    return {**choose(results, options), 'sides': sides or project['sides'], 'lengths': lengths}
+
+
+def rank_valves(project, items=reference.KLAPAN_ITEMS) -> list:
+    # every catalog valve on the current shaft, the best worst-floor margin first
+    names = [name for name, capacity in items.items() if isinstance(capacity, (int, float))]
+    if not names:
+        return []
+    scalars, rows = repeated(project, len(names))
+    scalars['klapan_capacity'] = np.array([items[name] for name in names], dtype=np.float64)
+    shaft, floor = vector.evaluate_arrays(scalars, rows)
+    lowest, _ = margins(floor['full_pressure'], floor['available_pressure'])
+    draft_floors = np.sum(floor['draft'] == 1, axis=1)
+    loss = shaft['sputnik_klapan_pressure_loss']
+    ranking = [
+        {
+            'klapan': name,
+            'capacity': items[name],
+            'klapan_pressure_loss': None if np.isnan(loss[i]) else float(loss[i]),
+            'min_margin': None if np.isnan(lowest[i]) else float(lowest[i]),
+            'draft_floors': int(draft_floors[i]),
+            'floors': len(project['rows']),
+        }
+        for i, name in enumerate(names)
+    ]
+    ranking.sort(key=lambda item: (item['min_margin'] is None, -(item['min_margin'] or 0), -item['draft_floors']))
+    return ranking
+
+
+def cap_heights(project, max_height=CAP_HEIGHT_MAX, tolerance=0.0) -> dict:
+    # every h of the field up to max_height on the current shaft in one vectorized batch; Роголовка goes down
+    # with h/Do, the lowest h within tolerance of the smallest Роголовка is the best one
+    if project['cap'] not in reference.CAP_TYPES[2:4]:
+        raise ValueError('cap height only for the umbrella and the flat screen')
+    if len(project['rows']) < 2:
+        raise ValueError('cap needs at least two floors')
+    heights = vector.py_round(np.arange(round(max_height / CAP_HEIGHT_STEP) + 1) * CAP_HEIGHT_STEP, 2)
+    scalars, rows = repeated(project, len(heights))
+    scalars['cap_h'] = heights
+    shaft, floor = vector.evaluate_arrays(scalars, rows)
+    diameter = floor['diameter'][:, 1]
+    kms = vector.shaft_cap_kms(scalars, diameter)
+    cap = shaft['cap_pressure']
+    lowest, failing = margins(floor['full_pressure'], floor['available_pressure'])
+    items = [
+        {
+            'h': float(h),
+            'relation': None if not diameter[i] else round(float(h / diameter[i]), 2),
+            'kms': None if np.isnan(kms[i]) else float(kms[i]),
+            'cap_pressure': None if np.isnan(cap[i]) else float(cap[i]),
+            'min_margin': None if np.isnan(lowest[i]) else float(lowest[i]),
+            'failing_floors': int(failing[i]),
+            'draft': bool(failing[i] == 0),
+        }
+        for i, h in enumerate(heights)
+    ]
+    known = np.isfinite(cap)
+    best = None
+    if known.any():
+        best = items[int(np.flatnonzero(known & (cap <= np.nanmin(cap) + tolerance))[0])]
+    draft = next((item for item in items if item['draft'] and item['cap_pressure'] is not None), None)
+    return {'best': best, 'draft': draft, 'heights': items}
+
+
+def cap_height_text(item) -> str:
+    return (
+        f'h={item["h"]:.2f} м  h/Do={item["relation"]:.2f}  ζ={item["kms"]:.2f}  '
+        f'Pоголовка={item["cap_pressure"]:.3f} Па  запас {item["min_margin"]:.3f} Па  без тяги: {item["failing_floors"]}'
+    )
+
+
+def section_text(item) -> str:
+    return f'⌀{item["a"]:g}' if item['b'] is None else f'{item["a"]:g}×{item["b"]:g}'
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m airsystem.sizing',
+        description='Подбор сечения основного канала или канала-спутника по каталогу типовых размеров',
+    )
+    parser.add_argument('project')
+    parser.add_argument('-n', '--options', type=int, default=OPTIONS, help='сколько следующих вариантов вывести')
+    parser.add_argument('--sputnik', action='store_true', help='подобрать сечение канала-спутника')
+    parser.add_argument('--sides', type=int, choices=(1, 2), default=None, help='одно- или двухсторонний блок')
+    parser.add_argument('--klapan', action='store_true', help='сравнить все приточные клапаны каталога')
+    parser.add_argument('--cap', action='store_true', help='подобрать высоту h зонта или плоского экрана')
+    parser.add_argument('--max-height', type=float, default=CAP_HEIGHT_MAX, help='наибольшая высота h, м')
+    parser.add_argument('--tolerance', type=float, default=0.0, help='допуск к наименьшим потерям на оголовке, Па')
+    args = parser.parse_args(argv)
+
+    project = load_project(args.project)
+    if args.cap:
+        result = cap_heights(project, args.max_height, args.tolerance)
+        if result['best'] is None:
+            print('Потери на оголовке не определены ни при одной высоте h')
+            return 2
+        print(f'Наименьшие потери на оголовке:\n{cap_height_text(result["best"])}')
+        if result['draft'] is None:
+            print('Ни одна высота h не даёт тягу на всех этажах')
+        else:
+            print(f'Наименьшая высота с тягой на всех этажах:\n{cap_height_text(result["draft"])}')
+        return 0
+    if args.klapan:
+        for item in rank_valves(project):
+            margin = '-' if item['min_margin'] is None else f'{item["min_margin"]:.3f}'
+            print(
+                f'{margin:>9} Па  с тягой {item["draft_floors"]} из {item["floors"]}  '
+                f'Lкл={item["capacity"]:g} м3/ч  {item["klapan"].replace(chr(10), " ")}'
+            )
+        return 0
+    if args.sputnik:
+        result = size_sputnik(project, sides=args.sides, options=args.options)
+        block = 'односторонний' if result['sides'] == 1 else 'двухсторонний'
+        lengths = ', '.join(
+            f'{SECTORS[side]}: {length:g} м' for side, length in result['lengths'].items() if length is not None
+        )
+        print(f'Канал-спутник, блок {block}, длины участков {lengths}')
+    else:
+        result = size_main_channel(project, options=args.options)
+    if result['best'] is None:
+        print(f'Из {result["evaluated"]} сечений ни одно не даёт тягу на всех этажах, ближайшие:')
+    else:
+        print(f'Наименьшее сечение с тягой на всех этажах (из {result["evaluated"]}):')
+    for item in ([result['best']] if result['best'] else []) + result['options']:
+        margin = '-' if item['min_margin'] is None else f'{item["min_margin"]:.3f}'
+        print(
+            f'{section_text(item):>10} мм  F={item["area"]:.4f} м2  '
+            f'запас {margin} Па  без тяги: {item["failing_floors"]}'
+        )
+    return 0 if result['best'] else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import numpy as np
+
+from airsystem import engine, reference, vector
+from airsystem.sizing import repeated, size_arrays
+from airsystem.vector import nan_where
+
+# catalog sizes next to a typed a×b with v, R and the worst-floor margin, looked up in an index
+# of the per-size floor losses; the index is rebuilt only when its inputs change, the current
+# calculation of the other floors in it is refreshed on any other change of the project
+COUNT = 8
+
+
+def index_key(project) -> tuple:
+    # everything the per-size values depend on: tв, Kэ and the flows, also the floor heights (ΔPл)
+    # and the satellite section and flow (Рбок), the cap (ζ of Роголовка goes with h/Do)
+    return (
+        project['temperature'],
+        project['surface'],
+        tuple(engine.shaft_flows(project)),
+        tuple(row['floor_height'] for row in project['rows']),
+        project['sides'],
+        tuple(project[side][key] for side in ('one_side', 'two_side') for key in ('flow', 'a', 'b')),
+        (project['cap'], project['cap_h'], project['cap_relation']),
+    )
+
+
+def current_values(project) -> dict:
+    # the floors outside the edited zone keep their sections and losses from the current calculation;
+    # they do not depend on the sections of the zone, so typing in it does not make them stale
+    current = engine.evaluate(project)
+    floors = current['floors']
+    values = lambda key: np.array([np.nan if f[key] is None else f[key] for f in floors], dtype=np.float64)
+    top = floors[0]
+    parts = (top['linear_pressure_loss'], top['pass_pressure'], top['branch_pressure'])
+    klapan = current['sputnik']['pressure']
+    return {
+        'project': project,
+        'current_loss': np.nan_to_num(values('pass_pressure'), nan=0.0) + np.nan_to_num(values('linear_pressure_loss'), nan=0.0),
+        'current_branch': values('branch_pressure'),
+        'available': values('available_pressure'),
+        'klapan': np.nan if klapan is None else klapan,
+        'current_cap': float(current['cap_pressure'] or 0),
+        'top_loss': np.nan if None in parts else parts[2] + parts[1] + parts[0],
+    }
+
+
+def update_index(index, project) -> dict:
+    return {**index, **current_values(project)}
+
+
+def build_index(project, sizes=reference.CHANNEL_SIZES) -> dict:
+    # every size on every floor below the top one in one vectorized pass
+    sizes = list(sizes)
+    scalars, rows = repeated(project, len(sizes))
+    rows = vector.main_section(rows, *size_arrays(sizes))
+    _, floor = vector.evaluate_arrays(scalars, rows)
+    loss = np.nan_to_num(floor['pass_pressure'], nan=0.0) + np.nan_to_num(floor['linear_pressure_loss'], nan=0.0)
+    return {
+        'key': index_key(project),
+        'sizes': sizes,
+        'velocity': floor['velocity'],
+        'specific_pressure_loss': floor['specific_pressure_loss'],
+        'loss': loss,
+        'branch': floor['branch_pressure'],
+        # Роголовка comes from the floor below the top one
+        'cap_velocity': nan_where(np.isfinite(floor['diameter'][:, 1]), floor['velocity'][:, 1]),
+        'cap_kms': vector.shaft_cap_kms(scalars, floor['diameter'][:, 1]),
+        **current_values(project),
+    }
+
+
+def nearby(sizes, a, b, field) -> list:
+    # sizes whose typed side starts with the text first, then by the distance to a×b
+    text = f'{(a if field == "a" else b):g}'
+
+    def rank(i):
+        size_a, size_b = sizes[i]
+        side = size_a if field == 'a' or size_b is None else size_b
+        distance = abs(size_a - a) + (abs((size_a if size_b is None else size_b) - b) if b is not None else 0)
+        return not f'{side:g}'.startswith(text), distance, i
+
+    return sorted(range(len(sizes)), key=rank)
+
+
+def suggest(index, rows, a, b=None, field='a', count=COUNT) -> list:
+    # rows: project rows (top floor first) that get the size, e.g. one zone of the main channel;
+    # only reads the index, nothing is calculated per keystroke
+    n = len(index['available'])
+    rows = sorted(rows)
+    if not rows or rows[0] < 1 or rows[-1] >= n:
+        raise ValueError('rows of the main channel below the top floor')
+    mask = np.zeros(n, dtype=bool)
+    mask[rows] = True
+    loss = np.where(mask, index['loss'], index['current_loss'])
+    branch = np.where(mask, index['branch'], index['current_branch'])
+
+    cap = np.full(len(index['sizes']), index['current_cap'])
+    temperature = index['project']['temperature']
+    if mask[1] and temperature is not None:
+        v = index['cap_velocity']
+        cap = np.nan_to_num(vector.py_round(index['cap_kms'] * (353 / (273.15 + temperature)) * np.power(v, 2) / 2, 3))
+
+    full = np.full((len(index['sizes']), n), np.nan)
+    full[:, 1:] = vector.py_round(index['klapan'] + branch[:, 1:] + np.cumsum(loss[:, 1:], axis=1) + cap[:, None], 3)
+    if not np.isnan(index['top_loss']):
+        full[:, 0] = vector.py_round(index['top_loss'] + cap, 3)
+    margin = index['available'] - full
+    known = np.isfinite(margin)
+    lowest = np.where(known.any(axis=1), np.min(np.where(known, margin, np.inf), axis=1), np.nan)
+    failing = np.sum(~(index['available'] > full), axis=1)
+
+    row = rows[-1]
+    result = []
+    for i in nearby(index['sizes'], a, b, field)[:count]:
+        size_a, size_b = index['sizes'][i]
+        velocity, r = index['velocity'][i, row], index['specific_pressure_loss'][i, row]
+        result.append({
+            'a': size_a,
+            'b': size_b,
+            'velocity': None if np.isnan(velocity) else float(velocity),
+            'specific_pressure_loss': None if np.isnan(r) else float(r),
+            'min_margin': None if np.isnan(lowest[i]) else round(float(lowest[i]), 3),
+            'failing_floors': int(failing[i]),
+        })
+    return result
@@ -0,0 +1,227 @@
+import sys
+import math
+import time
+import argparse
+import itertools
+
+import numpy as np
+
+from airsystem import engine, vector
+from airsystem.project import load_project
+from airsystem.sizing import repeated
+
+# a polynomial of ΔP and Ррасп of every floor over tв, a×b of the main channel, Hш and Lкл,
+# least squares on vectorized evaluations; outside its box the exact calculation is used
+INPUTS = ('temperature', 'a', 'b', 'shaft_height', 'klapan_flow')
+# the velocity goes with 1 / (a·b), the polynomial is in 1/a and 1/b
+RECIPROCAL = ('a', 'b')
+DEGREE = 4
+# ζ of the branch jumps where Fс/Fк crosses 0.35, the terms up to this degree get a second set for the far side
+SWITCH = 0.35
+SWITCH_DEGREE = 2
+SAMPLES = 6_000
+CHECKS = 3_000
+OUTPUTS = ('full_pressure', 'available_pressure')
+
+
+def project_inputs(project) -> dict:
+    # the bottom row has the section of the main channel, b None is round and is not an input
+    row = project['rows'][-1]
+    values = {
+        'temperature': project['temperature'],
+        'a': row['a'],
+        'b': row['b'],
+        'shaft_height': project['shaft_height'],
+        'klapan_flow': project['klapan_flow'],
+    }
+    return {name: float(value) for name, value in values.items() if value is not None}
+
+
+def default_domain(project) -> dict:
+    # tв ± 10 °C, sides from 0.6 to 1.6 times inside the m table, Hш ± 20 % with room for the top floor, Lкл ± 50 %
+    values = project_inputs(project)
+    heights = [project['floor_height'] if row['floor_height'] is None else row['floor_height'] for row in project['rows'][1:]]
+    floors = 0 if None in heights else sum(heights)
+    domain = {}
+    for name, value in values.items():
+        if name == 'temperature':
+            domain[name] = (value - 10, value + 10)
+        elif name in ('a', 'b'):
+            domain[name] = (max(100.0, value * 0.6), min(1_500.0, value * 1.6))
+        elif name == 'shaft_height':
+            domain[name] = (max(value * 0.8, floors), value * 1.2)
+        else:
+            domain[name] = (value * 0.5, value * 1.5)
+    return domain
+
+
+def with_inputs(project, values) -> dict:
+    # a copy of the project with the inputs, a×b goes to every floor of the main channel
+    project = {**project, 'rows': [dict(row) for row in project['rows']]}
+    for name in ('temperature', 'shaft_height', 'klapan_flow'):
+        if name in values:
+            project[name] = values[name]
+    first = 1 if len(project['rows']) > 1 else 0
+    for row in project['rows'][first:]:
+        if 'a' in values:
+            row['a'] = values['a']
+        if 'b' in values:
+            row['b'] = values['b']
+    return project
+
+
+def evaluate_inputs(project, names, points) -> np.ndarray:
+    # exact ΔP and Ррасп for the rows of points, (m, 2 × floors)
+    scalars, rows = repeated(project, len(points))
+    values = dict(zip(names, points.T))
+    for name in ('temperature', 'shaft_height', 'klapan_flow'):
+        if name in values:
+            scalars[name] = values[name]
+    if 'a' in values or 'b' in values:
+        a = values.get('a', rows['a'][:, -1])
+        b = values.get('b', rows['b'][:, -1])
+        rows = vector.main_section(rows, a, b)
+    _, floor = vector.evaluate_arrays(scalars, rows)
+    return np.hstack([floor[name] for name in OUTPUTS])
+
+
+class Surrogate:
+    def __init__(self, project, domain, degree, coefficients, errors) -> None:
+        self.project = project
+        self.names = [name for name in INPUTS if name in domain]
+        self.domain = {name: tuple(domain[name]) for name in self.names}
+        self.degree = degree
+        self.coefficients = coefficients
+        self.errors = errors
+        self.floors = len(project['rows'])
+        self.powers = np.array(
+            [[terms.count(i) for i in range(len(self.names))]
+             for d in range(degree + 1)
+             for terms in itertools.combinations_with_replacement(range(len(self.names)), d)],
+            dtype=np.int64,
+        )
+        # the box in the transformed coordinates, mapped to [-1, 1]
+        low, high = [], []
+        for name in self.names:
+            start, stop = self.domain[name]
+            if name in RECIPROCAL:
+                start, stop = 1 / stop, 1 / start
+            low.append(start)
+            high.append(stop)
+        self.low, self.high = np.array(low), np.array(high)
+        self.reciprocal = np.array([name in RECIPROCAL for name in self.names])
+        # Fс of the satellite as the engine has it, None without a main channel input or a satellite section
+        sputnik = project['one_side']
+        self.sputnik_area = None
+        if 'a' in self.names and sputnik['a'] is not None:
+            self.sputnik_area = math.trunc(sputnik['a']) * math.trunc(sputnik['b'] or sputnik['a']) / 1_000_000
+        self.switch_terms = int(np.sum(self.powers.sum(axis=1) <= SWITCH_DEGREE))
+
+
+    @classmethod
+    def fit(cls, project, domain=None, degree=DEGREE, samples=SAMPLES, checks=CHECKS, seed=0) -> object:
+        domain = domain or default_domain(project)
+        names = [name for name in INPUTS if name in domain]
+        if not names:
+            raise ValueError('no inputs to vary')
+        rng = np.random.default_rng(seed)
+        low = np.array([domain[name][0] for name in names], dtype=np.float64)
+        high = np.array([domain[name][1] for name in names], dtype=np.float64)
+        train = low + (high - low) * rng.random((samples, len(names)))
+        target = evaluate_inputs(project, names, train)
+        if not np.isfinite(target).all():
+            raise ValueError('ΔP or Ррасп of some floors is not defined in the domain')
+
+        model = cls(project, domain, degree, None, None)
+        model.coefficients, *_ = np.linalg.lstsq(model.features(train), target, rcond=None)
+
+        check = low + (high - low) * rng.random((checks, len(names)))
+        exact = evaluate_inputs(project, names, check)
+        predicted = model.features(check) @ model.coefficients
+        error = np.abs(predicted - exact)
+        n = model.floors
+        full, available = exact[:, :n], exact[:, n:]
+        agree = np.mean(np.all((predicted[:, n:] > predicted[:, :n]) == (available > full), axis=1))
+        model.errors = {
+            'full_pressure': float(error[:, :n].max()),
+            'available_pressure': float(error[:, n:].max()),
+            'rms': float(np.sqrt(np.mean(error ** 2))),
+            'floors': error.max(axis=0).tolist(),
+            'draft_agreement': float(agree),
+            'checks': checks,
+        }
+        return model
+
+
+    def features(self, points) -> np.ndarray:
+        points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        values = np.where(self.reciprocal, 1 / points, points)
+        scaled = (2 * values - (self.low + self.high)) / (self.high - self.low)
+        terms = np.prod(scaled[:, None, :] ** self.powers[None, :, :], axis=2)
+        if self.sputnik_area is None:
+            return terms
+        a = points[:, self.names.index('a')]
+        b = points[:, self.names.index('b')] if 'b' in self.names else a
+        switched = self.sputnik_area / (np.trunc(a) * np.trunc(b) / 1_000_000) <= SWITCH
+        return np.hstack([terms, switched[:, None] * terms[:, :self.switch_terms]])
+
+
+    def inside(self, values) -> bool:
+        return all(self.domain[name][0] <= values[name] <= self.domain[name][1] for name in self.names)
+
+
+    def predict(self, values, exact=False) -> dict:
+        # ΔP and Ррасп of the floors, top floor first; exact outside the domain or on request
+        if exact or not self.inside(values):
+            floors = engine.evaluate(with_inputs(self.project, values))['floors']
+            result = {
+                name: np.array([np.nan if floor[name] is None else floor[name] for floor in floors])
+                for name in OUTPUTS
+            }
+            result['exact'] = True
+            return result
+        point = np.array([values[name] for name in self.names])
+        row = self.features(point)[0] @ self.coefficients
+        return {
+            'full_pressure': row[:self.floors],
+            'available_pressure': row[self.floors:],
+            'exact': False,
+        }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m airsystem.surrogate',
+        description='Полиномиальная модель ΔP и Ррасп шахты по tв, a×b, Hш и Lкл с проверкой по точному расчёту',
+    )
+    parser.add_argument('project')
+    parser.add_argument('--degree', type=int, default=DEGREE)
+    parser.add_argument('--samples', type=int, default=SAMPLES, help='точек для подгонки')
+    parser.add_argument('--checks', type=int, default=CHECKS, help='точек для проверки')
+    args = parser.parse_args(argv)
+
+    project = load_project(args.project)
+    started = time.perf_counter()
+    model = Surrogate.fit(project, degree=args.degree, samples=args.samples, checks=args.checks)
+    fitted = time.perf_counter() - started
+    for name in model.names:
+        low, high = model.domain[name]
+        print(f'{name:>13}: {low:g} … {high:g}')
+    errors = model.errors
+    print(
+        f'Подгонка: {args.samples} точек, {len(model.powers) + (model.switch_terms if model.sputnik_area else 0)} членов, {fitted:.2f} с\n'
+        f'Погрешность на {errors["checks"]} точках: ΔP ≤ {errors["full_pressure"]:.3f} Па, '
+        f'Ррасп ≤ {errors["available_pressure"]:.3f} Па, СКО {errors["rms"]:.4f} Па, '
+        f'тяга совпадает в {errors["draft_agreement"]:.1%}'
+    )
+    values = project_inputs(project)
+    count = 10_000
+    started = time.perf_counter()
+    for _ in range(count):
+        model.predict(values)
+    print(f'Расчёт по модели: {(time.perf_counter() - started) / count * 1e6:.0f} мкс')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,422 @@
+import os
+import csv
+import sys
+import json
+import argparse
+import itertools
+
+import numpy as np
+
+from airsystem import reference, vector
+from airsystem.project import load_project
+from airsystem.sizing import margins
+
+# a sweep directory: sweep.json (axes, base project, progress) and one .npy per output,
+# shaped (*axes, floors), opened as memory maps
+HEADER = 'sweep.json'
+AXES = ('temperature', 'a', 'b', 'shaft_height', 'klapan')
+# ΔP and Ррасп are rounded to 0.001 Pa, float32 keeps that up to 10^3 Pa
+OUTPUTS = ('full_pressure', 'available_pressure')
+DTYPE = 'float32'
+BLOCK_SIZE = 20_000
+# the adaptive study: a coarse grid with this step refined only where draft changes between neighbours
+ADAPTIVE_HEADER = 'adaptive.json'
+ADAPTIVE_AXES = ('temperature', 'a', 'b', 'shaft_height')
+COARSE = 8
+
+
+def parse_axis(name, text) -> list:
+    # '0:30:0.5' is a range with both ends included, '300,400,500' a list
+    if name == 'klapan':
+        if text == 'all':
+            return [key for key, value in reference.KLAPAN_ITEMS.items() if isinstance(value, (int, float))]
+        return [item.strip() for item in text.split(',') if item.strip()]
+    if ':' in text:
+        start, stop, step = (float(part) for part in text.split(':'))
+        if step <= 0 or stop < start:
+            raise ValueError(f'{name}: {text}')
+        count = int(round((stop - start) / step)) + 1
+        return [round(start + i * step, 6) for i in range(count)]
+    return [float(item) for item in text.split(',') if item.strip()]
+
+
+def klapan_capacity(name) -> float:
+    capacity = reference.KLAPAN_ITEMS.get(name)
+    if not isinstance(capacity, (int, float)):
+        raise ValueError(f'klapan without capacity: {name}')
+    return float(capacity)
+
+
+def write_header(path, header) -> None:
+    temp = f'{path}.tmp'
+    with open(temp, 'w', encoding='utf-8') as file:
+        json.dump(header, file, ensure_ascii=False, indent=1)
+    os.replace(temp, path)
+
+
+def axis_inputs(project, axes, values) -> tuple:
+    # evaluate_arrays input: the project once per configuration, values are {axis: positions on it}
+    base_scalars, base_rows = vector.project_arrays([project])
+    count = len(next(iter(values.values())))
+    scalars = {key: np.repeat(value, count) for key, value in base_scalars.items()}
+    rows = {key: np.repeat(value, count, axis=0) for key, value in base_rows.items()}
+    if 'temperature' in values:
+        scalars['temperature'] = np.asarray(axes['temperature'], dtype=np.float64)[values['temperature']]
+    if 'shaft_height' in values:
+        scalars['shaft_height'] = np.asarray(axes['shaft_height'], dtype=np.float64)[values['shaft_height']]
+    if 'klapan' in values:
+        capacities = np.array([klapan_capacity(name) for name in axes['klapan']])
+        scalars['klapan_capacity'] = capacities[values['klapan']]
+    if 'a' in values or 'b' in values:
+        # the main channel, the top floor keeps its own section
+        a = np.asarray(axes['a'], dtype=np.float64)[values['a']] if 'a' in values else rows['a'][:, -1]
+        b = np.asarray(axes['b'], dtype=np.float64)[values['b']] if 'b' in values else rows['b'][:, -1]
+        rows = vector.main_section(rows, a, b)
+    return scalars, rows
+
+
+class Sweep:
+    def __init__(self, directory, mode='r') -> None:
+        self.directory = directory
+        with open(os.path.join(directory, HEADER), encoding='utf-8') as file:
+            self.header = json.load(file)
+        self.axes = {axis['name']: axis['values'] for axis in self.header['axes']}
+        self.shape = tuple(len(values) for values in self.axes.values())
+        self.floors = self.header['floors']
+        self.arrays = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mode)
+            for name in self.header['outputs']
+        }
+
+
+    @classmethod
+    def create(cls, directory, project, axes) -> object:
+        # axes: {name: values} for some of AXES, the others keep the value of the project
+        if not axes:
+            raise ValueError('no axes')
+        unknown = set(axes) - set(AXES)
+        if unknown:
+            raise ValueError(f'unknown axes: {", ".join(sorted(unknown))}')
+        if not project['rows']:
+            raise ValueError('project has no floors')
+        for name in axes.get('klapan', ()):
+            klapan_capacity(name)
+        axes = [{'name': name, 'values': list(axes[name])} for name in AXES if name in axes]
+        shape = tuple(len(axis['values']) for axis in axes)
+        if 0 in shape:
+            raise ValueError('empty axis')
+        floors = len(project['rows'])
+
+        os.makedirs(directory, exist_ok=True)
+        for name in OUTPUTS:
+            array = np.lib.format.open_memmap(
+                os.path.join(directory, f'{name}.npy'), mode='w+', dtype=DTYPE, shape=shape + (floors,)
+            )
+            array[...] = np.nan
+            array.flush()
+            del array
+        write_header(os.path.join(directory, HEADER), {
+            'version': 1,
+            'axes': axes,
+            'floors': floors,
+            'outputs': list(OUTPUTS),
+            'dtype': DTYPE,
+            'project': project,
+            'done': 0,
+        })
+        return cls(directory, 'r+')
+
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape, dtype=np.int64))
+
+
+    @property
+    def done(self) -> int:
+        return self.header['done']
+
+
+    def inputs(self, begin, end) -> tuple:
+        # evaluate_arrays input of the configurations begin..end in C order of the axes
+        index = np.unravel_index(np.arange(begin, end), self.shape)
+        return axis_inputs(self.header['project'], self.axes, dict(zip(self.axes, index)))
+
+
+    def run(self, block_size=BLOCK_SIZE, progress=None) -> None:
+        # continues after the last finished block
+        flat = {name: array.reshape(-1, self.floors) for name, array in self.arrays.items()}
+        while self.done < self.size:
+            begin = self.done
+            end = min(begin + block_size, self.size)
+            _, floor = vector.evaluate_arrays(*self.inputs(begin, end))
+            for name in self.arrays:
+                flat[name][begin:end] = floor[name]
+                self.arrays[name].flush()
+            self.header['done'] = end
+            write_header(os.path.join(self.directory, HEADER), self.header)
+            if progress is not None:
+                progress(end, self.size)
+
+
+    def index(self, **values) -> tuple:
+        # axis values -> a slicing tuple, e.g. index(temperature=20, klapan='Norvind pro')
+        index = []
+        for name, axis in self.axes.items():
+            if name not in values:
+                index.append(slice(None))
+                continue
+            value = values.pop(name)
+            try:
+                index.append(axis.index(value))
+            except ValueError:
+                raise KeyError(f'{name}={value} is not on the axis') from None
+        if values:
+            raise KeyError(f'unknown axes: {", ".join(values)}')
+        return tuple(index)
+
+
+    def select(self, name, **values) -> np.ndarray:
+        return self.arrays[name][self.index(**values)]
+
+
+    def margin(self, **values) -> np.ndarray:
+        index = self.index(**values)
+        return self.arrays['available_pressure'][index] - self.arrays['full_pressure'][index]
+
+
+    def reduce(self, function, block_size=BLOCK_SIZE) -> np.ndarray:
+        # function(full, available) of (configurations, floors) blocks -> one value per configuration
+        full = self.arrays['full_pressure'].reshape(-1, self.floors)
+        available = self.arrays['available_pressure'].reshape(-1, self.floors)
+        result = np.empty(self.size, dtype=np.float64)
+        for begin in range(0, self.size, block_size):
+            end = min(begin + block_size, self.size)
+            result[begin:end] = function(np.asarray(full[begin:end]), np.asarray(available[begin:end]))
+        return result.reshape(self.shape)
+
+
+    def min_margin(self, block_size=BLOCK_SIZE) -> np.ndarray:
+        def minimum(full, available):
+            margin = available.astype(np.float64) - full
+            known = np.isfinite(margin)
+            # both sides have three decimals, rounding drops the float32 error
+            lowest = np.round(np.min(np.where(known, margin, np.inf), axis=1), 3)
+            return np.where(known.any(axis=1), lowest, np.nan)
+        return self.reduce(minimum, block_size)
+
+
+    def failing_floors(self, block_size=BLOCK_SIZE) -> np.ndarray:
+        return self.reduce(lambda full, available: np.sum(available <= full, axis=1), block_size)
+
+
+    def configuration(self, flat_index) -> dict:
+        index = np.unravel_index(flat_index, self.shape)
+        return {name: axis[int(i)] for (name, axis), i in zip(self.axes.items(), index)}
+
+
+def grid_positions(size, step) -> np.ndarray:
+    # every step-th position of an axis and its last one
+    return np.unique(np.r_[np.arange(0, size, step), size - 1])
+
+
+def cells_of(positions, corners) -> tuple:
+    # the cells between neighbouring corners that contain each position, a corner belongs to two
+    last = len(corners) - 2
+    left = np.clip(np.searchsorted(corners, positions, side='left') - 1, 0, last)
+    right = np.clip(np.searchsorted(corners, positions, side='right') - 1, 0, last)
+    return left, right
+
+
+def adaptive(project, axes, coarse=COARSE, block_size=BLOCK_SIZE, progress=None) -> dict:
+    # axes: {name: values} for some of ADAPTIVE_AXES, the fine grid of the study;
+    # draft of every point of the fine grid (1 with draft on every floor, 0 without), the margin where evaluated.
+    # The corners of a cell are evaluated, a cell with one outcome on every corner is taken as uniform
+    # and filled, a mixed one is split in two along every axis, down to the step of the fine grid;
+    # a region of the other outcome that fits between the coarse corners is not seen
+    if not axes:
+        raise ValueError('no axes')
+    unknown = set(axes) - set(ADAPTIVE_AXES)
+    if unknown:
+        raise ValueError(f'not adaptive axes: {", ".join(sorted(unknown))}')
+    if not project['rows']:
+        raise ValueError('project has no floors')
+    if coarse < 1 or coarse & (coarse - 1):
+        raise ValueError(f'coarse step must be a power of two: {coarse}')
+    names = [name for name in ADAPTIVE_AXES if name in axes]
+    values = {name: list(axes[name]) for name in names}
+    shape = tuple(len(values[name]) for name in names)
+    if 0 in shape:
+        raise ValueError('empty axis')
+
+    draft = np.full(shape, -1, dtype=np.int8)
+    margin = np.full(shape, np.nan, dtype=np.float32)
+    evaluated = 0
+    size = int(np.prod(shape, dtype=np.int64))
+
+    def evaluate(points):
+        nonlocal evaluated
+        for begin in range(0, len(points[0]), block_size):
+            index = tuple(axis[begin:begin + block_size] for axis in points)
+            _, floor = vector.evaluate_arrays(*axis_inputs(project, values, dict(zip(names, index))))
+            lowest, failing = margins(floor['full_pressure'], floor['available_pressure'])
+            draft[index] = failing == 0
+            margin[index] = lowest
+            evaluated += len(index[0])
+            if progress is not None:
+                progress(evaluated, size)
+
+    step = coarse
+    corners = [grid_positions(n, step) for n in shape]
+    evaluate(tuple(axis.ravel() for axis in np.meshgrid(*corners, indexing='ij')))
+    while step > 1:
+        outcome = draft[np.ix_(*corners)]
+        low, high = outcome, outcome
+        for axis in range(len(shape)):
+            if outcome.shape[axis] > 1:
+                low = np.minimum(low.take(range(low.shape[axis] - 1), axis), low.take(range(1, low.shape[axis]), axis))
+                high = np.maximum(high.take(range(high.shape[axis] - 1), axis), high.take(range(1, high.shape[axis]), axis))
+        mixed = low != high
+
+        step //= 2
+        positions = [grid_positions(n, step) for n in shape]
+        cells = [cells_of(position, corner) if len(corner) > 1 else (np.zeros(len(position), dtype=np.int64),) * 2
+                 for position, corner in zip(positions, corners)]
+        refine = np.zeros(tuple(len(position) for position in positions), dtype=bool)
+        for side in itertools.product((0, 1), repeat=len(shape)):
+            refine |= mixed[np.ix_(*(cell[i] for cell, i in zip(cells, side)))]
+
+        grid = np.ix_(*positions)
+        known = draft[grid] >= 0
+        # points only in uniform cells take the outcome of the cell, the others are evaluated
+        fill = ~refine & ~known
+        cell_outcome = low[np.ix_(*(cell[0] for cell in cells))]
+        part = draft[grid]
+        part[fill] = cell_outcome[fill]
+        draft[grid] = part
+        wanted = np.nonzero(refine & ~known)
+        evaluate(tuple(position[i] for position, i in zip(positions, wanted)))
+        corners = positions
+
+    return {'axes': values, 'draft': draft, 'margin': margin, 'evaluated': evaluated, 'size': size, 'coarse': coarse}
+
+
+def boundary(study) -> np.ndarray:
+    # the points of the fine grid next to one of the other outcome along some axis
+    draft = study['draft']
+    edge = np.zeros(draft.shape, dtype=bool)
+    for axis in range(draft.ndim):
+        if draft.shape[axis] < 2:
+            continue
+        lower = [slice(None)] * draft.ndim
+        upper = [slice(None)] * draft.ndim
+        lower[axis], upper[axis] = slice(None, -1), slice(1, None)
+        change = draft[tuple(lower)] != draft[tuple(upper)]
+        edge[tuple(lower)] |= change
+        edge[tuple(upper)] |= change
+    return np.argwhere(edge)
+
+
+def write_study(directory, project, study) -> int:
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, 'draft.npy'), study['draft'])
+    np.save(os.path.join(directory, 'margin.npy'), study['margin'])
+    points = boundary(study)
+    names = list(study['axes'])
+    with open(os.path.join(directory, 'boundary.csv'), 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(names + ['draft', 'min_margin'])
+        for point in points:
+            index = tuple(point)
+            writer.writerow(
+                [study['axes'][name][i] for name, i in zip(names, index)]
+                + [int(study['draft'][index]), f'{study["margin"][index]:.3f}']
+            )
+    write_header(os.path.join(directory, ADAPTIVE_HEADER), {
+        'version': 1,
+        'axes': [{'name': name, 'values': study['axes'][name]} for name in names],
+        'coarse': study['coarse'],
+        'evaluated': study['evaluated'],
+        'size': study['size'],
+        'boundary': len(points),
+        'project': project,
+    })
+    return len(points)
+
+
+def axis_arguments(parser, klapan=True) -> None:
+    parser.add_argument('--temperature', help='tв, например 0:30:1')
+    parser.add_argument('--a', help='сторона a основного канала, мм, например 300,400,500')
+    parser.add_argument('--b', help='сторона b основного канала, мм')
+    parser.add_argument('--shaft-height', dest='shaft_height', help='Hш, м, например 20:40:0.5')
+    if klapan:
+        parser.add_argument('--klapan', help='клапаны через запятую или all')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m airsystem.sweep', description='Перебор параметров шахты')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='создать перебор и рассчитать')
+    run_parser.add_argument('project')
+    run_parser.add_argument('directory')
+    axis_arguments(run_parser)
+    resume_parser = commands.add_parser('resume', help='продолжить прерванный расчёт')
+    resume_parser.add_argument('directory')
+    show_parser = commands.add_parser('show', help='лучшие варианты по запасу давления')
+    show_parser.add_argument('directory')
+    adapt_parser = commands.add_parser('adapt', help='граница тяги: грубая сетка, уточняемая у границы')
+    adapt_parser.add_argument('project')
+    adapt_parser.add_argument('directory')
+    axis_arguments(adapt_parser, klapan=False)
+    adapt_parser.add_argument('--coarse', type=int, default=COARSE, help='шаг грубой сетки в шагах осей, степень двойки')
+    for command in (run_parser, resume_parser, show_parser):
+        command.add_argument('--top', type=int, default=10, help='сколько лучших вариантов вывести')
+    args = parser.parse_args(argv)
+
+    def progress(done, size):
+        print(f'\r{done}/{size}', end='', file=sys.stderr, flush=True)
+
+    if args.command == 'adapt':
+        axes = {name: parse_axis(name, getattr(args, name)) for name in ADAPTIVE_AXES if getattr(args, name)}
+        project = load_project(args.project)
+        try:
+            study = adaptive(project, axes, args.coarse, progress=progress)
+        except ValueError as e:
+            parser.error(str(e))
+        print(file=sys.stderr)
+        points = write_study(args.directory, project, study)
+        print(
+            f'Точек сетки: {study["size"]} ({" × ".join(str(len(v)) for v in study["axes"].values())}), '
+            f'рассчитано: {study["evaluated"]} ({study["evaluated"] / study["size"]:.1%}), '
+            f'с тягой: {int(np.sum(study["draft"] == 1))}, на границе: {points}'
+        )
+        return 0
+    if args.command == 'run':
+        axes = {name: parse_axis(name, getattr(args, name)) for name in AXES if getattr(args, name)}
+        try:
+            sweep = Sweep.create(args.directory, load_project(args.project), axes)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        sweep = Sweep(args.directory, 'r+' if args.command == 'resume' else 'r')
+    if args.command != 'show':
+        sweep.run(progress=progress)
+        print(file=sys.stderr)
+
+    margin = sweep.min_margin().ravel()
+    failing = sweep.failing_floors().ravel()
+    order = np.argsort(np.where(np.isnan(margin), -np.inf, margin))[::-1]
+    print(
+        f'Вариантов: {sweep.size} ({" × ".join(map(str, sweep.shape))}), этажей: {sweep.floors}, '
+        f'с тягой на всех этажах: {int(np.sum(failing == 0))}'
+    )
+    for i in order[:args.top]:
+        values = ', '.join(
+            f'{name}={str(value).replace(chr(10), " ")}' for name, value in sweep.configuration(i).items()
+        )
+        print(f'{margin[i]:8.3f} Па  без тяги: {int(failing[i])}  {values}')
+    return 0 if sweep.done == sweep.size else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
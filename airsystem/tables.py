@@ -0,0 +1,396 @@
+import os
+import sys
+import csv
+import json
+import shutil
+import zipfile
+import argparse
+import tempfile
+import importlib.util
+
+import numpy as np
+
+from airsystem.batch import find_projects, run
+from airsystem.engine import evaluate
+from airsystem.project import load_project
+
+# one file per table: results.csv -> results_main.csv, results_sputnik.csv, results_shaft.csv
+TABLES = {
+    'main': (
+        'project', 'floor', 'floor_height', 'flow', 'height', 'gravi_pressure', 'deflector_pressure',
+        'available_pressure', 'pass_kms', 'branch_kms', 'a', 'b', 'velocity', 'diameter',
+        'specific_pressure_loss', 'm', 'linear_pressure_loss', 'dynamic', 'pass_pressure',
+        'branch_pressure', 'full_pressure', 'draft',
+    ),
+    'sputnik': (
+        'project', 'side', 'flow', 'length', 'a', 'b', 'kms', 'velocity', 'diameter',
+        'specific_pressure_loss', 'm', 'linear_pressure_loss', 'dynamic', 'local_pressure_loss',
+        'full_pressure_loss', 'result_pressure',
+    ),
+    'shaft': (
+        'project', 'floors', 'temperature', 'surface', 'floor_height', 'shaft_height', 'klapan',
+        'klapan_flow', 'klapan_capacity', 'klapan_pressure_loss', 'sides', 'sputnik_pressure',
+        'cap', 'cap_h', 'cap_relation', 'cap_pressure', 'wind_velocity',
+        'deflector_recommended_velocity', 'deflector_flow', 'deflector_required_square',
+        'deflector_diameter', 'deflector_real_velocity', 'deflector_velocity_relation',
+        'deflector_pressure_relation', 'deflector_pressure',
+    ),
+}
+TEXT = ('project', 'side', 'klapan', 'cap', 'cap_relation')
+BOOLEAN = ('draft', 'top_draft')
+DEFLECTOR = (
+    'recommended_velocity', 'flow', 'required_square', 'diameter',
+    'real_velocity', 'velocity_relation', 'pressure_relation', 'pressure',
+)
+CHUNK_SIZE = 100_000
+
+
+def kinds_of(columns) -> dict:
+    return {
+        name: 'text' if name in TEXT else 'bool' if name in BOOLEAN else 'float'
+        for name in columns
+    }
+
+
+def formats() -> tuple:
+    # pyarrow is loaded only by the Parquet writer, here it is only looked up
+    return ('csv', 'npz', 'parquet') if importlib.util.find_spec('pyarrow') is not None else ('csv', 'npz')
+
+
+def format_of(path) -> str:
+    fmt = os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt == 'pq':
+        fmt = 'parquet'
+    if fmt not in WRITERS:
+        raise ValueError(f'unknown format: {path}')
+    return fmt
+
+
+def table_path(path, table) -> str:
+    base, ext = os.path.splitext(path)
+    return f'{base}_{table}{ext}'
+
+
+def as_list(values) -> list:
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def floats(values) -> np.ndarray:
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+        return values.astype(np.float64, copy=False)
+    return np.array([np.nan if value is None else value for value in as_list(values)], dtype=np.float64)
+
+
+def booleans(values) -> list:
+    # True / False / None, the numpy form of vector.evaluate_arrays is 1 / 0 / NaN
+    return [None if value is None or value != value else bool(value) for value in as_list(values)]
+
+
+def texts(values) -> list:
+    return [None if value is None or value != value else str(value) for value in as_list(values)]
+
+
+class CsvWriter:
+    def __init__(self, path, columns) -> None:
+        self.columns = kinds_of(columns) if not isinstance(columns, dict) else columns
+        self.rows = 0
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.columns)
+
+
+    def write(self, chunk) -> None:
+        columns = []
+        for name, kind in self.columns.items():
+            if kind == 'text':
+                values = texts(chunk[name])
+            elif kind == 'bool':
+                values = [None if value is None else int(value) for value in booleans(chunk[name])]
+            else:
+                # repr of a float is exact, NaN is an empty cell
+                values = [None if value != value else value for value in floats(chunk[name]).tolist()]
+            columns.append(values)
+        rows = list(zip(*columns))
+        self.writer.writerows(rows)
+        self.rows += len(rows)
+
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class NpzWriter:
+    # every column is spooled to a temporary file, the archive is assembled on close:
+    # the shape of an .npy has to be known before its data
+    def __init__(self, path, columns, compressed=False) -> None:
+        self.path = path
+        self.columns = kinds_of(columns) if not isinstance(columns, dict) else columns
+        self.compression = zipfile.ZIP_DEFLATED if compressed else zipfile.ZIP_STORED
+        self.rows = 0
+        self.directory = tempfile.TemporaryDirectory(prefix='airsystem-')
+        self.files = {}
+        self.widths = dict.fromkeys(self.columns, 1)
+        for i, (name, kind) in enumerate(self.columns.items()):
+            spool = os.path.join(self.directory.name, str(i))
+            self.files[name] = open(spool, 'w', encoding='utf-8') if kind == 'text' else open(spool, 'wb')
+
+
+    def write(self, chunk) -> None:
+        count = None
+        for name, kind in self.columns.items():
+            if kind == 'text':
+                values = ['' if value is None else value for value in texts(chunk[name])]
+                self.widths[name] = max([self.widths[name]] + [len(value) for value in values])
+                self.files[name].writelines(json.dumps(value) + '\n' for value in values)
+            else:
+                values = floats(booleans(chunk[name]) if kind == 'bool' else chunk[name])
+                values.tofile(self.files[name])
+            count = len(values)
+        self.rows += count or 0
+
+
+    def dtype(self, name) -> np.dtype:
+        return np.dtype(f'<U{self.widths[name]}') if self.columns[name] == 'text' else np.dtype(np.float64)
+
+
+    def close(self) -> None:
+        for file in self.files.values():
+            file.close()
+        try:
+            with zipfile.ZipFile(self.path, 'w', self.compression, allowZip64=True) as archive:
+                for name in self.columns:
+                    with archive.open(f'{name}.npy', 'w', force_zip64=True) as member:
+                        self.copy(name, member)
+        finally:
+            self.directory.cleanup()
+
+
+    def copy(self, name, member) -> None:
+        dtype = self.dtype(name)
+        np.lib.format.write_array_header_2_0(member, {
+            'descr': np.lib.format.dtype_to_descr(dtype),
+            'fortran_order': False,
+            'shape': (self.rows,),
+        })
+        spool = self.files[name].name
+        if self.columns[name] != 'text':
+            with open(spool, 'rb') as file:
+                shutil.copyfileobj(file, member, 1 << 20)
+            return
+        with open(spool, encoding='utf-8') as file:
+            lines = []
+            for line in file:
+                lines.append(json.loads(line))
+                if len(lines) == CHUNK_SIZE:
+                    member.write(np.array(lines, dtype=dtype).tobytes())
+                    lines = []
+            if lines:
+                member.write(np.array(lines, dtype=dtype).tobytes())
+
+
+class ParquetWriter:
+    def __init__(self, path, columns) -> None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError('Parquet export needs pyarrow: pip install pyarrow') from None
+        self.pyarrow = pyarrow
+        self.columns = kinds_of(columns) if not isinstance(columns, dict) else columns
+        types = {'text': pyarrow.string(), 'bool': pyarrow.bool_(), 'float': pyarrow.float64()}
+        self.schema = pyarrow.schema([(name, types[kind]) for name, kind in self.columns.items()])
+        self.rows = 0
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+
+    def write(self, chunk) -> None:
+        arrays = []
+        for field in self.schema:
+            kind = self.columns[field.name]
+            if kind == 'text':
+                values = self.pyarrow.array(texts(chunk[field.name]), field.type)
+            elif kind == 'bool':
+                values = self.pyarrow.array(booleans(chunk[field.name]), field.type)
+            else:
+                # NaN is stored as null
+                values = self.pyarrow.array(floats(chunk[field.name]), field.type, from_pandas=True)
+            arrays.append(values)
+        table = self.pyarrow.Table.from_arrays(arrays, schema=self.schema)
+        self.writer.write_table(table)
+        self.rows += table.num_rows
+
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+WRITERS = {'csv': CsvWriter, 'npz': NpzWriter, 'parquet': ParquetWriter}
+
+
+def open_writer(path, columns, fmt=None) -> object:
+    return WRITERS[fmt or format_of(path)](path, columns)
+
+
+def project_tables(name, project, result) -> dict:
+    # rows of the three tables for one evaluated project, as columns
+    tables = {table: {column: [] for column in columns} for table, columns in TABLES.items()}
+    deflector = result['deflector'] or {}
+
+    main = tables['main']
+    for floor in result['floors']:
+        main['project'].append(name)
+        main['deflector_pressure'].append(deflector.get('pressure'))
+        for column in TABLES['main'][1:]:
+            if column != 'deflector_pressure':
+                main[column].append(floor[column])
+
+    sputnik = tables['sputnik']
+    sides = ('one_side',) if project['sides'] == 1 else ('one_side', 'two_side')
+    for side in sides:
+        values = {**project[side], **result['sputnik'][side]}
+        sputnik['project'].append(name)
+        sputnik['side'].append(side)
+        for column in TABLES['sputnik'][2:]:
+            sputnik[column].append(values[column])
+
+    shaft = {
+        'project': name,
+        'floors': len(result['floors']),
+        'klapan_pressure_loss': result['sputnik']['klapan_pressure_loss'],
+        'sputnik_pressure': result['sputnik']['pressure'],
+        'cap_pressure': result['cap_pressure'],
+        **{f'deflector_{key}': deflector.get(key) for key in DEFLECTOR},
+    }
+    for column in TABLES['shaft']:
+        tables['shaft'][column].append(shaft[column] if column in shaft else project[column])
+    return tables
+
+
+class Exporter:
+    def __init__(self, path, fmt=None, chunk_size=CHUNK_SIZE) -> None:
+        fmt = fmt or format_of(path)
+        self.chunk_size = chunk_size
+        self.paths = {table: table_path(path, table) for table in TABLES}
+        self.buffers = {}
+        self.writers = {}
+        self.closed = False
+        self.clear()
+        try:
+            for table, columns in TABLES.items():
+                self.writers[table] = open_writer(self.paths[table], columns, fmt)
+        except Exception:
+            self.close()
+            raise
+
+
+    def __enter__(self) -> object:
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+    def clear(self) -> None:
+        self.buffers = {table: {column: [] for column in columns} for table, columns in TABLES.items()}
+
+
+    def add(self, name, project, result) -> None:
+        self.add_tables(project_tables(name, project, result))
+
+
+    def add_tables(self, tables) -> None:
+        for table, columns in tables.items():
+            for column, values in columns.items():
+                self.buffers[table][column].extend(values)
+        if max(len(columns['project']) for columns in self.buffers.values()) >= self.chunk_size:
+            self.flush()
+
+
+    def flush(self) -> None:
+        for table, columns in self.buffers.items():
+            if columns['project'] and table in self.writers:
+                self.writers[table].write(columns)
+        self.clear()
+
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.flush()
+        finally:
+            for writer in self.writers.values():
+                writer.close()
+
+
+    def rows(self) -> dict:
+        return {table: writer.rows for table, writer in self.writers.items()}
+
+
+def write_frame(frame, path, fmt=None, chunk_size=CHUNK_SIZE) -> int:
+    # a pandas frame, e.g. of airsystem.frame, written slice by slice
+    columns = {}
+    for name, dtype in frame.dtypes.items():
+        if dtype.kind in 'OSU' or str(dtype) in ('string', 'str'):
+            columns[str(name)] = 'text'
+        elif dtype.kind == 'b' or str(dtype) == 'boolean':
+            columns[str(name)] = 'bool'
+        else:
+            columns[str(name)] = 'float'
+    writer = open_writer(path, columns, fmt)
+    try:
+        for begin in range(0, len(frame), chunk_size):
+            part = frame.iloc[begin:begin + chunk_size]
+            chunk = {}
+            for name, kind in zip(frame.columns, columns.values()):
+                values = part[name]
+                if kind == 'float':
+                    chunk[str(name)] = values.to_numpy(np.float64, na_value=np.nan)
+                else:
+                    chunk[str(name)] = values.astype(object).where(values.notna(), None).to_numpy()
+            writer.write(chunk)
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def evaluate_tables(paths) -> list:
+    records = []
+    for path in paths:
+        try:
+            project = load_project(path)
+            records.append(project_tables(path, project, evaluate(project)))
+        except Exception as e:
+            records.append({'file': path, 'error': f'{type(e).__name__}: {e}'})
+    return records
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m airsystem.tables',
+        description='Выгрузка результатов расчёта проектов (*.json) каталога в таблицы',
+    )
+    parser.add_argument('directory')
+    parser.add_argument('-o', '--output', required=True, help='results.csv, results.npz или results.parquet')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='число процессов')
+    parser.add_argument('--chunk', type=int, default=CHUNK_SIZE, help='строк в одной записи')
+    args = parser.parse_args(argv)
+
+    errors = 0
+    with Exporter(args.output, chunk_size=args.chunk) as exporter:
+        for record in run(find_projects(args.directory), args.jobs, worker=evaluate_tables):
+            if 'error' in record:
+                errors += 1
+                print(f'{record["file"]}: {record["error"]}', file=sys.stderr)
+                continue
+            exporter.add_tables(record)
+
+    for table, count in exporter.rows().items():
+        print(f'{exporter.paths[table]}: {count} строк', file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,507 @@
+import math
+
+import numpy as np
+
+from airsystem import reference
+
+
+# engine.evaluate over many shafts at once: arrays of shape (m,) hold one value per shaft,
+# arrays of shape (m, n) one value per floor with the top floor in column 0. None becomes NaN.
+# Every step is the engine's formula with the same operation order and rounding,
+# so each value is bit-identical to the scalar engine.
+
+SCALARS = (
+    'temperature', 'surface', 'floor_height', 'shaft_height', 'klapan_flow', 'klapan_capacity', 'sides',
+    'one_side_flow', 'one_side_length', 'one_side_a', 'one_side_b', 'one_side_kms',
+    'two_side_flow', 'two_side_length', 'two_side_kms', 'cap_kms', 'deflector', 'wind_velocity',
+    'cap_type', 'cap_h',
+)
+ROWS = ('floor_height', 'a', 'b', 'pass_kms')
+MU = 1.458 * pow(10, -6)
+# a rounding is redone with Python's round when the scaled value is this close to a half
+TIE = 1e-6
+
+
+def split(values) -> tuple:
+    # Veltkamp: values == high + low, each half fits in 26 bits
+    c = 134_217_729.0 * values
+    high = c - (c - values)
+    return high, values - high
+
+
+def exact_product(a, b) -> tuple:
+    # Dekker: a * b == product + error exactly
+    product = a * b
+    a_high, a_low = split(a)
+    b_high, b_low = split(b)
+    error = ((a_high * b_high - product) + a_high * b_low + a_low * b_high) + a_low * b_low
+    return product, error
+
+
+def py_round(values, digits) -> np.ndarray:
+    # Python's round(x, digits): numpy's result is the same double except next to a half,
+    # there the side of the half is decided on the exact product x * 10 ** digits
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** digits
+    with np.errstate(invalid='ignore', over='ignore'):
+        scaled = values * scale
+        result = np.round(scaled) / scale
+        ties = np.abs(scaled - np.floor(scaled) - 0.5) < TIE
+    ties &= np.isfinite(values)
+    if ties.any():
+        x = values[ties]
+        product, error = exact_product(x, np.full_like(x, scale))
+        half = np.floor(product) + 0.5
+        # product - half is exact (Sterbenz), the sign of a sum of two doubles is always right
+        side = (product - half) + error
+        low = np.floor(product)
+        even = np.where(np.fmod(low, 2) == 0, low, low + 1)
+        rounded = np.where(side > 0, low + 1, np.where(side < 0, low, even))
+        result[ties] = rounded / scale
+    return result
+
+
+def np_round(values, digits) -> np.ndarray:
+    scale = 10 ** digits
+    return np.round(values * scale) / scale
+
+
+def finite(*arrays) -> np.ndarray:
+    mask = np.isfinite(arrays[0])
+    for array in arrays[1:]:
+        mask = mask & np.isfinite(array)
+    return mask
+
+
+def nan_where(mask, values) -> np.ndarray:
+    return np.where(mask, values, np.nan)
+
+
+def density(temperature) -> np.ndarray:
+    return 353 / (273.15 + temperature)
+
+
+def air_velocity(flow, a, b) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rect = a * b / 1_000_000
+        circle = 3.1415 * (a / 1_000) * (a / 1_000) / 4
+        area = np.where(np.isfinite(b), rect, circle)
+        velocity = flow / (3_600 * area)
+    return py_round(nan_where(finite(flow, a) & (area != 0), velocity), 2)
+
+
+def equivalent_diameter(a, b) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rect = 2 * a * b / (a + b) / 1_000
+    rect = nan_where(a + b != 0, rect)
+    return py_round(np.where(np.isfinite(b), rect, a / 1_000), 3)
+
+
+def dynamic_pressure(velocity, temperature) -> np.ndarray:
+    return py_round(velocity * velocity * density(temperature) / 2, 3)
+
+
+def specific_pressure_loss(velocity, diameter, dynamic, temperature, surface) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = 273.15 + temperature
+        mu = MU * np.power(t, 1.5) / (t + 110.4)
+        v = mu / density(temperature)
+        re = velocity * diameter / v
+        lam = 0.11 * np.power(((surface / 1_000) / diameter + 68 / re), 0.25)
+        result = (lam / diameter) * dynamic
+    return py_round(nan_where((diameter != 0) & (re != 0), result), 4)
+
+
+def grid_cell(grid, values) -> tuple:
+    grid = np.asarray(grid, dtype=np.float64)
+    i = np.clip(np.searchsorted(grid, values, side='left') - 1, 0, len(grid) - 2)
+    return i, (values - grid[i]) / (grid[i + 1] - grid[i])
+
+
+def m_coefficient(a, b) -> np.ndarray:
+    table = np.asarray(reference.REFERENCE_DATA.M.TABLE, dtype=np.float64)
+    a_int = np.trunc(np.nan_to_num(a, nan=0.0))
+    b_int = np.trunc(np.nan_to_num(b, nan=0.0))
+    a_ok = np.isfinite(a) & (a_int >= 100) & (a_int <= 1_500)
+    both = a_ok & np.isfinite(b) & (b_int >= 100) & (b_int <= 1_500)
+    y = np.where(both, b_int, np.where(a_ok, a_int, 100.0))
+    x = np.where(a_ok, a_int, 100.0)
+    i, ty = grid_cell(reference.REFERENCE_DATA.M.Y, y)
+    j, tx = grid_cell(reference.REFERENCE_DATA.M.X, x)
+    m = (
+        table[i, j] * (1 - ty) * (1 - tx)
+        + table[i, j + 1] * (1 - ty) * tx
+        + table[i + 1, j] * ty * (1 - tx)
+        + table[i + 1, j + 1] * ty * tx
+    )
+    return nan_where(a_ok, np_round(m, 3))
+
+
+def segment(flow, a, b, length, temperature, surface) -> dict:
+    velocity = air_velocity(flow, a, b)
+    diameter = equivalent_diameter(a, b)
+    dynamic = dynamic_pressure(velocity, temperature)
+    r = specific_pressure_loss(velocity, diameter, dynamic, temperature, surface)
+    m = m_coefficient(a, b)
+    return {
+        'velocity': velocity,
+        'diameter': diameter,
+        'specific_pressure_loss': r,
+        'm': m,
+        'linear_pressure_loss': py_round(length * r * m, 4),
+        'dynamic': dynamic,
+    }
+
+
+def klapan_pressure_loss(klapan_flow, klapan_capacity) -> np.ndarray:
+    ok = finite(klapan_flow, klapan_capacity) & (klapan_flow != 0) & (klapan_capacity != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relation = klapan_flow / klapan_capacity
+    return py_round(nan_where(ok, 10 * np.power(relation, 2)), 3)
+
+
+def sputnik(s) -> dict:
+    t, surface = s['temperature'], s['surface']
+    klapan = klapan_pressure_loss(s['klapan_flow'], s['klapan_capacity'])
+    result = {'klapan_pressure_loss': klapan}
+    for side in ('one_side', 'two_side'):
+        values = segment(
+            s[f'{side}_flow'], s['one_side_a'], s['one_side_b'], s[f'{side}_length'], t, surface
+        )
+        local = py_round(values['dynamic'] * s[f'{side}_kms'], 3)
+        full = py_round(values['linear_pressure_loss'] + local, 3)
+        values.update({
+            'local_pressure_loss': local,
+            'full_pressure_loss': full,
+            'result_pressure': py_round(klapan + full, 3),
+        })
+        result.update({f'{side}_{key}': value for key, value in values.items()})
+    one, two = result['one_side_result_pressure'], result['two_side_result_pressure']
+    result['pressure'] = np.where(s['sides'] == 1, one, np.maximum(one, two))
+    return result
+
+
+def shaft_flows(s, n) -> np.ndarray:
+    one, two = s['one_side_flow'], s['two_side_flow']
+    one_sided = (s['sides'] == 1) & np.isfinite(one)
+    two_sided = (s['sides'] == 2) & finite(one, two)
+    flow = np.where(one_sided, one, nan_where(two_sided, one + two))
+    top = np.where(one_sided, one, nan_where(two_sided, np.maximum(one, two)))
+    flows = np.empty((len(flow), n))
+    flows[:, 0] = top
+    for i in range(1, n):
+        flows[:, i] = flow * (n - i)
+    return flows
+
+
+def heights(s, rows) -> np.ndarray:
+    floor_height = rows['floor_height']
+    m, n = floor_height.shape
+    result = np.full((m, n), np.nan)
+    result[:, -1] = nan_where(np.isfinite(s['floor_height']), py_round(s['shaft_height'], 2))
+    for i in range(n - 2, -1, -1):
+        previous = result[:, i + 1]
+        with np.errstate(invalid='ignore'):
+            difference = previous - floor_height[:, i + 1]
+            result[:, i] = py_round(nan_where(difference >= 0, difference), 2)
+    return result
+
+
+def gravi_pressure(height, temperature) -> np.ndarray:
+    g = reference.ACCELERATION_OF_GRAVITY
+    return py_round(g * height * ((353 / (273 + 5)) - (353 / (273 + temperature))), 3)
+
+
+def available_pressure(gravi, deflector) -> np.ndarray:
+    return np.where(np.isfinite(deflector), py_round(0.9 * gravi + deflector, 3), py_round(0.9 * gravi, 3))
+
+
+def kms(sputnik_flow, sputnik_a, sputnik_b, flows, rows) -> tuple:
+    m, n = flows.shape
+    pass_kms, branch_kms = np.full((m, n), np.nan), np.full((m, n), np.nan)
+    sputnik_b = np.where(np.isfinite(sputnik_b), sputnik_b, sputnik_a)
+    ok = finite(sputnik_flow, sputnik_a)
+    any_branch = np.zeros(m, dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fs = (np.trunc(sputnik_a) / 1_000) * (np.trunc(sputnik_b) / 1_000)
+        for i in range(n - 1, 0, -1):
+            pass_flow, branch_flow = flows[:, i - 1], flows[:, i]
+            main_a, main_b = rows['a'][:, i], rows['b'][:, i]
+            main_b = np.where(np.isfinite(main_b), main_b, main_a)
+            row_ok = ok & finite(pass_flow, branch_flow, main_a)
+            fk = (np.trunc(main_a) / 1_000) * (np.trunc(main_b) / 1_000)
+            pass_relation = sputnik_flow / pass_flow
+            branch_relation = sputnik_flow / branch_flow
+
+            kms_1 = (1.55 * pass_relation - np.power(pass_relation, 2))
+            pass_denominator = np.power(1 - pass_relation, 2) * np.power(fk / fk, 2)
+            pass_value = py_round(kms_1 / pass_denominator, 3)
+            pass_value = np.where((pass_denominator == 0) | (fk == 0), 0.0, pass_value)
+            pass_kms[:, i] = nan_where(row_ok, pass_value)
+
+            a = np.where(
+                (fs / fk <= 0.35) & (branch_relation <= 1), 1,
+                np.where(branch_relation <= 0.4, 0.9 * (1 - branch_relation), 0.55),
+            )
+            square = np.power(branch_relation * (fk / fs), 2)
+            kms_2 = a * (1 + square - 2 * np.power(1 - branch_relation, 2))
+            branch_ok = row_ok & (fk != 0) & (fs != 0) & (square != 0)
+            value = 3.7 if i == n - 1 else py_round(kms_2 / square, 3)
+            branch_kms[:, i] = nan_where(branch_ok, value)
+            any_branch |= branch_ok
+    branch_kms[:, 0] = nan_where(any_branch, 0.0)
+    return pass_kms, branch_kms
+
+
+def local_pressure(kms_value, velocity, temperature) -> np.ndarray:
+    return py_round(kms_value * velocity * velocity * (353 / (273 + temperature)) / 2, 3)
+
+
+def deflector_pressure_relation(velocity_relation) -> np.ndarray:
+    x_axis = np.asarray(reference.REFERENCE_DATA.DEFLECTOR_PRESSURE_RELATION.X, dtype=np.float64)
+    y_axis = np.asarray(reference.REFERENCE_DATA.DEFLECTOR_PRESSURE_RELATION.TABLE, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        inside = (x_axis[0] <= velocity_relation) & (velocity_relation <= x_axis[-1])
+    relation = np.where(inside, velocity_relation, x_axis[0])
+    hi = np.clip(np.searchsorted(x_axis, relation, side='left'), 1, len(x_axis) - 1)
+    slope = (y_axis[hi] - y_axis[hi - 1]) / (x_axis[hi] - x_axis[hi - 1])
+    return nan_where(inside, np_round(slope * (relation - x_axis[hi - 1]) + y_axis[hi - 1], 2))
+
+
+def cap_relation_kms(cap, relation) -> np.ndarray:
+    x_axis, y_axis = (np.asarray(axis, dtype=np.float64) for axis in reference.CAP_RELATION_CURVES[cap])
+    with np.errstate(invalid='ignore'):
+        inside = relation >= x_axis[0]
+    relation = np.where(inside, np.minimum(relation, x_axis[-1]), x_axis[0])
+    hi = np.clip(np.searchsorted(x_axis, relation, side='left'), 1, len(x_axis) - 1)
+    slope = (y_axis[hi] - y_axis[hi - 1]) / (x_axis[hi] - x_axis[hi - 1])
+    return nan_where(inside, np_round(slope * (relation - x_axis[hi - 1]) + y_axis[hi - 1], 2))
+
+
+def shaft_cap_kms(s, diameter) -> np.ndarray:
+    # cap_kms, or ζ at h/Do of the channel where the cap height is given (cap_type indexes CAP_TYPES)
+    kms_value = s['cap_kms']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relation = nan_where(diameter != 0, s['cap_h'] / diameter)
+    for i, cap in enumerate(reference.CAP_TYPES):
+        if cap in reference.CAP_RELATION_CURVES:
+            given = (s['cap_type'] == i) & np.isfinite(s['cap_h'])
+            kms_value = np.where(given, cap_relation_kms(cap, relation), kms_value)
+    return kms_value
+
+
+def deflector(wind_velocity, flow) -> dict:
+    keys = np.asarray(list(reference.DEFLECTOR_DIAMETERS), dtype=np.float64)
+    diameters = np.asarray([float(d) for d in reference.DEFLECTOR_DIAMETERS.values()])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        recommended = py_round(wind_velocity * 0.3, 2)
+        square = py_round(nan_where(recommended != 0, flow / (3_600 * recommended)), 3)
+        index = np.searchsorted(keys, np.nan_to_num(square, nan=np.inf), side='left')
+        diameter = nan_where(index < len(keys), diameters[np.minimum(index, len(keys) - 1)])
+        diameter = nan_where(np.isfinite(square), diameter)
+        real = py_round(flow / (3_600 * math.pi * (np.power(diameter / 1_000, 2) / 4)), 2)
+        relation = py_round(nan_where(wind_velocity != 0, real / wind_velocity), 2)
+    pressure_relation = deflector_pressure_relation(relation)
+    pressure = py_round(pressure_relation * ((353 / (273.15 + 5)) * np.power(wind_velocity, 2) / 2), 3)
+    return {
+        'wind_velocity': wind_velocity,
+        'recommended_velocity': recommended,
+        'flow': flow,
+        'required_square': square,
+        'diameter': diameter,
+        'real_velocity': real,
+        'velocity_relation': relation,
+        'pressure_relation': pressure_relation,
+        'pressure': pressure,
+    }
+
+
+def evaluate_arrays(scalars, rows) -> tuple:
+    # returns (per shaft, per floor) dicts of arrays
+    s = {key: np.asarray(scalars[key], dtype=np.float64) for key in SCALARS}
+    r = {key: np.asarray(rows[key], dtype=np.float64) for key in ROWS}
+    m, n = r['a'].shape
+    t, surface = s['temperature'][:, None], s['surface'][:, None]
+    is_deflector = s['deflector'] != 0
+
+    shaft = {f'sputnik_{key}': value for key, value in sputnik(s).items()}
+    flows = shaft_flows(s, n)
+    floor_heights = heights(s, r)
+    lengths = r['floor_height'].copy()
+    lengths[:, 0] = floor_heights[:, 0]
+    floor = segment(flows, r['a'], r['b'], lengths, t, surface)
+
+    one_flow, two_flow = s['one_side_flow'], s['two_side_flow']
+    two_sided = s['sides'] != 1
+    sputnik_flow = np.where(two_sided, np.maximum(one_flow, two_flow), one_flow)
+    v1, v2 = shaft['sputnik_one_side_velocity'], shaft['sputnik_two_side_velocity']
+    sputnik_velocity = np.where(two_sided & finite(v1, v2), np.maximum(v1, v2), v1)
+    pass_kms, branch_kms = kms(sputnik_flow, s['one_side_a'], s['one_side_b'], flows, r)
+    pass_kms[:, 0] = r['pass_kms'][:, 0]
+
+    defl = deflector(nan_where(is_deflector, s['wind_velocity']), flows[:, 0] * n)
+    shaft.update({f'deflector_{key}': nan_where(is_deflector, value) for key, value in defl.items()})
+    deflector_pressure = shaft['deflector_pressure']
+
+    if n > 1:
+        v = floor['velocity'][:, 1]
+        cap = py_round(shaft_cap_kms(s, floor['diameter'][:, 1]) * (353 / (273.15 + s['temperature'])) * np.power(v, 2) / 2, 3)
+        cap = nan_where(~is_deflector & np.isfinite(floor['diameter'][:, 1]), cap)
+    else:
+        cap = np.full(m, np.nan)
+    shaft['cap_pressure'] = cap
+    cap_value = np.nan_to_num(cap, nan=0.0)[:, None]
+
+    gravi = gravi_pressure(floor_heights, t)
+    floor.update({
+        'flow': flows,
+        'height': floor_heights,
+        'gravi_pressure': gravi,
+        'available_pressure': available_pressure(gravi, deflector_pressure[:, None]),
+        'pass_kms': pass_kms,
+        'branch_kms': branch_kms,
+        'pass_pressure': local_pressure(pass_kms, floor['velocity'], t),
+        'branch_pressure': local_pressure(branch_kms, sputnik_velocity[:, None], t),
+    })
+
+    klapan = shaft['sputnik_pressure'][:, None]
+    passes = np.nan_to_num(floor['pass_pressure'], nan=0.0)
+    linear = np.nan_to_num(floor['linear_pressure_loss'], nan=0.0)
+    full = np.full((m, n), np.nan)
+    for i in range(n - 1, 0, -1):
+        pass_sum, linear_sum = np.zeros(m), np.zeros(m)
+        for j in range(i, 0, -1):
+            pass_sum = pass_sum + passes[:, j]
+        for j in range(i, 0, -1):
+            linear_sum = linear_sum + linear[:, j]
+        total = klapan[:, 0] + floor['branch_pressure'][:, i] + pass_sum + linear_sum + cap_value[:, 0]
+        full[:, i] = py_round(total, 3)
+    top = floor['branch_pressure'][:, 0] + floor['pass_pressure'][:, 0] + floor['linear_pressure_loss'][:, 0]
+    full[:, 0] = py_round(top + cap_value[:, 0], 3)
+    floor['full_pressure'] = full
+
+    available = floor['available_pressure']
+    with np.errstate(invalid='ignore'):
+        floor['draft'] = nan_where(finite(available, full), (available > full).astype(np.float64))
+    floor['floor'] = np.broadcast_to(np.arange(n, 0, -1, dtype=np.float64), (m, n))
+    return shaft, floor
+
+
+def project_scalars(project) -> dict:
+    # one parsed project (airsystem.project) as the per shaft values of evaluate_arrays, None stays None
+    scalars = {
+        'temperature': project['temperature'],
+        'surface': project['surface'],
+        'floor_height': project['floor_height'],
+        'shaft_height': project['shaft_height'],
+        'klapan_flow': project['klapan_flow'],
+        'klapan_capacity': project['klapan_capacity'],
+        'sides': project['sides'],
+        'cap_kms': cap_kms(project),
+        'deflector': project['cap'] == reference.CAP_TYPES[-1],
+        'wind_velocity': project['wind_velocity'],
+        'cap_type': reference.CAP_TYPES.index(project['cap']) if project['cap'] in reference.CAP_TYPES else None,
+        'cap_h': project['cap_h'],
+    }
+    for side in ('one_side', 'two_side'):
+        for key in ('flow', 'length', 'a', 'b', 'kms'):
+            scalars[f'{side}_{key}'] = project[side][key]
+    return scalars
+
+
+def project_arrays(projects) -> tuple:
+    # parsed projects with the same number of floors -> evaluate_arrays input
+    values = [project_scalars(project) for project in projects]
+    scalars = {
+        key: np.array([np.nan if item[key] is None else float(item[key]) for item in values])
+        for key in SCALARS
+    }
+    rows = {
+        key: np.array(
+            [[np.nan if item[key] is None else float(item[key]) for item in project['rows']] for project in projects]
+        ).reshape(len(projects), -1)
+        for key in ROWS
+    }
+    return scalars, rows
+
+
+def main_section(rows, a, b) -> dict:
+    # rows with the main channel (every floor below the top one) set to a×b per shaft, b NaN is round
+    rows = {key: np.array(value, dtype=np.float64) for key, value in rows.items()}
+    first = 1 if rows['a'].shape[1] > 1 else 0
+    rows['a'][:, first:] = np.asarray(a, dtype=np.float64)[:, None]
+    rows['b'][:, first:] = np.asarray(b, dtype=np.float64)[:, None]
+    return rows
+
+
+def cap_kms(project) -> object:
+    cap = project['cap']
+    if cap == reference.CAP_TYPES[1]:
+        return 1
+    if cap in reference.CAP_TYPES[2:4]:
+        return reference.CAP_RELATIONS[cap].get(project['cap_relation']) or None
+    return None
+
+
+def value(x) -> object:
+    # an element of an array's tolist() as the engine has it, NaN is None
+    return None if math.isnan(x) else x
+
+
+SIDE_KEYS = (
+    'velocity', 'diameter', 'specific_pressure_loss', 'm', 'linear_pressure_loss', 'dynamic',
+    'local_pressure_loss', 'full_pressure_loss', 'result_pressure',
+)
+DEFLECTOR_KEYS = (
+    'wind_velocity', 'recommended_velocity', 'flow', 'required_square',
+    'diameter', 'real_velocity', 'velocity_relation', 'pressure_relation', 'pressure',
+)
+FLOOR_KEYS = (
+    'flow', 'height', 'gravi_pressure', 'available_pressure', 'pass_kms', 'branch_kms',
+    'velocity', 'diameter', 'specific_pressure_loss', 'm', 'linear_pressure_loss', 'dynamic',
+    'pass_pressure', 'branch_pressure', 'full_pressure',
+)
+
+
+def result(project, shaft, floor, k) -> dict:
+    # shaft k of evaluate_arrays, with the arrays as lists, in the shape of engine.evaluate
+    sputnik_result = {'klapan_pressure_loss': value(shaft['sputnik_klapan_pressure_loss'][k])}
+    for side in ('one_side', 'two_side'):
+        sputnik_result[side] = {key: value(shaft[f'sputnik_{side}_{key}'][k]) for key in SIDE_KEYS}
+    sputnik_result['pressure'] = value(shaft['sputnik_pressure'][k])
+    deflector_result = None
+    if project['cap'] == reference.CAP_TYPES[-1]:
+        deflector_result = {key: value(shaft[f'deflector_{key}'][k]) for key in DEFLECTOR_KEYS}
+    floors = []
+    for i, row in enumerate(project['rows']):
+        item = {'floor': len(project['rows']) - i, 'floor_height': row['floor_height']}
+        item.update({key: value(floor[key][k][i]) for key in FLOOR_KEYS[:6]})
+        item.update({'a': row['a'], 'b': row['b']})
+        item.update({key: value(floor[key][k][i]) for key in FLOOR_KEYS[6:]})
+        draft = value(floor['draft'][k][i])
+        item['draft'] = None if draft is None else draft == 1
+        floors.append(item)
+    return {
+        'sputnik': sputnik_result,
+        'deflector': deflector_result,
+        'cap_pressure': value(shaft['cap_pressure'][k]),
+        'floors': floors,
+    }
+
+
+def evaluate_projects(projects) -> list:
+    # engine.evaluate of every project, shafts with the same number of floors in one evaluate_arrays call
+    groups = {}
+    for i, project in enumerate(projects):
+        groups.setdefault(len(project['rows']), []).append(i)
+    results = [None] * len(projects)
+    for n, indexes in groups.items():
+        if not n:
+            raise ValueError('a project without floors')
+        group = [projects[i] for i in indexes]
+        shaft, floor = evaluate_arrays(*project_arrays(group))
+        shaft = {key: values.tolist() for key, values in shaft.items()}
+        floor = {key: floor[key].tolist() for key in FLOOR_KEYS + ('draft',)}
+        for k, (i, project) in enumerate(zip(indexes, group)):
+            results[i] = result(project, shaft, floor, k)
+    return results
@@ -0,0 +1,229 @@
+import sys
+import math
+import argparse
+
+import numpy as np
+
+from airsystem import reference, vector
+from airsystem.project import load_project
+from airsystem.sizing import margins, repeated, section_text, size_arrays
+
+# the main channel split into zones of floors, each with its own catalog section;
+# the top floor keeps its own section as in the main table
+MAX_ZONES = 4
+# ΔP is rounded to 0.001 Pa, an unrounded sum this far below Ррасп still has draft after rounding
+HALF = 0.0005
+
+
+def perimeter(a, b) -> float:
+    # m, b None is a round channel of diameter a
+    if b is None:
+        return math.pi * a / 1_000
+    return 2 * (a + b) / 1_000
+
+
+def floor_losses(project, sizes) -> dict:
+    # the whole shaft once per size: ΔP of a floor is
+    # Σ(Рпр + ΔPл) of the floors above it down to it + Рбок of the floor + Ркл + Роголовка,
+    # each term depends only on the section of its own floor, Роголовка on the floor below the top one
+    if len(project['rows']) < 2:
+        raise ValueError('zoning needs at least two floors')
+    scalars, rows = repeated(project, len(sizes))
+    rows = vector.main_section(rows, *size_arrays(sizes))
+    shaft, floor = vector.evaluate_arrays(scalars, rows)
+    loss = np.nan_to_num(floor['pass_pressure'], nan=0.0) + np.nan_to_num(floor['linear_pressure_loss'], nan=0.0)
+    with np.errstate(invalid='ignore'):
+        headroom = floor['available_pressure'] - floor['branch_pressure'] - HALF
+    headroom = np.nan_to_num(headroom, nan=-np.inf)
+    # the largest ΔP after a floor with which the same section keeps draft down to the bottom
+    slack = np.full(headroom.shape, np.inf)
+    for r in range(headroom.shape[1] - 2, 0, -1):
+        slack[:, r] = np.minimum(headroom[:, r + 1], slack[:, r + 1]) - loss[:, r + 1]
+    return {
+        'base': shaft['sputnik_pressure'] + np.nan_to_num(shaft['cap_pressure'], nan=0.0),
+        'loss': loss,
+        'headroom': headroom,
+        'slack': slack,
+        'top': floor['draft'][:, 0] == 1,
+    }
+
+
+def floor_lengths(project) -> np.ndarray:
+    lengths = [project['floor_height'] if row['floor_height'] is None else row['floor_height'] for row in project['rows']]
+    if None in lengths[1:]:
+        raise ValueError('floor heights are missing')
+    return np.array([np.nan] + lengths[1:], dtype=np.float64)
+
+
+def prune(group, cost, pressure) -> np.ndarray:
+    # per group, the labels no other one beats on both material and accumulated ΔP;
+    # P is replaced by its rank so the running minimum restarts exactly at every group
+    order = np.lexsort((pressure, cost, group))
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[np.argsort(pressure, kind='stable')] = np.arange(len(order))
+    key = rank[order] - group[order] * (len(order) + 1)
+    best = np.minimum.accumulate(key)
+    keep = np.empty(len(order), dtype=bool)
+    keep[:1] = True
+    keep[1:] = (key[1:] < best[:-1]) | (group[order[1:]] != group[order[:-1]])
+    return order[keep]
+
+
+def optimize(project, sizes=reference.CHANNEL_SIZES, max_zones=MAX_ZONES, progress=None) -> dict:
+    # dynamic programming over the floors from the top down: a label is one zoning of the floors so far,
+    # (material, accumulated ΔP), a state is (section of the current floor, zones used);
+    # a label survives if no other one in its state has both less material and less ΔP;
+    # in the last zone the rest of the shaft is fixed, only the cheapest label that keeps draft is left;
+    # progress(done, total) is called once per floor
+    sizes = list(sizes)
+    losses = floor_losses(project, sizes)
+    lengths = floor_lengths(project)
+    n, count = len(project['rows']), len(sizes)
+    walls = np.array([perimeter(*size) for size in sizes])
+
+    start = np.flatnonzero(losses['top'])
+    labels = {
+        'zones': np.zeros(len(start), dtype=np.int64),
+        'section': start,
+        'cost': walls[start] * lengths[1],
+        'pressure': losses['base'][start] + losses['loss'][start, 1],
+        'node': np.full(len(start), -1),
+    }
+    parents, sections, total = [], [], 0
+    for r in range(1, n):
+        if progress is not None:
+            progress(r - 1, n - 1)
+        if r > 1:
+            # the same section one floor further, or a new zone with any section after the best labels so far
+            parts = [labels]
+            for zones in range(max_zones - 1):
+                mask = labels['zones'] == zones
+                if not mask.any():
+                    continue
+                front = prune(np.zeros(mask.sum(), dtype=np.int64), labels['cost'][mask], labels['pressure'][mask])
+                picked = {key: value[mask][front] for key, value in labels.items()}
+                if zones + 1 < max_zones - 1:
+                    index = np.repeat(np.arange(len(front)), count)
+                    section = np.tile(np.arange(count), len(front))
+                else:
+                    # into the last zone: per section the cheapest label of the front that keeps draft,
+                    # the front goes up in material and down in ΔP
+                    limit = np.minimum(losses['headroom'][:, r], losses['slack'][:, r]) - losses['loss'][:, r]
+                    index = np.searchsorted(-picked['pressure'], -limit, side='right')
+                    section = np.flatnonzero(index < len(front))
+                    index = index[section]
+                parts.append({
+                    'zones': np.full(len(index), zones + 1),
+                    'section': section,
+                    'cost': picked['cost'][index],
+                    'pressure': picked['pressure'][index],
+                    'node': picked['node'][index],
+                })
+            labels = {key: np.concatenate([part[key] for part in parts]) for key in labels}
+            labels['cost'] = labels['cost'] + walls[labels['section']] * lengths[r]
+            labels['pressure'] = labels['pressure'] + losses['loss'][labels['section'], r]
+        last = labels['zones'] == max_zones - 1
+        feasible = labels['pressure'] < losses['headroom'][labels['section'], r]
+        feasible &= ~last | (labels['pressure'] < losses['slack'][labels['section'], r])
+        labels = {key: value[feasible] for key, value in labels.items()}
+        if not len(labels['cost']):
+            return {'best': None, 'options': [], 'evaluated': count}
+        group = labels['zones'] * count + labels['section']
+        kept = prune(group, labels['cost'], labels['pressure'])
+        first = np.ones(len(kept), dtype=bool)
+        first[1:] = group[kept[1:]] != group[kept[:-1]]
+        kept = kept[first | (labels['zones'][kept] < max_zones - 1)]
+        labels = {key: value[kept] for key, value in labels.items()}
+        # every label is a node of the zoning tree, its parent is the label one floor above
+        parents.append(labels['node'])
+        sections.append(labels['section'])
+        labels['node'] = total + np.arange(len(kept))
+        total += len(kept)
+
+    parents, sections = np.concatenate(parents), np.concatenate(sections)
+    options = []
+    for zones in range(max_zones):
+        mask = labels['zones'] <= zones
+        if not mask.any():
+            continue
+        i = np.flatnonzero(mask)[np.lexsort((labels['pressure'][mask], labels['cost'][mask]))[0]]
+        path, node = [], labels['node'][i]
+        while node >= 0:
+            path.append(int(sections[node]))
+            node = parents[node]
+        option = zoning(project, [sizes[s] for s in reversed(path)])
+        if not options or option['material'] < options[-1]['material']:
+            options.append(option)
+    verify(project, options)
+    return {'best': options[-1], 'options': options, 'evaluated': count}
+
+
+def zoning(project, row_sizes) -> dict:
+    # the sections of the floors below the top one, from the top down, as zones from the bottom up
+    n = len(project['rows'])
+    lengths = floor_lengths(project)
+    zones = []
+    for r in range(n - 1, 0, -1):
+        a, b = row_sizes[r - 1]
+        floor = n - r
+        if zones and (zones[-1]['a'], zones[-1]['b']) == (a, b):
+            zones[-1]['floors'] = (zones[-1]['floors'][0], floor)
+        else:
+            zones.append({'floors': (floor, floor), 'a': a, 'b': b})
+    material = sum(perimeter(*size) * lengths[r] for r, size in enumerate(row_sizes, start=1))
+    return {'zones': zones, 'material': round(float(material), 3)}
+
+
+def zoned_project(project, zones) -> dict:
+    # a copy of the project with the zones in its rows, zones: [{'floors': (first, last), 'a', 'b'}]
+    n = len(project['rows'])
+    rows = [dict(row) for row in project['rows']]
+    for zone in zones:
+        first, last = zone['floors']
+        for floor in range(first, last + 1):
+            rows[n - floor].update({'a': zone['a'], 'b': zone['b']})
+    return {**project, 'rows': rows}
+
+
+def verify(project, options) -> None:
+    # the chosen zonings through the vectorized engine, ΔP exactly as in the main table
+    if not options:
+        return
+    scalars, rows = vector.project_arrays([zoned_project(project, option['zones']) for option in options])
+    _, floor = vector.evaluate_arrays(scalars, rows)
+    lowest, failing = margins(floor['full_pressure'], floor['available_pressure'])
+    for i, option in enumerate(options):
+        option['min_margin'] = None if np.isnan(lowest[i]) else float(lowest[i])
+        option['failing_floors'] = int(failing[i])
+        option['draft'] = bool(failing[i] == 0)
+
+
+def zones_text(option) -> str:
+    return '; '.join(
+        f'{zone["floors"][0]}–{zone["floors"][1]}: {section_text(zone)}' for zone in reversed(option['zones'])
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m airsystem.zoning',
+        description='Разбиение основного канала на участки по этажам с разными сечениями',
+    )
+    parser.add_argument('project')
+    parser.add_argument('-z', '--zones', type=int, default=MAX_ZONES, help='наибольшее число участков')
+    args = parser.parse_args(argv)
+
+    result = optimize(load_project(args.project), max_zones=args.zones)
+    if result['best'] is None:
+        print(f'Ни одно разбиение по {result["evaluated"]} сечениям не даёт тягу на всех этажах')
+        return 2
+    for option in result['options']:
+        print(
+            f'{len(option["zones"])} уч.  стенки {option["material"]:.3f} м2  '
+            f'запас {option["min_margin"]:.3f} Па  без тяги: {option["failing_floors"]}  {zones_text(option)}'
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,22 +1,19 @@
 import os
 import platform
+import multiprocessing
 import math
+import time
 import requests
 import json
 import webbrowser
-import docx
-from docx.shared import Cm, Pt, Mm
-from docx.enum.table import WD_ALIGN_VERTICAL, WD_TABLE_ALIGNMENT
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.section import WD_ORIENT
 from datetime import datetime
 from functools import partial
 from collections import deque
-from numpy import array, around
-from scipy.interpolate import RegularGridInterpolator, interp1d
 
-from PySide6.QtCore import QSettings, QSize, Qt, QRegularExpression, QTimer, QStandardPaths
-from PySide6.QtGui import QRegularExpressionValidator, QFont, QIcon, QAction
+from PySide6.QtCore import (
+    QSettings, QSize, Qt, QRegularExpression, QTimer, QStandardPaths, QLockFile, QThread, QUrl, Signal, QModelIndex
+)
+from PySide6.QtGui import QRegularExpressionValidator, QFont, QIcon, QAction, QDesktopServices, QStandardItem, QStandardItemModel
 from PySide6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -36,9 +33,32 @@ from PySide6.QtWidgets import (
     QFileDialog,
     QProgressDialog,
     QMenu,
+    QTextBrowser,
+    QDialog,
+    QSpinBox,
+    QDoubleSpinBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QAbstractItemView,
+    QProgressBar,
+    QCompleter,
+    QSlider,
 )
 
+from airsystem.engine import cap_relation_kms, deflector_pressure_relation, evaluate, linear_pressure_loss, segment
+from airsystem.goalseek import INPUTS as GOAL_SEEK_INPUTS, digits, goal_seek, value_text
+from airsystem.library import Library, Watcher
+from airsystem.project import number, parse_project
+from airsystem.search import make_space, search
+from airsystem.sizing import CAP_HEIGHT_MAX, CAP_HEIGHT_STEP, cap_heights, rank_valves, section_text, size_main_channel, size_sputnik
+from airsystem.suggest import build_index, index_key, suggest, update_index
+from airsystem.surrogate import Surrogate, project_inputs
+from airsystem.tables import Exporter, formats
+from airsystem.zoning import floor_lengths, optimize, zones_text
 from constants import CONSTANTS
+from report import ExportCancelled, build_report, export_docx, section_html
+from journal import RecoveryJournal, LOCK_FILE, find_sessions, read_session, remove_session, write_atomic
 
 
 basedir = os.path.dirname(__file__)
@@ -64,6 +84,796 @@ class CustomComboBox(QComboBox):
         super().showPopup()
 
 
+class ExportThread(QThread):
+    progress = Signal(int)
+    exported = Signal(str)
+    failed = Signal(str)
+
+    def __init__(self, data, path, parent=None) -> None:
+        super().__init__(parent)
+        self.data = data
+        self.path = path
+
+
+    def run(self) -> None:
+        try:
+            export_docx(self.data, self.path, self.report_progress)
+        except ExportCancelled:
+            pass
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.exported.emit(self.path)
+
+
+    def report_progress(self, done, total) -> None:
+        if self.isInterruptionRequested():
+            raise ExportCancelled
+        self.progress.emit(done * 100 // total)
+
+
+class SearchCancelled(Exception):
+    pass
+
+
+class SearchThread(QThread):
+    progress = Signal(int)
+    found = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, space, samples, parent=None) -> None:
+        super().__init__(parent)
+        self.space = space
+        self.samples = samples
+
+
+    def run(self) -> None:
+        try:
+            result = search(self.space, self.samples, progress=self.report_progress)
+        except SearchCancelled:
+            pass
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.found.emit(result)
+
+
+    def report_progress(self, done, total) -> None:
+        if self.isInterruptionRequested():
+            raise SearchCancelled
+        self.progress.emit(done * 100 // total)
+
+
+class ZoningCancelled(Exception):
+    pass
+
+
+class ZoningThread(QThread):
+    progress = Signal(int)
+    found = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, project, parent=None) -> None:
+        super().__init__(parent)
+        self.project = project
+
+
+    def run(self) -> None:
+        try:
+            result = optimize(self.project, progress=self.report_progress)
+        except ZoningCancelled:
+            pass
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.found.emit(result)
+
+
+    def report_progress(self, done, total) -> None:
+        if self.isInterruptionRequested():
+            raise ZoningCancelled
+        self.progress.emit(done * 100 // total)
+
+
+class LibraryDialog(QDialog):
+    def __init__(self, window) -> None:
+        super().__init__(window)
+        self.main_window = window
+        self.library = Library(window.get_library_path())
+        self.version = None
+        self.setWindowTitle(CONSTANTS.LIBRARY.TITLE)
+        self.resize(1200, 600)
+
+        self.directory_label = QLabel(window.settings.value('libraryDir', CONSTANTS.LIBRARY.NO_DIR))
+        directory_button = QPushButton(CONSTANTS.LIBRARY.CHOOSE_DIR)
+        directory_button.clicked.connect(self.choose_directory)
+        directory_box = QHBoxLayout()
+        directory_box.addWidget(self.directory_label, 1)
+        directory_box.addWidget(directory_button)
+
+        self.floors_min = QSpinBox()
+        self.floors_min.setRange(0, 999)
+        self.floors_min.setPrefix('Этажей от ')
+        self.floors_max = QSpinBox()
+        self.floors_max.setRange(0, 999)
+        self.floors_max.setPrefix('до ')
+        self.floors_max.setSpecialValueText('до ∞')
+        self.klapan = QLineEdit()
+        self.klapan.setPlaceholderText(CONSTANTS.LIBRARY.KLAPAN_HINT)
+        self.cap = QComboBox()
+        self.cap.addItems((CONSTANTS.LIBRARY.ANY,) + CONSTANTS.CAP.TYPES[1:])
+        self.draft = QComboBox()
+        self.draft.addItems(CONSTANTS.LIBRARY.DRAFT)
+        filter_box = QHBoxLayout()
+        for widget in (self.floors_min, self.floors_max, self.klapan, self.cap, self.draft):
+            filter_box.addWidget(widget)
+        self.floors_min.valueChanged.connect(self.search)
+        self.floors_max.valueChanged.connect(self.search)
+        self.klapan.textChanged.connect(self.search)
+        self.cap.currentIndexChanged.connect(self.search)
+        self.draft.currentIndexChanged.connect(self.search)
+
+        self.table = QTableWidget(0, len(CONSTANTS.LIBRARY.HEADERS))
+        self.table.setHorizontalHeaderLabels(CONSTANTS.LIBRARY.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.cellDoubleClicked.connect(self.open_project)
+        self.status = QLabel()
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(directory_box)
+        layout.addLayout(filter_box)
+        layout.addWidget(self.table)
+        layout.addWidget(self.status)
+
+        # the watcher commits from its own thread, the dialog only notices the new data version
+        self.timer = QTimer(self)
+        self.timer.setInterval(CONSTANTS.LIBRARY.REFRESH)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+        self.search()
+
+
+    def choose_directory(self) -> None:
+        directory = QFileDialog.getExistingDirectory(self, CONSTANTS.LIBRARY.TITLE, self.directory_label.text())
+        if directory:
+            self.directory_label.setText(directory)
+            self.main_window.start_library(directory)
+
+
+    def refresh(self) -> None:
+        if self.library.version() != self.version:
+            self.search()
+
+
+    def search(self, *args) -> None:
+        draft = self.draft.currentIndex()
+        rows = self.library.search(
+            floors_min=self.floors_min.value() or None,
+            floors_max=self.floors_max.value() or None,
+            klapan=self.klapan.text().strip(),
+            cap=self.cap.currentText() if self.cap.currentIndex() else None,
+            failing={1: True, 3: False}.get(draft),
+            top_fails=True if draft == 2 else None,
+        )
+        self.version = self.library.version()
+        self.table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            section = '×'.join(fmt(value, 0) for value in (row['main_a'], row['main_b']) if value is not None)
+            cells = (
+                row['path'],
+                str(row['floors']),
+                fmt(row['shaft_height'], 2),
+                fmt(row['temperature'], 0),
+                (row['klapan'] or '').replace('\n', ' '),
+                row['cap'],
+                section,
+                fmt(row['min_margin'], 3),
+                row['failing'].strip(','),
+            )
+            for j, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if j == 7 and row['min_margin'] is not None and row['min_margin'] < 0:
+                    item.setForeground(Qt.GlobalColor.red)
+                self.table.setItem(i, j, item)
+        self.status.setText(CONSTANTS.LIBRARY.STATUS.format(self.library.count(), len(rows)))
+
+
+    def open_project(self, row, column) -> None:
+        self.main_window._open_file(self.table.item(row, 0).text())
+        self.accept()
+
+
+    def done(self, result) -> None:
+        self.timer.stop()
+        self.library.close()
+        super().done(result)
+
+
+def fmt(value, digits) -> str:
+    return '' if value is None else f'{value:.{digits}f}'
+
+
+class SizingDialog(QDialog):
+    def __init__(self, window, result, apply, title=CONSTANTS.SIZING.TITLE) -> None:
+        super().__init__(window)
+        self.apply_option = apply
+        self.setWindowTitle(title)
+        self.resize(520, 320)
+
+        self.items = ([result['best']] if result['best'] else []) + result['options']
+        if result['best']:
+            title = CONSTANTS.SIZING.BEST.format(result['evaluated'])
+        else:
+            title = CONSTANTS.SIZING.NONE.format(result['evaluated'])
+        self.table = QTableWidget(len(self.items), len(CONSTANTS.SIZING.HEADERS))
+        self.table.setHorizontalHeaderLabels(CONSTANTS.SIZING.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        for i, option in enumerate(self.items):
+            cells = (
+                section_text(option),
+                fmt(option['area'], 4),
+                fmt(option['velocity'], 2),
+                fmt(option['min_margin'], 3),
+                str(option['failing_floors']),
+            )
+            for j, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if j == 3 and option['min_margin'] is not None and option['min_margin'] < 0:
+                    item.setForeground(Qt.GlobalColor.red)
+                self.table.setItem(i, j, item)
+        self.table.selectRow(0)
+        self.table.cellDoubleClicked.connect(self.apply)
+
+        apply_button = QPushButton(CONSTANTS.SIZING.APPLY)
+        apply_button.clicked.connect(self.apply)
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(title))
+        layout.addWidget(self.table)
+        layout.addWidget(apply_button)
+
+
+    def apply(self, *args) -> None:
+        row = self.table.currentRow()
+        if row < 0:
+            return
+        option = self.items[row]
+        self.apply_option(option['a'], option['b'])
+        self.accept()
+
+
+class SizeIndexThread(QThread):
+    built = Signal(object)
+
+    def __init__(self, project, parent=None) -> None:
+        super().__init__(parent)
+        self.project = project
+
+
+    def run(self) -> None:
+        try:
+            index = build_index(self.project)
+        except Exception:
+            return
+        self.built.emit(index)
+
+
+class ZoningDialog(QDialog):
+    def __init__(self, window, project) -> None:
+        super().__init__(window)
+        self.main_window = window
+        self.items = []
+        self.setWindowTitle(CONSTANTS.ZONING.TITLE)
+        self.resize(820, 260)
+
+        self.status = QLabel(CONSTANTS.ZONING.RUNNING)
+        self.progress = QProgressBar()
+        self.table = QTableWidget(0, len(CONSTANTS.ZONING.HEADERS))
+        self.table.setHorizontalHeaderLabels(CONSTANTS.ZONING.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.cellDoubleClicked.connect(self.apply)
+
+        self.apply_button = QPushButton(CONSTANTS.SIZING.APPLY)
+        self.apply_button.clicked.connect(self.apply)
+        self.apply_button.setEnabled(False)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.status)
+        layout.addWidget(self.progress)
+        layout.addWidget(self.table)
+        layout.addWidget(self.apply_button)
+
+        # a tall shaft takes seconds, the window stays responsive meanwhile
+        self.thread = ZoningThread(project, self)
+        self.thread.progress.connect(self.progress.setValue)
+        self.thread.found.connect(self.show_options)
+        self.thread.failed.connect(self.show_error)
+        self.thread.finished.connect(self.on_finished)
+        self.thread.start()
+
+
+    def show_options(self, result) -> None:
+        self.items = result['options']
+        if result['best']:
+            self.status.setText(CONSTANTS.ZONING.BEST.format(result['evaluated']))
+        else:
+            self.status.setText(CONSTANTS.ZONING.NONE.format(result['evaluated']))
+        self.progress.hide()
+        self.table.setRowCount(len(self.items))
+        for i, option in enumerate(self.items):
+            cells = (
+                str(len(option['zones'])),
+                fmt(option['material'], 3),
+                fmt(option['min_margin'], 3),
+                zones_text(option),
+            )
+            for j, text in enumerate(cells):
+                self.table.setItem(i, j, QTableWidgetItem(text))
+        self.table.selectRow(len(self.items) - 1)
+        self.apply_button.setEnabled(bool(self.items))
+
+
+    def show_error(self, error) -> None:
+        QMessageBox.critical(self, 'Ошибка', error)
+
+
+    def on_finished(self) -> None:
+        self.thread.deleteLater()
+        self.thread = None
+
+
+    def apply(self, *args) -> None:
+        row = self.table.currentRow()
+        if row < 0 or row >= len(self.items):
+            return
+        self.main_window.set_zones(self.items[row]['zones'])
+        self.accept()
+
+
+    def done(self, result) -> None:
+        if self.thread is not None:
+            self.thread.requestInterruption()
+            self.thread.wait()
+        super().done(result)
+
+
+class SearchDialog(QDialog):
+    def __init__(self, window, project) -> None:
+        super().__init__(window)
+        self.main_window = window
+        self.space = make_space(project)
+        self.front = []
+        self.thread = None
+        self.setWindowTitle(CONSTANTS.SEARCH.TITLE)
+        self.resize(1000, 600)
+
+        self.samples = QSpinBox()
+        self.samples.setRange(10_000, 5_000_000)
+        self.samples.setSingleStep(10_000)
+        self.samples.setValue(200_000)
+        self.samples.setPrefix(CONSTANTS.SEARCH.SAMPLES)
+        self.start_button = QPushButton(CONSTANTS.SEARCH.START)
+        self.start_button.clicked.connect(self.start)
+        self.progress = QProgressBar()
+        top = QHBoxLayout()
+        top.addWidget(self.samples)
+        top.addWidget(self.start_button)
+        top.addWidget(self.progress, 1)
+
+        self.table = QTableWidget(0, len(CONSTANTS.SEARCH.HEADERS))
+        self.table.setHorizontalHeaderLabels(CONSTANTS.SEARCH.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.cellDoubleClicked.connect(self.choose)
+        self.status = QLabel(CONSTANTS.SEARCH.HINT)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(top)
+        layout.addWidget(self.table)
+        layout.addWidget(self.status)
+
+
+    def start(self) -> None:
+        self.start_button.setEnabled(False)
+        self.progress.setValue(0)
+        self.thread = SearchThread(self.space, self.samples.value(), self)
+        self.thread.progress.connect(self.progress.setValue)
+        self.thread.found.connect(self.show_front)
+        self.thread.failed.connect(self.show_error)
+        self.thread.finished.connect(self.on_finished)
+        self.thread.start()
+
+
+    def show_front(self, result) -> None:
+        self.front = result['front']
+        self.table.setRowCount(len(self.front))
+        for i, item in enumerate(self.front):
+            cap = item['cap'] if item['cap_relation'] is None else f'{item["cap"]} {item["cap_relation"]}'
+            cells = (
+                fmt(item['area'], 4),
+                fmt(item['min_margin'], 3),
+                str(item['failing_floors']),
+                cap,
+                item['klapan'].replace('\n', ' '),
+                section_text({'a': item['main'][0], 'b': item['main'][1]}),
+                section_text({'a': item['sputnik'][0], 'b': item['sputnik'][1]}),
+            )
+            for j, text in enumerate(cells):
+                cell = QTableWidgetItem(text)
+                if j == 1 and item['min_margin'] < 0:
+                    cell.setForeground(Qt.GlobalColor.red)
+                self.table.setItem(i, j, cell)
+        self.status.setText(CONSTANTS.SEARCH.STATUS.format(
+            result['size'], result['evaluated'], result['draft'], len(self.front)
+        ))
+
+
+    def show_error(self, error) -> None:
+        QMessageBox.critical(self, 'Ошибка', error)
+
+
+    def on_finished(self) -> None:
+        self.start_button.setEnabled(True)
+        self.thread.deleteLater()
+        self.thread = None
+
+
+    def choose(self, row, column) -> None:
+        self.main_window.apply_design(self.front[row])
+        self.accept()
+
+
+    def done(self, result) -> None:
+        if self.thread is not None:
+            self.thread.requestInterruption()
+            self.thread.wait()
+        super().done(result)
+
+
+class CapHeightDialog(QDialog):
+    def __init__(self, window, project) -> None:
+        super().__init__(window)
+        self.main_window = window
+        self.project = project
+        self.items = []
+        self.setWindowTitle(CONSTANTS.CAP_HEIGHT.TITLE)
+        self.resize(640, 600)
+
+        self.max_height = QDoubleSpinBox()
+        self.max_height.setRange(CAP_HEIGHT_STEP, CAP_HEIGHT_MAX)
+        self.max_height.setSingleStep(CAP_HEIGHT_STEP)
+        self.max_height.setValue(CAP_HEIGHT_MAX)
+        self.max_height.setPrefix(CONSTANTS.CAP_HEIGHT.MAX_HEIGHT)
+        self.max_height.setSuffix(' м')
+        self.tolerance = QDoubleSpinBox()
+        self.tolerance.setRange(0, 100)
+        self.tolerance.setDecimals(3)
+        self.tolerance.setSingleStep(0.1)
+        self.tolerance.setPrefix(CONSTANTS.CAP_HEIGHT.TOLERANCE)
+        self.tolerance.setSuffix(' Па')
+        top = QHBoxLayout()
+        top.addWidget(self.max_height)
+        top.addWidget(self.tolerance)
+
+        self.table = QTableWidget(0, len(CONSTANTS.CAP_HEIGHT.HEADERS))
+        self.table.setHorizontalHeaderLabels(CONSTANTS.CAP_HEIGHT.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.cellDoubleClicked.connect(self.apply)
+        self.status = QLabel()
+
+        apply_button = QPushButton(CONSTANTS.SIZING.APPLY)
+        apply_button.clicked.connect(self.apply)
+        layout = QVBoxLayout(self)
+        layout.addLayout(top)
+        layout.addWidget(self.status)
+        layout.addWidget(self.table)
+        layout.addWidget(QLabel(CONSTANTS.CAP_HEIGHT.HINT))
+        layout.addWidget(apply_button)
+
+        self.max_height.valueChanged.connect(self.update_heights)
+        self.tolerance.valueChanged.connect(self.update_heights)
+        self.update_heights()
+
+
+    def update_heights(self, *args) -> None:
+        result = cap_heights(self.project, self.max_height.value(), self.tolerance.value())
+        self.items = [item for item in result['heights'] if item['cap_pressure'] is not None]
+        self.table.setRowCount(len(self.items))
+        for i, item in enumerate(self.items):
+            cells = (
+                f'{item["h"]:.2f}',
+                fmt(item['relation'], 2),
+                fmt(item['kms'], 2),
+                fmt(item['cap_pressure'], 3),
+                fmt(item['min_margin'], 3),
+                str(item['failing_floors']),
+            )
+            for j, text in enumerate(cells):
+                cell = QTableWidgetItem(text)
+                if j == 4 and item['min_margin'] is not None and item['min_margin'] < 0:
+                    cell.setForeground(Qt.GlobalColor.red)
+                self.table.setItem(i, j, cell)
+        if result['best'] is None:
+            self.status.setText(CONSTANTS.CAP_HEIGHT.NONE)
+            return
+        self.table.selectRow(self.items.index(result['best']))
+        draft = result['draft']
+        draft = CONSTANTS.CAP_HEIGHT.NO_DRAFT if draft is None else CONSTANTS.CAP_HEIGHT.DRAFT.format(draft['h'])
+        self.status.setText(f'{CONSTANTS.CAP_HEIGHT.BEST.format(result["best"]["h"])}; {draft}')
+
+
+    def apply(self, *args) -> None:
+        row = self.table.currentRow()
+        if row < 0:
+            return
+        self.main_window.input_h.setText(f'{self.items[row]["h"]:g}')
+        self.accept()
+
+
+class ValvesDialog(QDialog):
+    def __init__(self, window, ranking) -> None:
+        super().__init__(window)
+        self.main_window = window
+        self.ranking = ranking
+        self.setWindowTitle(CONSTANTS.VALVES.TITLE)
+        self.resize(640, 600)
+
+        self.table = QTableWidget(len(ranking), len(CONSTANTS.VALVES.HEADERS))
+        self.table.setHorizontalHeaderLabels(CONSTANTS.VALVES.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        current = window.klapan_widget.currentText()
+        for i, valve in enumerate(ranking):
+            cells = (
+                valve['klapan'].replace('\n', ' '),
+                str(valve['capacity']),
+                fmt(valve['klapan_pressure_loss'], 3),
+                fmt(valve['min_margin'], 3),
+                f'{valve["draft_floors"]} из {valve["floors"]}',
+            )
+            for j, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if j == 3 and valve['min_margin'] is not None and valve['min_margin'] < 0:
+                    item.setForeground(Qt.GlobalColor.red)
+                self.table.setItem(i, j, item)
+            if valve['klapan'] == current:
+                self.table.selectRow(i)
+        self.table.cellDoubleClicked.connect(self.choose)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.table)
+        layout.addWidget(QLabel(CONSTANTS.VALVES.HINT))
+
+
+    def choose(self, row, column) -> None:
+        self.main_window.klapan_widget.setCurrentText(self.ranking[row]['klapan'])
+        self.accept()
+
+
+class WhatIfDialog(QDialog):
+    def __init__(self, window, model) -> None:
+        super().__init__(window)
+        self.model = model
+        self.setWindowTitle(CONSTANTS.WHAT_IF.TITLE)
+        self.resize(640, 700)
+
+        values = project_inputs(model.project)
+        grid = QGridLayout()
+        self.sliders, self.labels, self.ranges = {}, {}, {}
+        for i, name in enumerate(model.names):
+            low, high = model.domain[name]
+            outside = (high - low) * CONSTANTS.WHAT_IF.OUTSIDE
+            start = low - outside if name == 'temperature' or low - outside > 0 else low / 2
+            # the steps are shifted so that the value of the project is one of them
+            step = (high + outside - start) / CONSTANTS.WHAT_IF.STEPS
+            position = round((values[name] - start) / step)
+            self.ranges[name] = (values[name] - position * step, step)
+            slider = QSlider(Qt.Orientation.Horizontal)
+            slider.setRange(0, CONSTANTS.WHAT_IF.STEPS)
+            slider.setValue(position)
+            slider.valueChanged.connect(self.update_floors)
+            self.sliders[name] = slider
+            self.labels[name] = QLabel()
+            self.labels[name].setFixedWidth(80)
+            grid.addWidget(QLabel(CONSTANTS.WHAT_IF.INPUTS[name]), i, 0)
+            grid.addWidget(slider, i, 1)
+            grid.addWidget(self.labels[name], i, 2)
+
+        self.table = QTableWidget(model.floors, len(CONSTANTS.WHAT_IF.HEADERS))
+        self.table.setHorizontalHeaderLabels(CONSTANTS.WHAT_IF.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        for r in range(model.floors):
+            self.table.setItem(r, 0, QTableWidgetItem(str(model.floors - r)))
+            for j in range(1, len(CONSTANTS.WHAT_IF.HEADERS)):
+                self.table.setItem(r, j, QTableWidgetItem())
+        self.text_color = self.table.item(0, 0).foreground()
+        self.status = QLabel()
+        self.status.setWordWrap(True)
+        errors = model.errors
+        self.inaccurate = (
+            max(errors['full_pressure'], errors['available_pressure']) > CONSTANTS.WHAT_IF.MAX_ERROR
+            or errors['draft_agreement'] < CONSTANTS.WHAT_IF.MIN_AGREEMENT
+        )
+        if self.inaccurate:
+            self.status.setStyleSheet('color: red; font-weight: bold')
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(grid)
+        layout.addWidget(self.table)
+        layout.addWidget(self.status)
+        self.update_floors()
+
+
+    def values(self) -> dict:
+        values = {}
+        for name, slider in self.sliders.items():
+            start, step = self.ranges[name]
+            values[name] = round(start + step * slider.value(), 6)
+        return values
+
+
+    def update_floors(self, *args) -> None:
+        values = self.values()
+        for name, value in values.items():
+            self.labels[name].setText(f'{value:.1f}')
+        started = time.perf_counter()
+        result = self.model.predict(values, exact=self.inaccurate)
+        elapsed = (time.perf_counter() - started) * 1e6
+        for r in range(self.model.floors):
+            full, available = result['full_pressure'][r], result['available_pressure'][r]
+            known = not (math.isnan(full) or math.isnan(available))
+            cells = (
+                fmt(None if math.isnan(full) else float(full), 3),
+                fmt(None if math.isnan(available) else float(available), 3),
+                fmt(float(available - full) if known else None, 3),
+                CONSTANTS.WHAT_IF.DRAFT[int(available > full)] if known else '',
+            )
+            for j, text in enumerate(cells, start=1):
+                item = self.table.item(r, j)
+                item.setText(text)
+                item.setForeground(Qt.GlobalColor.red if known and j in (3, 4) and available <= full else self.text_color)
+        errors = self.model.errors
+        if self.inaccurate:
+            self.status.setText(CONSTANTS.WHAT_IF.INACCURATE.format(
+                errors['full_pressure'], errors['available_pressure'], errors['draft_agreement'], elapsed
+            ))
+        elif result['exact']:
+            self.status.setText(CONSTANTS.WHAT_IF.EXACT.format(elapsed))
+        else:
+            self.status.setText(CONSTANTS.WHAT_IF.MODEL.format(
+                errors['checks'], errors['full_pressure'], errors['available_pressure'], errors['draft_agreement'], elapsed
+            ))
+
+
+class GoalSeekDialog(QDialog):
+    def __init__(self, window, project) -> None:
+        super().__init__(window)
+        self.main_window = window
+        self.project = project
+        self.result = None
+        self.setWindowTitle(CONSTANTS.GOAL_SEEK.TITLE)
+        self.resize(640, 700)
+
+        self.input = QComboBox()
+        for name, label in CONSTANTS.GOAL_SEEK.INPUTS.items():
+            self.input.addItem(label, name)
+        self.target = QDoubleSpinBox()
+        self.target.setRange(-100, 100)
+        self.target.setDecimals(3)
+        self.target.setSingleStep(0.1)
+        self.target.setPrefix(CONSTANTS.GOAL_SEEK.TARGET)
+        self.target.setSuffix(' Па')
+        self.low = QDoubleSpinBox()
+        self.low.setPrefix(CONSTANTS.GOAL_SEEK.LOW)
+        self.high = QDoubleSpinBox()
+        self.high.setPrefix(CONSTANTS.GOAL_SEEK.HIGH)
+        start_button = QPushButton(CONSTANTS.GOAL_SEEK.START)
+        start_button.clicked.connect(self.seek)
+        top = QGridLayout()
+        top.addWidget(self.input, 0, 0)
+        top.addWidget(self.target, 0, 1)
+        top.addWidget(self.low, 1, 0)
+        top.addWidget(self.high, 1, 1)
+        top.addWidget(start_button, 0, 2, 2, 1)
+
+        self.table = QTableWidget(0, len(CONSTANTS.GOAL_SEEK.HEADERS))
+        self.table.setHorizontalHeaderLabels(CONSTANTS.GOAL_SEEK.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.status = QLabel()
+        self.status.setWordWrap(True)
+
+        self.apply_button = QPushButton(CONSTANTS.SIZING.APPLY)
+        self.apply_button.setEnabled(False)
+        self.apply_button.clicked.connect(self.apply)
+        layout = QVBoxLayout(self)
+        layout.addLayout(top)
+        layout.addWidget(self.status)
+        layout.addWidget(self.table)
+        layout.addWidget(self.apply_button)
+
+        self.input.currentIndexChanged.connect(self.set_range)
+        self.set_range()
+
+
+    def set_range(self, *args) -> None:
+        low, high, step = GOAL_SEEK_INPUTS[self.input.currentData()]
+        for spin in (self.low, self.high):
+            spin.setDecimals(digits(self.input.currentData()))
+            spin.setRange(low, high)
+            spin.setSingleStep(step)
+        self.low.setValue(low)
+        self.high.setValue(high)
+        self.result = None
+        self.apply_button.setEnabled(False)
+        self.table.setRowCount(0)
+        self.status.setText('')
+
+
+    def seek(self) -> None:
+        name = self.input.currentData()
+        try:
+            self.result = goal_seek(self.project, name, self.target.value(), self.low.value(), self.high.value())
+        except ValueError:
+            self.result = None
+        result = self.result
+        self.apply_button.setEnabled(result is not None and result['value'] is not None)
+        if result is None or result['value'] is None:
+            self.table.setRowCount(0)
+            text = CONSTANTS.GOAL_SEEK.EVERYWHERE if result is not None and result['everywhere'] else CONSTANTS.GOAL_SEEK.NONE
+            text = text.format(self.low.value(), self.high.value(), self.target.value())
+            if result is not None and not result['everywhere'] and 'best' in result:
+                text += CONSTANTS.GOAL_SEEK.BEST.format(result['best_margin'], value_text(name, result['best']))
+            self.status.setText(text)
+            return
+        self.status.setText(CONSTANTS.GOAL_SEEK.VALUE.format(
+            self.input.currentText(), value_text(name, result['value']), result['min_margin'],
+            result['failing_floors'], result['iterations'], result['evaluations'],
+        ))
+        self.table.setRowCount(len(result['floors']))
+        for r, floor in enumerate(result['floors']):
+            cells = (
+                str(floor['floor']),
+                fmt(floor['full_pressure'], 3),
+                fmt(floor['available_pressure'], 3),
+                fmt(floor['margin'], 3),
+                '' if floor['draft'] is None else CONSTANTS.GOAL_SEEK.DRAFT[int(floor['draft'])],
+            )
+            for j, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if j in (3, 4) and floor['draft'] is False:
+                    item.setForeground(Qt.GlobalColor.red)
+                self.table.setItem(r, j, item)
+
+
+    def apply(self) -> None:
+        if self.result is None or self.result['value'] is None:
+            return
+        name = self.result['input']
+        self.main_window.set_input(name, value_text(name, self.result['value']))
+        self.accept()
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -84,11 +894,35 @@ class MainWindow(QMainWindow):
             }
         '''
         self.rows_count = 0
+        # the first floors of the zones of the main channel above the bottom one, each zone has its own section
+        self.zones = set()
         self.current_file_path = None
 
-        self.auto_save_timer = QTimer()
-        self.auto_save_timer.timeout.connect(self.auto_save)
-        self.auto_save_timer.start(300_000)  # 5 minutes in milliseconds
+        self.export_thread = None
+        self.library_watcher = None
+        self.journal = None
+        self.journal_timer = QTimer()
+        self.journal_timer.setSingleShot(True)
+        self.journal_timer.setInterval(CONSTANTS.RECOVERY.DEBOUNCE)
+        self.journal_timer.timeout.connect(self.write_journal)
+        self.preview_sections = []
+        self.preview_timer = QTimer()
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(CONSTANTS.PREVIEW.DEBOUNCE)
+        self.preview_timer.timeout.connect(self.update_preview)
+        # catalog sizes under the a/b cells of the main table, looked up in an index of the per-size losses
+        self.size_index = None
+        self.size_index_thread = None
+        self.size_index_timer = QTimer()
+        self.size_index_timer.setSingleShot(True)
+        self.size_index_timer.setInterval(CONSTANTS.SUGGEST.DEBOUNCE)
+        self.size_index_timer.timeout.connect(self.refresh_size_index)
+        self.size_row = None
+        self.size_model = QStandardItemModel(self)
+        self.size_completer = QCompleter(self.size_model, self)
+        self.size_completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.size_completer.popup().setFont(QFont('Consolas', 10))
+        self.size_completer.activated[QModelIndex].connect(self.apply_size_suggestion)
 
         menubar = self.menuBar()
         file_menu = menubar.addMenu(CONSTANTS.MENU[0])
@@ -132,6 +966,18 @@ class MainWindow(QMainWindow):
         self.load_recent_files()
         self.update_recent_files_menu()
 
+        library_action = QAction(CONSTANTS.LIBRARY.TITLE, self)
+        library_action.setIcon(QIcon(os.path.join(basedir, CONSTANTS.LIBRARY.ICON)))
+        library_action.setShortcut(CONSTANTS.LIBRARY.SHORTCUT)
+        library_action.triggered.connect(self.show_library)
+        file_menu.insertAction(file_menu.actions()[2], library_action)
+
+        tables_action = QAction(CONSTANTS.EXPORT.TABLES_TITLE, self)
+        tables_action.setIcon(QIcon(os.path.join(basedir, CONSTANTS.FILE_MENU_ICONS[3])))
+        tables_action.setShortcut(CONSTANTS.EXPORT.TABLES_SHORTCUT)
+        tables_action.triggered.connect(self.export_tables)
+        file_menu.addAction(tables_action)
+
         menubar.setStyleSheet('''
             QMenuBar {
                 font-family: Consolas;
@@ -177,10 +1023,16 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(self.tab_widget)
         self.tab_widget.addTab(self.create_tab1_content(), CONSTANTS.TAB1_TITLE)
         self.tab_widget.addTab(self.create_tab2_content(), CONSTANTS.TAB2_TITLE)
+        self.tab_widget.addTab(self.create_tab3_content(), CONSTANTS.TAB3_TITLE)
         self.tab_widget.setTabVisible(1, False)
+        self.tab_widget.currentChanged.connect(self.update_preview)
 
         self.showMaximized()
         self.setMaximumWidth(1680)
+        self.recover_session()
+        self.start_journal()
+        if self.settings.value('libraryDir'):
+            self.start_library(self.settings.value('libraryDir'))
         self.check_updates()
 
 
@@ -239,6 +1091,17 @@ class MainWindow(QMainWindow):
         return _widget
 
 
+    def create_tab3_content(self) -> object:
+        _widget = QWidget()
+        _layout = QVBoxLayout()
+        self.preview = QTextBrowser()
+        self.preview.setOpenLinks(False)
+        self.preview.document().setDefaultStyleSheet(CONSTANTS.PREVIEW.STYLE)
+        _layout.addWidget(self.preview)
+        _widget.setLayout(_layout)
+        return _widget
+
+
     def create_init_data_box(self) -> object:
         _box = QGroupBox(CONSTANTS.INIT_DATA.TITLE)
         style = self.box_style
@@ -281,6 +1144,7 @@ class MainWindow(QMainWindow):
         temperature_widget.textChanged.connect(self.calculate_branch_pressure)
         temperature_widget.textChanged.connect(self.calculate_pass_pressure)
         temperature_widget.textChanged.connect(self.calculate_channel_cap)
+        temperature_widget.textChanged.connect(self.schedule_updates)
 
         surface_item = _init_data.itemAtPosition(1, 1)
         self.surface_widget = surface_item.widget()
@@ -292,6 +1156,7 @@ class MainWindow(QMainWindow):
         surface_widget.setToolTip(CONSTANTS.INIT_DATA.SURFACE_INPUT_TOOLTIP)
         surface_widget.textChanged.connect(self.calculate_sputnik_specific_pressure_loss)
         surface_widget.textChanged.connect(self.calculate_specific_pressure_loss)
+        surface_widget.textChanged.connect(self.schedule_updates)
 
         floor_height_item = _init_data.itemAtPosition(2, 1)
         self.floor_height_widget = floor_height_item.widget()
@@ -301,6 +1166,7 @@ class MainWindow(QMainWindow):
         floor_height_widget.setValidator(floor_height_validator)
         floor_height_widget.textChanged.connect(self.set_base_floor_height_in_table)
         floor_height_widget.textChanged.connect(self.calculate_height)
+        floor_height_widget.textChanged.connect(self.schedule_updates)
 
         self.channel_height_item = _init_data.itemAtPosition(3, 1)
         self.channel_height_widget = self.channel_height_item.widget()
@@ -310,6 +1176,7 @@ class MainWindow(QMainWindow):
         channel_height_validator = QRegularExpressionValidator(channel_height_regex)
         channel_height_widget.setValidator(channel_height_validator)
         channel_height_widget.textChanged.connect(self.calculate_height)
+        channel_height_widget.textChanged.connect(self.schedule_updates)
 
         klapan_label = QLabel(CONSTANTS.INIT_DATA.KLAPAN_LABEL)
         self.klapan_widget = CustomComboBox()
@@ -336,9 +1203,15 @@ class MainWindow(QMainWindow):
         klapan_widget.currentTextChanged.connect(self.set_klapan_air_flow_in_label)
         klapan_widget.currentTextChanged.connect(self.calculate_sputnik_klapan_pressure_loss)
         klapan_widget.currentTextChanged.connect(self.activate_klapan_input)
+        klapan_widget.currentTextChanged.connect(self.schedule_updates)
+        valves_button = QPushButton(CONSTANTS.VALVES.BUTTON)
+        valves_button.setToolTip(CONSTANTS.VALVES.TITLE)
+        valves_button.setFixedHeight(CONSTANTS.INIT_DATA.LINE_HEIGHT)
+        valves_button.clicked.connect(self.show_valves)
         klapan_layout = QHBoxLayout()
         klapan_layout.addWidget(klapan_label)
         klapan_layout.addWidget(klapan_widget)
+        klapan_layout.addWidget(valves_button)
 
         klapan_input_label_1 = QLabel(CONSTANTS.INIT_DATA.KLAPAN_INPUT_LABEL_1)
         self.klapan_input = QLineEdit()
@@ -355,6 +1228,7 @@ class MainWindow(QMainWindow):
         klapan_input.setValidator(klapan_input_validator)
         klapan_input.setToolTip(CONSTANTS.INIT_DATA.KLAPAN_INPUT_TOOLTIP)
         klapan_input.textChanged.connect(self.calculate_sputnik_klapan_pressure_loss)
+        klapan_input.textChanged.connect(self.schedule_updates)
 
         _init_data.addLayout(klapan_layout, 4, 0, 1, 2)
         _init_data.addWidget(self.klapan_air_flow_label, 4, 2)
@@ -408,6 +1282,7 @@ class MainWindow(QMainWindow):
         cap_type.currentTextChanged.connect(self.calculate_available_pressure)
         cap_type.currentTextChanged.connect(self.activate_channel_cap)
         cap_type.currentTextChanged.connect(self.activate_deflector_tab)
+        cap_type.currentTextChanged.connect(self.schedule_updates)
 
 
         _layout.addWidget(cap_type, 0, 1)
@@ -432,6 +1307,7 @@ class MainWindow(QMainWindow):
         input.hide()
 
         input.textChanged.connect(self.calculate_channel_cap)
+        input.textChanged.connect(self.schedule_updates)
         _layout.addWidget(input, 0, 3)
 
         label_3 = QLabel('м')
@@ -475,6 +1351,7 @@ class MainWindow(QMainWindow):
         relations.hide()
 
         relations.currentTextChanged.connect(self.calculate_channel_cap)
+        relations.currentTextChanged.connect(self.schedule_updates)
         _layout.addWidget(relations, 0, 7)
 
         label_5 = QLabel('Pш')
@@ -500,7 +1377,15 @@ class MainWindow(QMainWindow):
         label_6.hide()
         _layout.addWidget(label_6, 0, 10)
 
-        _widget.setMaximumWidth(650)
+        height_button = QPushButton(CONSTANTS.CAP_HEIGHT.BUTTON)
+        height_button.setToolTip(CONSTANTS.CAP_HEIGHT.TITLE)
+        height_button.setFixedHeight(CONSTANTS.CAP.LINE_HEIGHT)
+        height_button.setStyleSheet('QPushButton { background-color: #CCFFFF; border-radius: 5px; }')
+        height_button.hide()
+        height_button.clicked.connect(self.show_cap_height)
+        _layout.addWidget(height_button, 0, 11)
+
+        _widget.setMaximumWidth(750)
         _widget.setLayout(_layout)
         return _widget
 
@@ -538,6 +1423,7 @@ class MainWindow(QMainWindow):
         add_row_button.clicked.connect(self.change_dimensions_cells_in_table)
         add_row_button.clicked.connect(self.calculate_kms)
         add_row_button.clicked.connect(self.copy_table_dimensions)
+        add_row_button.clicked.connect(self.schedule_updates)
 
         self.input_for_delete = QLineEdit()
         input = self.input_for_delete
@@ -571,11 +1457,76 @@ class MainWindow(QMainWindow):
             }
         ''')
         _layout.addWidget(delete_row_button)
+
+        self.sizing_button = QPushButton()
+        sizing_button = self.sizing_button
+        sizing_button.setText(CONSTANTS.SIZING.BUTTON)
+        sizing_button.setToolTip(CONSTANTS.SIZING.TITLE)
+        sizing_button.setFixedHeight(40)
+        sizing_button.setFixedWidth(80)
+        sizing_button.setStyleSheet('''
+            QPushButton {
+                background-color: #CCFFFF; border-radius: 5px;
+            }
+            QPushButton:hover {
+                border: 2px solid grey;
+                background: transparent;
+            }
+            QPushButton:pressed {
+                border: 0px;
+                background: black;
+                color: white;
+            }
+        ''')
+        _layout.addWidget(sizing_button)
+        sizing_button.clicked.connect(self.show_sizing)
+
+        self.zoning_button = QPushButton()
+        zoning_button = self.zoning_button
+        zoning_button.setText(CONSTANTS.ZONING.BUTTON)
+        zoning_button.setToolTip(CONSTANTS.ZONING.TITLE)
+        zoning_button.setFixedHeight(40)
+        zoning_button.setFixedWidth(80)
+        zoning_button.setStyleSheet(sizing_button.styleSheet())
+        _layout.addWidget(zoning_button)
+        zoning_button.clicked.connect(self.show_zoning)
+
+        self.search_button = QPushButton()
+        search_button = self.search_button
+        search_button.setText(CONSTANTS.SEARCH.BUTTON)
+        search_button.setToolTip(CONSTANTS.SEARCH.TITLE)
+        search_button.setFixedHeight(40)
+        search_button.setFixedWidth(80)
+        search_button.setStyleSheet(sizing_button.styleSheet())
+        _layout.addWidget(search_button)
+        search_button.clicked.connect(self.show_search)
+
+        self.what_if_button = QPushButton()
+        what_if_button = self.what_if_button
+        what_if_button.setText(CONSTANTS.WHAT_IF.BUTTON)
+        what_if_button.setToolTip(CONSTANTS.WHAT_IF.TITLE)
+        what_if_button.setFixedHeight(40)
+        what_if_button.setFixedWidth(80)
+        what_if_button.setStyleSheet(sizing_button.styleSheet())
+        _layout.addWidget(what_if_button)
+        what_if_button.clicked.connect(self.show_what_if)
+
+        self.goal_seek_button = QPushButton()
+        goal_seek_button = self.goal_seek_button
+        goal_seek_button.setText(CONSTANTS.GOAL_SEEK.BUTTON)
+        goal_seek_button.setToolTip(CONSTANTS.GOAL_SEEK.TITLE)
+        goal_seek_button.setFixedHeight(40)
+        goal_seek_button.setFixedWidth(80)
+        goal_seek_button.setStyleSheet(sizing_button.styleSheet())
+        _layout.addWidget(goal_seek_button)
+        goal_seek_button.clicked.connect(self.show_goal_seek)
+
         delete_row_button.clicked.connect(self.delete_row)
         delete_row_button.clicked.connect(self.set_sputnik_airflow_in_table)
         delete_row_button.clicked.connect(self.set_full_air_flow_in_deflector)
         delete_row_button.clicked.connect(self.change_dimensions_cells_in_table)
         delete_row_button.clicked.connect(self.calculate_kms)
+        delete_row_button.clicked.connect(self.schedule_updates)
 
         _widget.setLayout(_layout)
         return _widget
@@ -626,6 +1577,7 @@ class MainWindow(QMainWindow):
 
         klapan_flow.textChanged.connect(self.calculate_sputnik_klapan_pressure_loss)
         klapan_flow.textChanged.connect(self.calculate_full_pressure)
+        klapan_flow.textChanged.connect(self.schedule_updates)
 
         for i in (1, 3, 5):
             edit = QLineEdit()
@@ -671,6 +1623,7 @@ class MainWindow(QMainWindow):
                             regex = r'^([1-9]\d{0,2}|1\d{3}|2000)?$'
                     validator = QRegularExpressionValidator(regex)
                     edit.setValidator(validator)
+                    edit.textChanged.connect(self.schedule_updates)
                 else:
                     edit.setStyleSheet(read_only_edit_style)
                     edit.setReadOnly(True)
@@ -719,10 +1672,20 @@ class MainWindow(QMainWindow):
 
         self.radio_button2.clicked.connect(self.uncheck_radio_button_1)
         self.radio_button1.clicked.connect(self.uncheck_radio_button_2)
+        self.radio_button1.clicked.connect(self.schedule_updates)
+        self.radio_button2.clicked.connect(self.schedule_updates)
 
         cell_1_13 = _layout.itemAtPosition(1, 13).widget()
         cell_1_13.textChanged.connect(self.calculate_sputnik_result_pressure)
 
+        sizing_button = QPushButton(CONSTANTS.SIZING.SPUTNIK_BUTTON)
+        sizing_button.setToolTip(CONSTANTS.SIZING.SPUTNIK_TITLE)
+        sizing_button.setFixedHeight(CONSTANTS.SPUTNIK_TABLE.HEIGHT)
+        sizing_button.setMinimumWidth(CONSTANTS.SPUTNIK_TABLE.WIDTHS.get(14))
+        sizing_button.setStyleSheet('QPushButton { background-color: #CCFFFF; border-radius: 5px; }')
+        sizing_button.clicked.connect(self.show_sputnik_sizing)
+        _layout.addWidget(sizing_button, 1, 14)
+
         cell_2_1 = _layout.itemAtPosition(2, 1).widget()
         cell_2_1.textChanged.connect(self.calculate_sputnik_air_velocity)
         cell_2_1.textChanged.connect(self.set_sputnik_airflow_in_table)
@@ -864,6 +1827,7 @@ class MainWindow(QMainWindow):
                     edit.textChanged.connect(self.calculate_m)
                     edit.textChanged.connect(self.calculate_kms)
                     edit.textChanged.connect(self.copy_table_dimensions)
+                    edit.textEdited.connect(partial(self.suggest_sizes, edit))
                 case 12:
                     edit.textChanged.connect(self.calculate_dynamic)
                     edit.textChanged.connect(self.calculate_specific_pressure_loss)
@@ -881,6 +1845,9 @@ class MainWindow(QMainWindow):
                 case 20:
                     edit.textChanged.connect(self.calculate_channel_cap)
 
+            if i in (1, 2, 10, 11):
+                edit.textChanged.connect(self.schedule_updates)
+
             if i in (1, 10, 11):
                 match i:
                     case 1:
@@ -971,6 +1938,9 @@ class MainWindow(QMainWindow):
                 case 20:
                     edit.textChanged.connect(self.calculate_channel_cap)
 
+            if i in (1, 2, 8, 10, 11):
+                edit.textChanged.connect(self.schedule_updates)
+
             if i in (1, 8, 9, 10, 11):
                 match i:
                     case 1:
@@ -1011,6 +1981,13 @@ class MainWindow(QMainWindow):
                 parent_widget.setParent(None)
                 parent_widget.deleteLater()
                 self.rows_count -= 1
+                self.zones = {
+                    zone - 1 if zone > row_for_delete else zone for zone in self.zones
+                    if 1 < zone - (zone > row_for_delete) <= self.rows_count
+                }
+                # the floor above a deleted zone bottom becomes the new one and gets its editable cells
+                self.change_dimensions_cells_in_table()
+                self.copy_table_dimensions(None)
                 self.input_for_delete.setText('')
                 self.update_floor_number()
                 self.calculate_height()
@@ -1079,140 +2056,54 @@ class MainWindow(QMainWindow):
     def calculate_sputnik_air_velocity(self, value) -> None:
         sputnik = self.sputnik
         row, _, _, _ = sputnik.getItemPosition(sputnik.indexOf(self.sender()))
-
-        air_flow = sputnik.itemAtPosition(row, 1).widget().text()
-        a = sputnik.itemAtPosition(row, 3).widget().text()
-        b = sputnik.itemAtPosition(row, 4).widget().text()
-        if all([air_flow, a, b]):
-            result = float(air_flow) / (3_600 * ((float(a) * float(b) / 1_000_000)))
-            result = '{:.2f}'.format(round(result, 2))
-            sputnik.itemAtPosition(row, 5).widget().setText(result)
-        elif all([air_flow, a]):
-            result = float(air_flow) / (3_600 * (3.1415 * (float(a) / 1_000) * (float(a) / 1_000) / 4))
-            result = '{:.2f}'.format(round(result, 2))
-            sputnik.itemAtPosition(row, 5).widget().setText(result)
-        else:
-            sputnik.itemAtPosition(row, 5).widget().setText('')
+        velocity = self.sputnik_segment(row)['velocity']
+        sputnik.itemAtPosition(row, 5).widget().setText(fmt(velocity, 2))
 
 
     def calculate_sputnik_diameter(self, value) -> None:
         sputnik = self.sputnik
         row, _, _, _ = sputnik.getItemPosition(sputnik.indexOf(self.sender()))
-
-        a = sputnik.itemAtPosition(row, 3).widget().text()
-        b = sputnik.itemAtPosition(row, 4).widget().text()
-        if all([a, b]):
-            diameter = (2 * float(a) * float(b) / (float(a) + float(b)) / 1_000)
-            diameter = '{:.3f}'.format(round(diameter, 3))
-            sputnik.itemAtPosition(row, 6).widget().setText(diameter)
-        elif a:
-            diameter = float(a) / 1_000
-            diameter = '{:.3f}'.format(round(diameter, 3))
-            sputnik.itemAtPosition(row, 6).widget().setText(diameter)
-        else:
-            sputnik.itemAtPosition(row, 6).widget().setText('')
+        diameter = self.sputnik_segment(row)['diameter']
+        sputnik.itemAtPosition(row, 6).widget().setText(fmt(diameter, 3))
 
 
     def calculate_sputnik_specific_pressure_loss(self, value) -> None:
-        sputnik = self.sputnik
-        temperature = self.temperature_widget.text()
-        surface = self.surface_widget.text()
         for row in (2, 4):
-            velocity = sputnik.itemAtPosition(row, 5).widget().text()
-            diameter = sputnik.itemAtPosition(row, 6).widget().text()
-            dynamic = sputnik.itemAtPosition(row, 10).widget().text()
-            if all([temperature, diameter, velocity, surface, dynamic]):
-                try:
-                    temperature = float(temperature)
-                    velocity = float(velocity)
-                    diameter = float(diameter)
-                    surface = float(surface)
-                    dynamic = float(dynamic)
-                    mu = 1.458 * pow(10, -6) * pow((273.15 + temperature), 1.5) / ((273.15 + temperature) + 110.4)
-                    density = 353 / (273.15 + temperature)
-                    v = mu / density
-                    re = velocity * diameter / v
-                    lam = 0.11 * pow(((surface / 1_000) / diameter + 68 / re), 0.25)
-                    result = (lam / diameter) * dynamic
-                    result = '{:.4f}'.format(round(result, 4))
-                    sputnik.itemAtPosition(row, 7).widget().setText(result)
-                except ZeroDivisionError:
-                    sputnik.itemAtPosition(row, 7).widget().setText('')
-            else:
-                sputnik.itemAtPosition(row, 7).widget().setText('')
+            r = self.sputnik_segment(row)['specific_pressure_loss']
+            self.sputnik.itemAtPosition(row, 7).widget().setText(fmt(r, 4))
 
 
     def calculate_sputnik_dynamic(self, value) -> None:
         sputnik = self.sputnik
-        row, _, _, _ = sputnik.getItemPosition(sputnik.indexOf(self.sender()))
-        name = self.sender().objectName()
-
-        if name == 'temperature':
-            temperature = value
-            for row in (2, 4):
-                velocity = sputnik.itemAtPosition(row, 5).widget().text()
-                if all([temperature, velocity]):
-                    temperature = float(temperature)
-                    velocity = float(velocity)
-                    density = 353 / (273.15 + temperature)
-                    result = velocity * velocity * density / 2
-                    result = '{:.3f}'.format(round(result, 3))
-                    sputnik.itemAtPosition(row, 10).widget().setText(result)
-                else:
-                    sputnik.itemAtPosition(row, 10).widget().setText('')
+        if self.sender().objectName() == 'temperature':
+            rows = (2, 4)
         else:
-            temperature = self.temperature_widget.text()
-            velocity = sputnik.itemAtPosition(row, 5).widget().text()
-            if all([temperature, velocity]):
-                temperature = float(temperature)
-                velocity = float(velocity)
-                density = 353 / (273.15 + temperature)
-                result = velocity * velocity * density / 2
-                result = '{:.3f}'.format(round(result, 3))
-                sputnik.itemAtPosition(row, 10).widget().setText(result)
-            else:
-                sputnik.itemAtPosition(row, 10).widget().setText('')
+            row, _, _, _ = sputnik.getItemPosition(sputnik.indexOf(self.sender()))
+            rows = (row,)
+        for row in rows:
+            dynamic = self.sputnik_segment(row)['dynamic']
+            sputnik.itemAtPosition(row, 10).widget().setText(fmt(dynamic, 3))
 
 
     def calculate_sputnik_m(self, value) -> None:
         sputnik = self.sputnik
         row, _, _, _ = sputnik.getItemPosition(sputnik.indexOf(self.sender()))
-        axis_x = CONSTANTS.REFERENCE_DATA.M.X
-        axis_y = CONSTANTS.REFERENCE_DATA.M.Y
-        z = array(CONSTANTS.REFERENCE_DATA.M.TABLE)
-        interpolator = RegularGridInterpolator((axis_y, axis_x), z)
-
-        a = sputnik.itemAtPosition(row, 3).widget().text()
-        b = sputnik.itemAtPosition(row, 4).widget().text()
-        if all([a, b]) and all([100 <= int(a) <= 1_500, 100 <= int(b) <= 1_500]):
-            a, b = int(a), int(b)
-            m = interpolator((b, a))
-            m = '{:.3f}'.format(around(m, 3))
-            sputnik.itemAtPosition(row, 8).widget().setText(m)
-        elif a and 100 <= int(a) <= 1_500:
-            a = int(a)
-            m = interpolator((a, a))
-            m = '{:.3f}'.format(around(m, 3))
-            sputnik.itemAtPosition(row, 8).widget().setText(m)
-        else:
-            sputnik.itemAtPosition(row, 8).widget().setText('')
+        m = self.sputnik_segment(row)['m']
+        sputnik.itemAtPosition(row, 8).widget().setText(fmt(m, 3))
 
 
     def calculate_sputnik_linear_pressure_loss(self, value) -> None:
         sputnik = self.sputnik
         row, _, _, _ = sputnik.getItemPosition(sputnik.indexOf(self.sender()))
+        linear = self.sputnik_segment(row)['linear_pressure_loss']
+        sputnik.itemAtPosition(row, 9).widget().setText(fmt(linear, 4))
 
-        l = sputnik.itemAtPosition(row, 2).widget().text()
-        r = sputnik.itemAtPosition(row, 7).widget().text()
-        m = sputnik.itemAtPosition(row, 8).widget().text()
-        if all([l, r, m]):
-            l = float(l)
-            r = float(r)
-            m = float(m)
-            result = '{:.4f}'.format(round(l * r * m, 4))
-            sputnik.itemAtPosition(row, 9).widget().setText(result)
-        else:
-            sputnik.itemAtPosition(row, 9).widget().setText('')
+
+    def sputnik_segment(self, row) -> dict:
+        # a side of the satellite from airsystem.engine.segment, the cache shared with the scripted evaluation
+        sputnik = self.sputnik
+        flow, length, a, b = (number(sputnik.itemAtPosition(row, i).widget().text()) for i in (1, 2, 3, 4))
+        return segment(flow, a, b, length, number(self.temperature_widget.text()), number(self.surface_widget.text()))
 
 
     def calculate_sputnik_local_pressure_loss(self, value) -> None:
@@ -1281,7 +2172,7 @@ class MainWindow(QMainWindow):
     def change_dimensions_cells_in_table(self) -> None:
         rows = self.get_main_rows()
         for i in range(len(rows)):
-            if i != len(rows) - 1:
+            if i != len(rows) - 1 and len(rows) - i not in self.zones:
                 rows[i].itemAtPosition(0, 10).widget().setStyleSheet(
                     'QLineEdit { background-color: #EFEFEF; border: 0; border-radius: 5px; }'
                 )
@@ -1302,10 +2193,15 @@ class MainWindow(QMainWindow):
 
 
     def copy_table_dimensions(self, value) -> None:
+        # every floor gets the dimensions of the bottom floor of its zone
         rows = self.get_main_rows()
         a = rows[-1].itemAtPosition(0, 10).widget().text()
         b = rows[-1].itemAtPosition(0, 11).widget().text()
-        for i in range(len(rows) - 1):
+        for i in range(len(rows) - 2, -1, -1):
+            if len(rows) - i in self.zones:
+                a = rows[i].itemAtPosition(0, 10).widget().text()
+                b = rows[i].itemAtPosition(0, 11).widget().text()
+                continue
             if a:
                 rows[i].itemAtPosition(0, 10).widget().setText(a)
             else:
@@ -1535,6 +2431,7 @@ class MainWindow(QMainWindow):
         wind_regex = QRegularExpression(r'^(?:[0-9]|[0-9]\d|50)(?:\.\d{1,2})?$')
         wind_validator = QRegularExpressionValidator(wind_regex)
         wind_velocity.setValidator(wind_validator)
+        wind_velocity.textChanged.connect(self.schedule_updates)
 
         deflector_pressure = _layout.itemAtPosition(8, 1).widget()
         recommended_velocity = _layout.itemAtPosition(1, 1).widget()
@@ -1640,15 +2537,10 @@ class MainWindow(QMainWindow):
     def calculate_deflector_pressure_relation(self, value) -> None:
         velocity_relation = value
         if velocity_relation:
-            try:
-                x = float(velocity_relation)
-                f = interp1d(
-                    CONSTANTS.REFERENCE_DATA.DEFLECTOR_PRESSURE_RELATION.X,
-                    CONSTANTS.REFERENCE_DATA.DEFLECTOR_PRESSURE_RELATION.TABLE
-                )
-                result = '{:.2f}'.format(around(f(x), 2))
-                self.deflector.itemAtPosition(7, 1).widget().setText(result)
-            except ValueError:
+            result = deflector_pressure_relation(float(velocity_relation))
+            if result is not None:
+                self.deflector.itemAtPosition(7, 1).widget().setText('{:.2f}'.format(result))
+            else:
                 self.deflector.itemAtPosition(7, 1).widget().setText('')
         else:
             self.deflector.itemAtPosition(7, 1).widget().setText('')
@@ -1688,179 +2580,65 @@ class MainWindow(QMainWindow):
 
     def calculate_air_velocity(self, value) -> None:
         row = self.sender().parent().layout()
-        a = row.itemAtPosition(0, 10).widget().text()
-        b = row.itemAtPosition(0, 11).widget().text()
-        air_flow = row.itemAtPosition(0, 3).widget().text()
-
-        if all([air_flow, a, b]):
-            velocity = float(air_flow) / (3_600 * ((float(a) * float(b) / 1_000_000)))
-            velocity = '{:.2f}'.format(round(velocity, 2))
-            row.itemAtPosition(0, 12).widget().setText(velocity)
-        elif all([air_flow, a]):
-            velocity = float(air_flow) / (3_600 * (3.1415 * (float(a) / 1_000) * (float(a) / 1_000) / 4))
-            velocity = '{:.2f}'.format(round(velocity, 2))
-            row.itemAtPosition(0, 12).widget().setText(velocity)
-        else:
-            row.itemAtPosition(0, 12).widget().setText('')
+        velocity = self.row_segment(row)['velocity']
+        row.itemAtPosition(0, 12).widget().setText(fmt(velocity, 2))
 
 
     def calculate_diameter(self, value) -> None:
         row = self.sender().parent().layout()
-        a = row.itemAtPosition(0, 10).widget().text()
-        b = row.itemAtPosition(0, 11).widget().text()
-
-        if all([a, b]):
-            result = (2 * float(a) * float(b) / (float(a) + float(b)) / 1_000)
-            result = '{:.3f}'.format(round(result, 3))
-            row.itemAtPosition(0, 13).widget().setText(result)
-        elif a:
-            result = float(a) / 1_000
-            result = '{:.3f}'.format(round(result, 3))
-            row.itemAtPosition(0, 13).widget().setText(result)
-        else:
-            row.itemAtPosition(0, 13).widget().setText('')
+        diameter = self.row_segment(row)['diameter']
+        row.itemAtPosition(0, 13).widget().setText(fmt(diameter, 3))
 
 
     def calculate_dynamic(self, value) -> None:
-        name = self.sender().objectName()
-        if name == 'temperature':
-            temperature = value
+        if self.sender().objectName() == 'temperature':
             rows = self.get_all_rows()
-            for row in rows:
-                velocity = row.itemAtPosition(0, 12).widget().text()
-                if all([temperature, velocity]):
-                    temperature = float(temperature)
-                    velocity = float(velocity)
-                    density = 353 / (273.15 + temperature)
-                    result = velocity * velocity * density / 2
-                    result = '{:.3f}'.format(round(result, 3))
-                    row.itemAtPosition(0, 17).widget().setText(result)
-                else:
-                    row.itemAtPosition(0, 17).widget().setText('')
         else:
-            temperature = self.temperature_widget.text()
-            row = self.sender().parent().layout()
-            velocity = row.itemAtPosition(0, 12).widget().text()
-            if all([temperature, velocity]):
-                temperature = float(temperature)
-                velocity = float(velocity)
-                density = 353 / (273.15 + temperature)
-                result = velocity * velocity * density / 2
-                result = '{:.3f}'.format(round(result, 3))
-                row.itemAtPosition(0, 17).widget().setText(result)
-            else:
-                row.itemAtPosition(0, 17).widget().setText('')
+            rows = [self.sender().parent().layout()]
+        for row in rows:
+            dynamic = self.row_segment(row)['dynamic']
+            row.itemAtPosition(0, 17).widget().setText(fmt(dynamic, 3))
 
 
     def calculate_specific_pressure_loss(self, value) -> None:
-        name = self.sender().objectName()
-        match name:
-            case 'temperature' | 'surface':
-                temperature = self.temperature_widget.text()
-                surface = self.surface_widget.text()
-                rows = self.get_all_rows()
-                for row in rows:
-                    velocity = row.itemAtPosition(0, 12).widget().text()
-                    diameter = row.itemAtPosition(0, 13).widget().text()
-                    dynamic = row.itemAtPosition(0, 17).widget().text()
-                    if all([temperature, diameter, velocity, surface, dynamic]):
-                        try:
-                            temperature = float(temperature)
-                            velocity = float(velocity)
-                            diameter = float(diameter)
-                            surface = float(surface)
-                            dynamic = float(dynamic)
-                            mu = 1.458 * pow(10, -6) * pow((273.15 + temperature), 1.5) / ((273.15 + temperature) + 110.4)
-                            density = 353 / (273.15 + temperature)
-                            v = mu / density
-                            re = velocity * diameter / v
-                            lam = 0.11 * pow(((surface / 1_000) / diameter + 68 / re), 0.25)
-                            result = (lam / diameter) * dynamic
-                            result = '{:.4f}'.format(round(result, 4))
-                            row.itemAtPosition(0, 14).widget().setText(result)
-                        except ZeroDivisionError:
-                            row.itemAtPosition(0, 14).widget().setText('')
-                    else:
-                        row.itemAtPosition(0, 14).widget().setText('')
-            case _:
-                row = self.sender().parent().layout()
-                temperature = self.temperature_widget.text()
-                surface = self.surface_widget.text()
-                velocity = row.itemAtPosition(0, 12).widget().text()
-                diameter = row.itemAtPosition(0, 13).widget().text()
-                dynamic = row.itemAtPosition(0, 17).widget().text()
-                if all([temperature, diameter, velocity, surface, dynamic]):
-                    try:
-                        temperature = float(temperature)
-                        velocity = float(velocity)
-                        diameter = float(diameter)
-                        surface = float(surface)
-                        dynamic = float(dynamic)
-                        mu = 1.458 * pow(10, -6) * pow((273.15 + temperature), 1.5) / ((273.15 + temperature) + 110.4)
-                        density = 353 / (273.15 + temperature)
-                        v = mu / density
-                        re = velocity * diameter / v
-                        lam = 0.11 * pow(((surface / 1_000) / diameter + 68 / re), 0.25)
-                        result = (lam / diameter) * dynamic
-                        result = '{:.4f}'.format(round(result, 4))
-                        row.itemAtPosition(0, 14).widget().setText(result)
-                    except ZeroDivisionError:
-                        row.itemAtPosition(0, 14).widget().setText('')
-                else:
-                    row.itemAtPosition(0, 14).widget().setText('')
+        if self.sender().objectName() in ('temperature', 'surface'):
+            rows = self.get_all_rows()
+        else:
+            rows = [self.sender().parent().layout()]
+        for row in rows:
+            r = self.row_segment(row)['specific_pressure_loss']
+            row.itemAtPosition(0, 14).widget().setText(fmt(r, 4))
 
 
     def calculate_m(self, value) -> None:
-        axis_x = CONSTANTS.REFERENCE_DATA.M.X
-        axis_y = CONSTANTS.REFERENCE_DATA.M.Y
-        z = array(CONSTANTS.REFERENCE_DATA.M.TABLE)
-        interpolator = RegularGridInterpolator((axis_y, axis_x), z)
-
         row = self.sender().parent().layout()
-        a = row.itemAtPosition(0, 10).widget().text()
-        b = row.itemAtPosition(0, 11).widget().text()
-        if all([a, b]) and all([100 <= int(a) <= 1_500, 100 <= int(b) <= 1_500]):
-            a, b = int(a), int(b)
-            m = interpolator((b, a))
-            m = '{:.3f}'.format(around(m, 3))
-            row.itemAtPosition(0, 15).widget().setText(m)
-        elif a and 100 <= int(a) <= 1_500:
-            a = int(a)
-            m = interpolator((a, a))
-            m = '{:.3f}'.format(around(m, 3))
-            row.itemAtPosition(0, 15).widget().setText(m)
-        else:
-            row.itemAtPosition(0, 15).widget().setText('')
+        m = self.row_segment(row)['m']
+        row.itemAtPosition(0, 15).widget().setText(fmt(m, 3))
 
 
     def calculate_linear_pressure_loss(self, value) -> None:
         row = self.sender().parent().layout()
-        l = row.itemAtPosition(0, 1).widget().text()
-        r = row.itemAtPosition(0, 14).widget().text()
-        m = row.itemAtPosition(0, 15).widget().text()
-        if all([l, r, m]):
-            l = float(l)
-            r = float(r)
-            m = float(m)
-            result = '{:.4f}'.format(round(l * r * m, 4))
-            row.itemAtPosition(0, 16).widget().setText(result)
-        else:
-            row.itemAtPosition(0, 16).widget().setText('')
+        linear = self.row_segment(row)['linear_pressure_loss']
+        row.itemAtPosition(0, 16).widget().setText(fmt(linear, 4))
 
 
     def calculate_linear_pressure_loss_last_row(self, value) -> None:
+        # the top floor runs the whole height of its section, as in airsystem.engine.evaluate
         row = self.sender().parent().layout()
-        l = row.itemAtPosition(0, 4).widget().text()
-        r = row.itemAtPosition(0, 14).widget().text()
-        m = row.itemAtPosition(0, 15).widget().text()
-        if all([l, r, m]):
-            l = float(l)
-            r = float(r)
-            m = float(m)
-            result = '{:.4f}'.format(round(l * r * m, 4))
-            row.itemAtPosition(0, 16).widget().setText(result)
-        else:
-            row.itemAtPosition(0, 16).widget().setText('')
+        values = self.row_segment(row)
+        height = number(row.itemAtPosition(0, 4).widget().text())
+        linear = linear_pressure_loss(height, values['specific_pressure_loss'], values['m'])
+        row.itemAtPosition(0, 16).widget().setText(fmt(linear, 4))
+
+
+    def row_segment(self, row) -> dict:
+        # a floor from airsystem.engine.segment, the cache shared with the scripted evaluation;
+        # the top floor is keyed without a length there, its ΔPл is taken from the shaft height
+        length = None
+        if row.objectName() != CONSTANTS.MAIN_TABLE.LAST_ROW_NAME:
+            length = number(row.itemAtPosition(0, 1).widget().text())
+        flow, a, b = (number(row.itemAtPosition(0, i).widget().text()) for i in (3, 10, 11))
+        return segment(flow, a, b, length, number(self.temperature_widget.text()), number(self.surface_widget.text()))
 
 
     def calculate_kms_by_radiobutton_1(self, checked) -> None:
@@ -2142,16 +2920,16 @@ class MainWindow(QMainWindow):
         if current_value == CONSTANTS.CAP.TYPES[1]:
             for i in (8, 9, 10):
                 self.channel_cap_grid.itemAtPosition(0, i).widget().setVisible(True)
-            for i in range(2, 8):
+            for i in (2, 3, 4, 5, 6, 7, 11):
                 self.channel_cap_grid.itemAtPosition(0, i).widget().hide()
         elif current_value in CONSTANTS.CAP.TYPES[2:4]:
-            for i in (2, 3, 4, 5, 6, 7, 8, 9, 10):
+            for i in (2, 3, 4, 5, 6, 7, 8, 9, 10, 11):
                 self.channel_cap_grid.itemAtPosition(0, i).widget().setVisible(True)
         elif current_value == CONSTANTS.CAP.TYPES[-1]:
-            for i in range(2, 11):
+            for i in range(2, 12):
                 self.channel_cap_grid.itemAtPosition(0, i).widget().hide()
         else:
-            for i in range(2, 8):
+            for i in (2, 3, 4, 5, 6, 7, 11):
                 self.channel_cap_grid.itemAtPosition(0, i).widget().hide()
 
 
@@ -2192,21 +2970,19 @@ class MainWindow(QMainWindow):
                         self._calculate_channel_cap(result)
                     else:
                         self.cap_pressure.setText('')
+                        self._calculate_channel_cap('')
                 elif current_value in CONSTANTS.CAP.TYPES[2:4]:
                     D = self.get_main_rows()[0].itemAtPosition(0, 13).widget().text()
-                    h = self.input_h.text()
-                    if D and h:
-                        D, h = float(D), float(h)
-                        relation = h / D
+                    h = number(self.input_h.text())
+                    if D and float(D) and h is not None:
+                        relation = h / float(D)
                         relation = '{:.2f}'.format(round(relation, 2))
                         self.fact_relation.setText(relation)
                     else:
                         self.fact_relation.setText('')
 
                     w = self.get_main_rows()[0].itemAtPosition(0, 12).widget().text()
-                    user_relation = self.relations.currentText()
-                    kms_data = CONSTANTS.CAP.RELATIONS.get(current_value)
-                    kms = kms_data.get(user_relation, False)
+                    kms = self.cap_relation_kms()
                     temperature = self.temperature_widget.text()
                     if all([D, w, kms, temperature]):
                         w, temperature = float(w), float(temperature)
@@ -2216,20 +2992,23 @@ class MainWindow(QMainWindow):
                         self._calculate_channel_cap(result)
                     else:
                         self.cap_pressure.setText('')
+                        self._calculate_channel_cap('')
+
+
+    def cap_relation_kms(self) -> object:
+        # ζ at the actual h/Do when h is given, as in engine.cap_kms; otherwise the h/Do chosen from the table
+        cap = self.cap_type.currentText()
+        h = number(self.input_h.text())
+        if h is None:
+            return CONSTANTS.CAP.RELATIONS.get(cap).get(self.relations.currentText()) or None
+        D = number(self.get_main_rows()[0].itemAtPosition(0, 13).widget().text()) if self.get_main_rows() else None
+        return cap_relation_kms(cap, h / D) if D else None
 
 
     def _calculate_channel_cap(self, pressure) -> None:
-        pressure = float(pressure)
-        rows = self.get_all_rows()
-        for row in rows:
-            loss = row.itemAtPosition(0, 20).widget().text()
-            if loss:
-                loss = float(loss)
-                result = loss + pressure
-                result = '{:.3f}'.format(round(result, 3))
-                row.itemAtPosition(0, 20).widget().setText(result)
-            else:
-                row.itemAtPosition(0, 20).widget().setText(str(pressure))
+        # ΔP is summed again with the new Роголовка, adding it to the shown ΔP kept the old one too
+        self.calculate_full_pressure(None)
+        self.calculate_full_pressure_last_row(None)
 
 
     def get_all_rows(self) -> list:
@@ -2390,7 +3169,7 @@ class MainWindow(QMainWindow):
         elif cap == CONSTANTS.CAP.TYPES[1]:
             data['cap_0'] = cap
         elif cap in CONSTANTS.CAP.TYPES[2:4]:
-            h = self.channel_cap_grid.itemAtPosition(0, 2).widget().text()
+            h = self.input_h.text()
             relation = self.relations.currentText()
             data['cap_1'] = [cap, h, relation]
 
@@ -2402,6 +3181,8 @@ class MainWindow(QMainWindow):
             row_data = [row.itemAtPosition(0, i).widget().text() for i in (1, 2, 10, 11)]
             rows.append(row_data)
         data['rows'] = rows
+        if self.zones:
+            data['zones'] = sorted(self.zones)
 
         return data
 
@@ -2452,8 +3233,12 @@ class MainWindow(QMainWindow):
             if cap == CONSTANTS.CAP.TYPES[1]:
                 data['cap_0'] = [cap, self.cap_pressure.text()]
             elif cap in CONSTANTS.CAP.TYPES[2:4]:
-                h = self.channel_cap_grid.itemAtPosition(0, 3).widget().text()
-                data['cap_1'] = [cap, h, self.relations.currentText(), self.cap_pressure.text()]
+                h = self.input_h.text()
+                relation = self.relations.currentText()
+                kms = self.cap_relation_kms()
+                if number(h) is not None and kms is not None:
+                    relation = f'{self.fact_relation.text()}: {kms:.2f}'
+                data['cap_1'] = [cap, h, relation, self.cap_pressure.text()]
         else:
             main_data['num_cols'] = 22
             main_data['headers'] = [self.header.itemAtPosition(0, i).widget().text() for i in range(22)]
@@ -2470,265 +3255,11 @@ class MainWindow(QMainWindow):
 
 
     def export(self) -> None:
+        if self.export_thread is not None:
+            QMessageBox.information(self, 'Информация', 'Экспорт уже выполняется')
+            return
         data = self._get_data_for_export()
         if data:
-            doc = docx.Document()
-
-            doc_style = doc.styles.add_style('DocStyle', 1)
-            doc_style.font.name = 'Times New Roman'
-            doc_style.font.size = Pt(12)
-            doc.styles['Normal'].base_style = doc_style
-
-            title_style = doc.styles.add_style('TitleStyle', 1)
-            title_style.font.name = 'Times New Roman'
-            title_style.font.size = Pt(12)
-            title_style.font.bold = True
-            title = doc.add_paragraph(CONSTANTS.EXPORT.TITLE, style='TitleStyle')
-            title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-            table_title = doc.styles.add_style('TableTitleStyle', 1)
-            table_title.font.name = 'Times New Roman'
-            table_title.font.size = Pt(12)
-            table_title.font.bold = True
-
-            header_style = doc.styles.add_style('HeaderStyle', 1)
-            header_style.font.bold = True
-
-            # setup fields
-            sections = doc.sections
-            for section in sections:
-                section.orientation = WD_ORIENT.LANDSCAPE
-                new_width, new_height = section.page_height, section.page_width
-                section.page_width = new_width
-                section.page_height = new_height
-                section.left_margin = Cm(2)
-                section.right_margin = Cm(1)
-                section.top_margin = Cm(1)
-                section.bottom_margin = Cm(1)
-                section.page_width = Mm(420)
-                section.page_height = Mm(297)
-
-            # add table 1
-            doc.add_paragraph(CONSTANTS.EXPORT.INIT_DATA.TITLE, style='TableTitleStyle')
-            table_1 = doc.add_table(rows=7, cols=3)
-            table_1.style = 'Table Grid'
-
-            # setup table header, units and column widths
-            header = table_1.columns[0].cells
-            for row in range(7):
-                header[row].text = CONSTANTS.EXPORT.INIT_DATA.HEADER[row]
-            units = table_1.columns[2].cells
-            for row in range(7):
-                units[row].text = CONSTANTS.EXPORT.INIT_DATA.UNITS[row]
-                units[row].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                units[row].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-            widths = [110, 90, 27]
-            for col in range(3):
-                set_column_width(table_1.columns[col], widths[col])
-            for row in range(7):
-                set_row_height(table_1.rows[row], 7)
-
-            init_data = data['init_data']
-            values = table_1.columns[1].cells
-            for row in range(7):
-                values[row].text = init_data[row]
-                values[row].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                values[row].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-            doc.add_paragraph()
-
-            # add table 2
-            doc.add_paragraph(CONSTANTS.EXPORT.SPUTNIK.TITLE, style='TableTitleStyle')
-
-            sputnik_data = data['sputnik_data']
-            table_2 = doc.add_table(rows=len(sputnik_data), cols=13)
-            table_2.style = 'Table Grid'
-
-            header = table_2.rows[0].cells
-            for col in range(13):
-                header[col].text = sputnik_data['headers'][col]
-                header[col].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                header[col].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-
-            for row in range(1, len(sputnik_data)):
-                set_row_height(table_2.rows[row], 7)
-
-            for row in range(1, len(sputnik_data)):
-                values = table_2.rows[row].cells
-                if row in (1, 3):
-                    for col in range(13):
-                        line = f'line_{row}'
-                        values[col].text = sputnik_data[line][col]
-                        values[col].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                        values[col].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-                elif row in (2, 4):
-                    line = f'line_{row}'
-                    values[12].text = sputnik_data[line]
-                    values[12].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    values[12].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-
-            for row in range(1, len(sputnik_data)):
-                set_row_height(table_2.rows[row], 7)
-
-            if len(sputnik_data) == 3:
-                a = table_2.cell(2, 0)
-                b = table_2.cell(2, 11)
-                a.merge(b)
-            else:
-                for i in (2, 4):
-                    a = table_2.cell(i, 0)
-                    b = table_2.cell(i, 11)
-                    a.merge(b)
-
-            for col in range(13):
-                set_column_width(table_2.columns[col], 25)
-            doc.add_paragraph()
-
-            # add table 3
-            doc.add_paragraph(CONSTANTS.EXPORT.MAIN_TABLE.TITLE, style='TableTitleStyle')
-
-            main_data = data['main_data']
-            table_3 = doc.add_table(rows=main_data['num_rows'], cols=main_data['num_cols'])
-            table_3.style = 'Table Grid'
-
-            header = table_3.rows[0].cells
-            for col in range(main_data['num_cols']):
-                header[col].text = main_data['headers'][col]
-                header[col].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                header[col].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-                header[col].paragraphs[0].runs[0].font.size = Pt(10)
-
-            for row in range(1, main_data['num_rows']):
-                set_row_height(table_3.rows[row], 7)
-
-            for row in range(1, main_data['num_rows']):
-                values = table_3.rows[row].cells
-                for col in range(main_data['num_cols']):
-                    line = f'line_{row - 1}'
-                    values[col].text = main_data[line][col]
-                    values[col].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    values[col].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-                    values[col].paragraphs[0].runs[0].font.size = Pt(10)
-
-            if main_data['num_cols'] == 22:
-                a = table_3.cell(2, 6)
-                b = table_3.cell(main_data['num_rows'] - 1, 6)
-                a.merge(b)
-
-            set_column_width(table_3.columns[0], 15)
-            set_column_width(table_3.columns[1], 15)
-            set_column_width(table_3.columns[main_data['num_cols'] - 1], 25)
-            doc.add_paragraph()
-
-            # add formula
-            doc.add_paragraph(CONSTANTS.EXPORT.FORMULA, style='TableTitleStyle')
-            doc.add_paragraph().add_run().add_picture(os.path.join(basedir, CONSTANTS.EXPORT.FORMULA_IMG), width=Cm(12))
-            doc.add_paragraph()
-
-            if data.get('cap_0'):
-                # add table 4
-                doc.add_paragraph(CONSTANTS.EXPORT.CAP.TITLE, style='TableTitleStyle')
-
-                cap_data = data['cap_0']
-                table_4 = doc.add_table(rows=2, cols=2)
-                table_4.style = 'Table Grid'
-
-                widths = [50, 20]
-                for col in range(2):
-                    set_column_width(table_4.columns[col], widths[col])
-                for row in range(2):
-                    set_row_height(table_4.rows[row], 7)
-
-                header = table_4.columns[0].cells
-                for row in range(2):
-                    header[row].text = CONSTANTS.EXPORT.CAP.HEADER_1[row]
-
-                values = table_4.columns[1].cells
-                for row in range(2):
-                    values[row].text = cap_data[row]
-                    values[row].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    values[row].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-                doc.add_paragraph()
-
-            if data.get('cap_1'):
-                # add table 4
-                doc.add_paragraph(CONSTANTS.EXPORT.CAP.TITLE, style='TableTitleStyle')
-
-                cap_data = data['cap_1']
-                table_4 = doc.add_table(rows=5, cols=4)
-                table_4.style = 'Table Grid'
-                table_4.allow_autofit = False
-                table_4.alignment = WD_TABLE_ALIGNMENT.LEFT
-
-                widths = [90, 37, 20, 25]
-                for col in range(4):
-                    set_column_width(table_4.columns[col], widths[col])
-                for row in range(5):
-                    set_row_height(table_4.rows[row], 7)
-
-                header = table_4.columns[0].cells
-                for row in range(5):
-                    header[row].text = CONSTANTS.EXPORT.CAP.HEADER_2[row]
-
-                units = table_4.columns[2].cells
-                for row in range(5):
-                    units[row].text = CONSTANTS.EXPORT.CAP.UNITS_2[row]
-                    units[row].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    units[row].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-
-                values = table_4.columns[1].cells
-                for row in range(5):
-                    match row:
-                        case 2:
-                            values[row].text = cap_data[2].split(':')[0]
-                        case 3:
-                            values[row].text = cap_data[2].split(':')[1]
-                        case 4:
-                            values[row].text = cap_data[3]
-                        case _:
-                            values[row].text = cap_data[row]
-                    values[row].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    values[row].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-
-                a = table_4.cell(0, 3)
-                b = table_4.cell(4, 3)
-                a.merge(b)
-                delete_paragraph(table_4.cell(0, 3).paragraphs[0])
-
-                if data['cap_1'][0] == 'Зонт':
-                    table_4.cell(0, 3).add_paragraph().add_run().add_picture(
-                        os.path.join(basedir, CONSTANTS.CAP.TYPES_IMG[0]),
-                        height=Cm(3.5)
-                    )
-                else:
-                    table_4.cell(0, 3).add_paragraph().add_run().add_picture(
-                        os.path.join(basedir, CONSTANTS.CAP.TYPES_IMG[1]),
-                        height=Cm(3.5)
-                    )
-
-            if data.get('deflector_data'):
-                # add table 5
-                doc.add_paragraph(CONSTANTS.EXPORT.CAP.DEFLECTOR_TITLE, style='TableTitleStyle')
-
-                deflector_data = data['deflector_data']
-                table_5 = doc.add_table(rows=9, cols=2)
-                table_5.style = 'Table Grid'
-
-                header = table_5.columns[0].cells
-                for row in range(9):
-                    header[row].text = deflector_data[0][row]
-
-                widths = [120, 27]
-                for col in range(2):
-                    set_column_width(table_5.columns[col], widths[col])
-                for row in range(9):
-                    set_row_height(table_5.rows[row], 7)
-
-                values = table_5.columns[1].cells
-                for row in range(9):
-                    values[row].text = deflector_data[1][row]
-                    values[row].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    values[row].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
-
             now = datetime.now()
             date_time = now.strftime('%d_%m_%y_%H_%M')
             if self.current_file_path:
@@ -2736,13 +3267,73 @@ class MainWindow(QMainWindow):
             else:
                 file_name = f'Без названия_{date_time}'
             file_name = file_name.replace('.json', '')
-            doc.save(f'{file_name}.docx')
-            QMessageBox.information(self, 'Информация', 'Расчёт успешно экспортирован')
-            os.startfile(os.path.join(basedir, f'{file_name}.docx'))
+
+            # the document is built from this snapshot, editing can go on meanwhile
+            progress = QProgressDialog('Экспорт расчёта', 'Отмена', 0, 100, self)
+            progress.setWindowTitle('Экспорт...')
+            progress.setWindowModality(Qt.WindowModality.NonModal)
+            progress.setMinimumDuration(0)
+            progress.setValue(0)
+            progress.show()
+
+            self.export_thread = ExportThread(data, os.path.abspath(f'{file_name}.docx'), self)
+            self.export_thread.progress.connect(progress.setValue)
+            self.export_thread.exported.connect(self.on_exported)
+            self.export_thread.failed.connect(self.on_export_failed)
+            self.export_thread.finished.connect(progress.deleteLater)
+            self.export_thread.finished.connect(self.on_export_finished)
+            progress.canceled.connect(self.export_thread.requestInterruption)
+            self.export_thread.start()
         else:
             QMessageBox.critical(self, 'Ошибка', 'Пока нечего экспортировать')
 
 
+    def export_tables(self) -> None:
+        filters = [CONSTANTS.EXPORT.TABLES_FILTERS[fmt] for fmt in formats()]
+        if self.current_file_path:
+            file_name = self.current_file_path.replace('.json', '')
+        else:
+            save_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.DocumentsLocation)
+            file_name = os.path.join(save_dir, 'Без названия')
+        file_name, selected = QFileDialog.getSaveFileName(
+            self, CONSTANTS.EXPORT.TABLES_TITLE, f'{file_name}.csv', ';;'.join(filters)
+        )
+        if not file_name:
+            return
+        fmt = formats()[filters.index(selected)] if selected in filters else None
+        if fmt and not file_name.lower().endswith(f'.{fmt}'):
+            file_name = f'{file_name}.{fmt}'
+        try:
+            project = parse_project(self._get_data_for_save())
+            with Exporter(file_name, fmt) as exporter:
+                exporter.add(self.current_file_path or file_name, project, evaluate(project))
+        except Exception as e:
+            QMessageBox.critical(self, 'Ошибка', f'Не удалось экспортировать расчёт:\n{e}')
+            return
+        paths = '\n'.join(exporter.paths.values())
+        QMessageBox.information(self, 'Информация', CONSTANTS.EXPORT.TABLES_DONE.format(paths))
+
+
+    def on_exported(self, path) -> None:
+        QMessageBox.information(self, 'Информация', 'Расчёт успешно экспортирован')
+        QDesktopServices.openUrl(QUrl.fromLocalFile(path))
+
+
+    def on_export_failed(self, error) -> None:
+        QMessageBox.critical(self, 'Ошибка', f'Не удалось экспортировать расчёт:\n{error}')
+
+
+    def on_export_finished(self) -> None:
+        self.export_thread.deleteLater()
+        self.export_thread = None
+
+
+    def stop_export(self) -> None:
+        if self.export_thread is not None:
+            self.export_thread.requestInterruption()
+            self.export_thread.wait()
+
+
     def save_as(self) -> None:
         data = self._get_data_for_save()
         save_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.DocumentsLocation)
@@ -2750,9 +3341,8 @@ class MainWindow(QMainWindow):
         if file_name:
             self.current_file_path = file_name
             self.setWindowTitle(f'{self.app_title} | {file_name}')
-
-            with open(file_name, 'w') as file:
-                json.dump(data, file)
+            write_atomic(file_name, data)
+            self.schedule_updates()
 
 
     def save(self) -> None:
@@ -2760,15 +3350,346 @@ class MainWindow(QMainWindow):
             self.save_as()
         else:
             data = self._get_data_for_save()
-            with open(self.current_file_path, 'w') as file:
-                json.dump(data, file)
+            write_atomic(self.current_file_path, data)
 
 
-    def auto_save(self) -> None:
-        if self.current_file_path:
-            self.save()
-        else:
-            self.save_as()
+    def get_recovery_dir(self) -> str:
+        data_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericDataLocation)
+        return os.path.join(data_dir, *CONSTANTS.RECOVERY.DIR)
+
+
+    def start_journal(self) -> None:
+        self.journal = RecoveryJournal(
+            self.get_recovery_dir(),
+            CONSTANTS.RECOVERY.COMPACT_RECORDS,
+            CONSTANTS.RECOVERY.COMPACT_INTERVAL,
+        )
+        self.journal_lock = QLockFile(self.journal.lock_path)
+        self.journal_lock.setStaleLockTime(0)
+        self.journal_lock.tryLock(0)
+
+
+    def get_library_path(self) -> str:
+        data_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericDataLocation)
+        library_dir = os.path.join(data_dir, *CONSTANTS.LIBRARY.DIR)
+        os.makedirs(library_dir, exist_ok=True)
+        return os.path.join(library_dir, CONSTANTS.LIBRARY.DATABASE)
+
+
+    def start_library(self, directory) -> None:
+        self.stop_library()
+        self.settings.setValue('libraryDir', directory)
+        self.library_watcher = Watcher(self.get_library_path(), directory, CONSTANTS.LIBRARY.SCAN_INTERVAL)
+        self.library_watcher.start()
+
+
+    def stop_library(self) -> None:
+        if self.library_watcher is not None:
+            self.library_watcher.stop()
+            self.library_watcher = None
+
+
+    def show_library(self) -> None:
+        LibraryDialog(self).exec()
+
+
+    def show_sizing(self) -> None:
+        if not self.get_main_rows():
+            QMessageBox.information(self, 'Информация', CONSTANTS.SIZING.NO_FLOORS)
+            return
+        project = parse_project(self._get_data_for_save())
+        SizingDialog(self, size_main_channel(project), self.set_main_section).exec()
+
+
+    def show_search(self) -> None:
+        if not self.get_main_rows():
+            QMessageBox.information(self, 'Информация', CONSTANTS.SIZING.NO_FLOORS)
+            return
+        SearchDialog(self, parse_project(self._get_data_for_save())).exec()
+
+
+    def show_what_if(self) -> None:
+        if not self.get_main_rows():
+            QMessageBox.information(self, 'Информация', CONSTANTS.SIZING.NO_FLOORS)
+            return
+        project = parse_project(self._get_data_for_save())
+        if not project_inputs(project):
+            QMessageBox.information(self, 'Информация', CONSTANTS.WHAT_IF.NO_INPUTS)
+            return
+        try:
+            model = Surrogate.fit(project)
+        except ValueError:
+            QMessageBox.information(self, 'Информация', CONSTANTS.WHAT_IF.UNDEFINED)
+            return
+        WhatIfDialog(self, model).exec()
+
+
+    def show_goal_seek(self) -> None:
+        if not self.get_main_rows():
+            QMessageBox.information(self, 'Информация', CONSTANTS.SIZING.NO_FLOORS)
+            return
+        GoalSeekDialog(self, parse_project(self._get_data_for_save())).exec()
+
+
+    def set_input(self, name, text) -> None:
+        # the field of an input of airsystem.goalseek, the capacity is typed for the valve 'Другой'
+        if name.startswith(('one_side_', 'two_side_')):
+            line = 2 if name.startswith('one_side_') else 4
+            column = {'flow': 1, 'length': 2, 'a': 3, 'b': 4, 'kms': 11}[name[9:]]
+            self.sputnik.itemAtPosition(line, column).widget().setText(text)
+            return
+        if name == 'klapan_capacity':
+            self.klapan_widget.setCurrentText(list(CONSTANTS.INIT_DATA.KLAPAN_ITEMS)[-1])
+        widgets = {
+            'temperature': self.temperature_widget,
+            'surface': self.surface_widget,
+            'floor_height': self.floor_height_widget,
+            'shaft_height': self.channel_height_widget,
+            'klapan_capacity': self.klapan_input,
+            'klapan_flow': self.klapan_flow,
+        }
+        widgets[name].setText(text)
+
+
+    def apply_design(self, design) -> None:
+        cap = design['cap']
+        self.tab_widget.setTabVisible(1, cap == CONSTANTS.CAP.TYPES[-1])
+        self.cap_type.setCurrentText(cap)
+        if design['cap_relation'] is not None:
+            self.relations.setCurrentText(design['cap_relation'])
+        self.klapan_widget.setCurrentText(design['klapan'])
+        self.set_main_section(*design['main'])
+        self.set_sputnik_section(*design['sputnik'], {})
+
+
+    def show_cap_height(self) -> None:
+        project = parse_project(self._get_data_for_save())
+        if len(project['rows']) < 2:
+            QMessageBox.information(self, 'Информация', CONSTANTS.SIZING.NO_FLOORS)
+            return
+        CapHeightDialog(self, project).exec()
+
+
+    def show_valves(self) -> None:
+        project = parse_project(self._get_data_for_save())
+        if not project['rows']:
+            QMessageBox.information(self, 'Информация', CONSTANTS.SIZING.NO_FLOORS)
+            return
+        ValvesDialog(self, rank_valves(project)).exec()
+
+
+    def show_sputnik_sizing(self) -> None:
+        if not self.get_main_rows():
+            QMessageBox.information(self, 'Информация', CONSTANTS.SIZING.NO_FLOORS)
+            return
+        project = parse_project(self._get_data_for_save())
+        try:
+            result = size_sputnik(project)
+        except ValueError:
+            QMessageBox.information(self, 'Информация', CONSTANTS.SIZING.NO_TWO_SIDE_FLOW)
+            return
+
+        def apply(a, b):
+            self.set_sputnik_section(a, b, result['lengths'])
+
+        SizingDialog(self, result, apply, CONSTANTS.SIZING.SPUTNIK_TITLE).exec()
+
+
+    def set_sputnik_section(self, a, b, lengths) -> None:
+        # the block 1*-2* copies the dimensions of 1-2, empty lengths get the ones of the calculation
+        self.sputnik.itemAtPosition(2, 3).widget().setText(f'{a:g}')
+        self.sputnik.itemAtPosition(2, 4).widget().setText('' if b is None else f'{b:g}')
+        for line, side in ((2, 'one_side'), (4, 'two_side')):
+            edit = self.sputnik.itemAtPosition(line, 2).widget()
+            if not edit.text() and lengths.get(side) is not None:
+                edit.setText(f'{lengths[side]:g}')
+
+
+    def set_main_section(self, a, b) -> None:
+        # one section for the whole channel, copy_table_dimensions passes the bottom row to the others
+        self.zones = set()
+        self.change_dimensions_cells_in_table()
+        row = self.get_main_rows()[-1]
+        row.itemAtPosition(0, 10).widget().setText(f'{a:g}')
+        row.itemAtPosition(0, 11).widget().setText('' if b is None else f'{b:g}')
+        self.copy_table_dimensions(None)
+
+
+    def show_zoning(self) -> None:
+        project = parse_project(self._get_data_for_save())
+        if len(project['rows']) < 2:
+            QMessageBox.information(self, 'Информация', CONSTANTS.SIZING.NO_FLOORS)
+            return
+        try:
+            floor_lengths(project)
+        except ValueError:
+            QMessageBox.information(self, 'Информация', CONSTANTS.ZONING.NO_HEIGHTS)
+            return
+        ZoningDialog(self, project).exec()
+
+
+    def set_zones(self, zones) -> None:
+        # zones from the bottom up: [{'floors': (first, last), 'a', 'b'}]
+        self.zones = {zone['floors'][0] for zone in zones[1:]}
+        self.change_dimensions_cells_in_table()
+        rows = self.get_main_rows()
+        for zone in zones:
+            row = rows[len(rows) - zone['floors'][0]]
+            row.itemAtPosition(0, 10).widget().setText(f'{zone["a"]:g}')
+            row.itemAtPosition(0, 11).widget().setText('' if zone['b'] is None else f'{zone["b"]:g}')
+        self.copy_table_dimensions(None)
+        self.schedule_updates()
+
+
+    def stop_journal(self) -> None:
+        if self.journal:
+            self.journal_timer.stop()
+            self.journal_lock.unlock()
+            self.journal.close()
+            self.journal = None
+
+
+    def schedule_updates(self, *args) -> None:
+        self.journal_timer.start()
+        self.preview_timer.start()
+        self.size_index_timer.start()
+
+
+    def refresh_size_index(self) -> None:
+        # rebuilt in the background only when tв, Kэ, the flows or the other inputs of the index change,
+        # any other change only refreshes the current calculation kept in it
+        if self.size_index_thread is not None:
+            self.size_index_timer.start()
+            return
+        project = parse_project(self._get_data_for_save())
+        if len(project['rows']) < 2:
+            return
+        if self.size_index is not None and self.size_index['key'] == index_key(project):
+            if self.size_index['project'] != project:
+                self.size_index = update_index(self.size_index, project)
+            return
+        self.size_index_thread = SizeIndexThread(project, self)
+        self.size_index_thread.built.connect(self.set_size_index)
+        self.size_index_thread.finished.connect(self.on_size_index_finished)
+        self.size_index_thread.start()
+
+
+    def set_size_index(self, index) -> None:
+        self.size_index = index
+        widget = QApplication.focusWidget()
+        if self.size_row is not None and widget in (self.size_row.itemAtPosition(0, i).widget() for i in (10, 11)):
+            self.suggest_sizes(widget)
+
+
+    def on_size_index_finished(self) -> None:
+        self.size_index_thread.deleteLater()
+        self.size_index_thread = None
+
+
+    def suggest_sizes(self, edit, text=None) -> None:
+        rows = self.get_main_rows()
+        i = next((i for i, row in enumerate(rows) if edit in (row.itemAtPosition(0, j).widget() for j in (10, 11))), None)
+        if i is None:
+            return
+        self.size_row = rows[i]
+        a, b = (number(rows[i].itemAtPosition(0, j).widget().text()) for j in (10, 11))
+        field = 'a' if edit is rows[i].itemAtPosition(0, 10).widget() else 'b'
+        popup = self.size_completer.popup()
+        if (a if field == 'a' else b) is None:
+            popup.hide()
+            return
+        # the index is at most one debounce behind, set_size_index shows the list again once it is rebuilt
+        if self.size_index is None or len(self.size_index['available']) != len(rows) + 1:
+            self.size_index_timer.start()
+            return
+
+        # the floors of the zone of the edited row, rows of the project count the top floor first
+        floor = len(rows) - i
+        top = min((zone for zone in self.zones if zone > floor), default=len(rows) + 1) - 1
+        zone_rows = [len(rows) + 1 - f for f in range(floor, top + 1)]
+        self.size_model.clear()
+        for option in suggest(self.size_index, zone_rows, a if a is not None else b, b, field):
+            margin = fmt(option['min_margin'], 3) or '-'
+            text = CONSTANTS.SUGGEST.ITEM.format(
+                section_text(option), fmt(option['velocity'], 2), fmt(option['specific_pressure_loss'], 4), margin
+            )
+            if option['failing_floors']:
+                text += CONSTANTS.SUGGEST.FAILING.format(option['failing_floors'])
+            item = QStandardItem(text)
+            item.setData((option['a'], option['b']), Qt.ItemDataRole.UserRole)
+            self.size_model.appendRow(item)
+        self.size_completer.setWidget(edit)
+        self.size_completer.complete()
+
+
+    def apply_size_suggestion(self, index) -> None:
+        a, b = index.data(Qt.ItemDataRole.UserRole)
+        self.size_row.itemAtPosition(0, 10).widget().setText(f'{a:g}')
+        self.size_row.itemAtPosition(0, 11).widget().setText('' if b is None else f'{b:g}')
+
+
+    def update_preview(self, *args) -> None:
+        # hidden preview is rendered on the next switch to its tab
+        if self.tab_widget.currentWidget() is not self.preview.parentWidget():
+            return
+        sections = [section_html(item) for item in build_report(self._get_data_for_export())]
+        if sections == self.preview_sections:
+            return
+        self.preview_sections = sections
+        scroll_bar = self.preview.verticalScrollBar()
+        position = scroll_bar.value()
+        self.preview.setHtml(f'<p align="center"><b>{CONSTANTS.EXPORT.TITLE}</b></p>{"".join(sections)}')
+        scroll_bar.setValue(position)
+
+
+    def write_journal(self) -> None:
+        if self.journal:
+            self.journal.record(self._get_data_for_save(), self.current_file_path)
+
+
+    def recover_session(self) -> None:
+        # newest crashed session first, the older ones stay for the next launch once one is restored
+        for session_dir in reversed(find_sessions(self.get_recovery_dir())):
+            lock = QLockFile(os.path.join(session_dir, LOCK_FILE))
+            lock.setStaleLockTime(0)
+            if not lock.tryLock(0):
+                # session of another running instance
+                continue
+            lock.unlock()
+
+            state = read_session(session_dir)
+            if state and state.get('data') and not self._is_saved_state(state):
+                file_path = state.get('file')
+                reply = QMessageBox.question(
+                    self,
+                    CONSTANTS.RECOVERY.TITLE,
+                    CONSTANTS.RECOVERY.QUESTION.format(file_path or CONSTANTS.RECOVERY.UNTITLED),
+                    QMessageBox.Yes | QMessageBox.No,
+                    QMessageBox.Yes
+                )
+                if reply == QMessageBox.Yes:
+                    try:
+                        self._load_data(state['data'])
+                    except Exception as e:
+                        QMessageBox.critical(self, 'Ошибка', f'Не удалось восстановить расчёт:\n{e}')
+                    else:
+                        self.current_file_path = file_path
+                        if file_path:
+                            self.setWindowTitle(f'{self.app_title} | {file_path}')
+                        remove_session(session_dir)
+                        break
+            remove_session(session_dir)
+
+
+    def _is_saved_state(self, state) -> bool:
+        file_path = state.get('file')
+        if not file_path:
+            return False
+        try:
+            with open(file_path, encoding='utf-8') as f:
+                return json.load(f) == state['data']
+        except (OSError, ValueError):
+            return False
 
 
     def open(self) -> None:
@@ -2787,99 +3708,12 @@ class MainWindow(QMainWindow):
     def _open_file(self, file_name) -> None:
         if file_name:
             try:
-                with open(file_name) as f:
+                with open(file_name, encoding='utf-8') as f:
                     data = json.load(f)
-
-                    progress = QProgressDialog('Импорт данных', None, 0, 100, self)
-                    progress.setWindowTitle('Заполнение данных...')
-                    progress.setWindowModality(Qt.WindowModality.WindowModal)
-                    progress.setMinimumDuration(0)
-                    progress.setValue(0)
-                    progress.setMaximum(100)
-                    progress.show()
-
-                    # prepare main table
-                    num_rows = len(data['rows'])
-                    self.remove_all_main_rows()
-                    self.clean_all_input_data()
-
-                    self.main_box.addWidget(self.create_last_row())
-                    for i in range(num_rows):
-                        self.main_box.insertWidget(2, self.create_row())
-                    self.last_row.itemAtPosition(0, 0).widget().setText(self.get_sum_all_rows_str())
-                    self.change_dimensions_cells_in_table()
-
-                    progress.setValue(progress.value() + 20)
-
-                    # init data
-                    init_data = data['init_data']
-                    self.temperature_widget.setText(init_data[0])
-                    self.surface_widget.setText(init_data[1])
-                    self.floor_height_widget.setText(init_data[2])
-                    self.channel_height_widget.setText(init_data[3])
-                    self.klapan_input.setText(init_data[4])
-                    self.klapan_widget.setCurrentText(init_data[5])
-
-                    progress.setValue(progress.value() + 10)
-
-                    # sputnik data
-                    self.klapan_flow.setText(data['sputnik_data'][0])
-                    one_side = data['sputnik_data'][1]['one_side']
-                    for i, j in enumerate((1, 2, 3, 4, 11)):
-                        self.sputnik.itemAtPosition(2, j).widget().setText(one_side[i])
-
-                    progress.setValue(progress.value() + 10)
-
-                    two_side = data['sputnik_data'][2]['two_side']
-                    for i, j in enumerate((1, 2, 11)):
-                        self.sputnik.itemAtPosition(4, j).widget().setText(two_side[i])
-
-                    progress.setValue(progress.value() + 10)
-
-                    if data['sputnik_data'][3]['is_checked'] == 1:
-                        self.radio_button1.setChecked(True)
-                    else:
-                        self.radio_button2.setChecked(True)
-
-                    progress.setValue(progress.value() + 10)
-
-                    # last row data
-                    last_row = data['last_row']
-                    for i, j in enumerate((1, 2, 8, 10, 11)):
-                        self.last_row.itemAtPosition(0, j).widget().setText(last_row[i])
-
-                    progress.setValue(progress.value() + 10)
-
-                    # table data
-                    rows_data = data['rows']
-                    rows = self.get_main_rows()
-                    for i in range(num_rows):
-                        for j, k in enumerate((1, 2, 10, 11)):
-                            rows[i].itemAtPosition(0, k).widget().setText(rows_data[i][j])
-
-                    progress.setValue(progress.value() + 20)
-
-                    # deflector data
-                    if data.get('deflector', False):
-                        self.deflector.itemAtPosition(0, 1).widget().setText(data['deflector'][0])
-                        self.deflector.itemAtPosition(2, 1).widget().setText(data['deflector'][1])
-                        self.tab_widget.setTabVisible(1, True)
-                        self.cap_type.setCurrentIndex(4)
-                    # сap data
-                    else:
-                        self.tab_widget.setTabVisible(1, False)
-                        if data.get('cap_0', False):
-                            self.cap_type.setCurrentText(CONSTANTS.CAP.TYPES[1])
-                        if data.get('cap_1', False):
-                            self.cap_type.setCurrentText(data['cap_1'][0])
-                            self.channel_cap_grid.itemAtPosition(0, 2).widget().setText(data['cap_1'][1])
-                            self.relations.setCurrentText(data['cap_1'][2])
-
-                    progress.setValue(progress.value() + 10)
+                self._load_data(data)
 
                 self.current_file_path = file_name
                 self.setWindowTitle(f'{self.app_title} | {file_name}')
-                progress.close()
                 self.add_recent_file(file_name)
             except FileNotFoundError:
                 QMessageBox.critical(self, 'Ошибка', 'Такого файла не существует или он был перемещен')
@@ -2888,11 +3722,104 @@ class MainWindow(QMainWindow):
                 self.update_recent_files_menu()
             except Exception as e:
                 QMessageBox.critical(self, 'Ошибка', f'Не удалось открыть файл:\n{e}')
-                progress.close()
         else:
             QMessageBox.critical(self, 'Ошибка', 'Что то пошло не так...')
 
 
+    def _load_data(self, data) -> None:
+        progress = QProgressDialog('Импорт данных', None, 0, 100, self)
+        progress.setWindowTitle('Заполнение данных...')
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+        progress.setMaximum(100)
+        progress.show()
+        try:
+            # prepare main table
+            num_rows = len(data['rows'])
+            self.remove_all_main_rows()
+            self.clean_all_input_data()
+            self.zones = set(data.get('zones', ()))
+
+            self.main_box.addWidget(self.create_last_row())
+            for i in range(num_rows):
+                self.main_box.insertWidget(2, self.create_row())
+            self.last_row.itemAtPosition(0, 0).widget().setText(self.get_sum_all_rows_str())
+            self.change_dimensions_cells_in_table()
+
+            progress.setValue(progress.value() + 20)
+
+            # init data
+            init_data = data['init_data']
+            self.temperature_widget.setText(init_data[0])
+            self.surface_widget.setText(init_data[1])
+            self.floor_height_widget.setText(init_data[2])
+            self.channel_height_widget.setText(init_data[3])
+            self.klapan_input.setText(init_data[4])
+            self.klapan_widget.setCurrentText(init_data[5])
+
+            progress.setValue(progress.value() + 10)
+
+            # sputnik data
+            self.klapan_flow.setText(data['sputnik_data'][0])
+            one_side = data['sputnik_data'][1]['one_side']
+            for i, j in enumerate((1, 2, 3, 4, 11)):
+                self.sputnik.itemAtPosition(2, j).widget().setText(one_side[i])
+
+            progress.setValue(progress.value() + 10)
+
+            two_side = data['sputnik_data'][2]['two_side']
+            for i, j in enumerate((1, 2, 11)):
+                self.sputnik.itemAtPosition(4, j).widget().setText(two_side[i])
+
+            progress.setValue(progress.value() + 10)
+
+            if data['sputnik_data'][3]['is_checked'] == 1:
+                self.radio_button1.setChecked(True)
+            else:
+                self.radio_button2.setChecked(True)
+
+            progress.setValue(progress.value() + 10)
+
+            # last row data
+            last_row = data['last_row']
+            for i, j in enumerate((1, 2, 8, 10, 11)):
+                self.last_row.itemAtPosition(0, j).widget().setText(last_row[i])
+
+            progress.setValue(progress.value() + 10)
+
+            # table data
+            rows_data = data['rows']
+            rows = self.get_main_rows()
+            for i in range(num_rows):
+                for j, k in enumerate((1, 2, 10, 11)):
+                    rows[i].itemAtPosition(0, k).widget().setText(rows_data[i][j])
+
+            progress.setValue(progress.value() + 20)
+
+            # deflector data
+            if data.get('deflector', False):
+                self.deflector.itemAtPosition(0, 1).widget().setText(data['deflector'][0])
+                self.deflector.itemAtPosition(2, 1).widget().setText(data['deflector'][1])
+                self.tab_widget.setTabVisible(1, True)
+                self.cap_type.setCurrentIndex(4)
+            # сap data
+            else:
+                self.tab_widget.setTabVisible(1, False)
+                if data.get('cap_0', False):
+                    self.cap_type.setCurrentText(CONSTANTS.CAP.TYPES[1])
+                if data.get('cap_1', False):
+                    self.cap_type.setCurrentText(data['cap_1'][0])
+                    # older files kept the text of the 'h' label in place of the height
+                    h = data['cap_1'][1]
+                    self.input_h.setText(h if number(h) is not None else '')
+                    self.relations.setCurrentText(data['cap_1'][2])
+
+            progress.setValue(progress.value() + 10)
+        finally:
+            progress.close()
+
+
     def open_recent_file(self, file_path) -> None:
         self._open_file(file_path)
 
@@ -2971,36 +3898,18 @@ class MainWindow(QMainWindow):
             if reply == QMessageBox.No:
                 event.accept()
             else:
-                self.save
+                self.save()
                 event.accept()
+        self.stop_export()
+        self.stop_library()
+        self.stop_journal()
         super().closeEvent(event)
 
 
-def set_column_width(column, width) -> None:
-    column.width = Mm(width)
-    for cell in column.cells:
-        cell.width = Mm(width)
-
-
-def set_row_height(row, height) -> None:
-    row.height = Mm(height)
-    for cell in row.cells:
-        cell.height = Mm(height)
-
-
-def set_row_text_bold(row) -> None:
-    for cell in row.cells:
-        cell.bold = True
-
-
-def delete_paragraph(paragraph) -> None:
-    p = paragraph._element
-    p.getparent().remove(p)
-    p._p = p._element = None
-
-
 if __name__ == '__main__':
     import sys
+    # the design search runs in worker processes, a frozen build starts them through this executable
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setFont(QFont('Consolas', 10))
     app.setStyleSheet('QMessageBox { messagebox-text-interaction-flags: 5; font-size: 13px; }')
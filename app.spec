@@ -8,7 +8,7 @@ a = Analysis(
     ['app.py'],
     pathex=[],
     binaries=[],
-    datas=[('app.ico', '.')],
+    datas=[('app.ico', '.'), ('report_template.docx', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -13,6 +13,7 @@ a = Analysis(
         ('app.ico', '.'),
         ('natural_air_system_manual.pdf', '.'),
         ('icons/*.png', 'icons'),
+        ('report_template.docx', '.'),
     ],
     excludes=['tests'],
     hiddenimports=[],
@@ -1,8 +1,12 @@
+from airsystem import reference
+
+
 class CONSTANTS:
     APP_TITLE = 'Расчет естественной вентиляции'
     TAB1_TITLE = "Основной расчёт"
     TAB2_TITLE = "Расчёт дефлектора"
-    ACCELERATION_OF_GRAVITY = 9.81
+    TAB3_TITLE = "Предпросмотр отчёта"
+    ACCELERATION_OF_GRAVITY = reference.ACCELERATION_OF_GRAVITY
     MENU = (
         'Файл',
         'Руководство',
@@ -64,62 +68,7 @@ class CONSTANTS:
             ('Высота шахты, Hш', 'м'),
         )
         KLAPAN_LABEL = 'Приточный клапан'
-        KLAPAN_ITEMS = {
-                'Выбрать': '',
-                # 1
-                'КИВ-125 (КПВ-125)': 36,
-                # 3
-                'Air-Box Comfort': 31,
-                'Air-Box Comfort\nс козырьком': 42,
-                'Air-Box Comfort S': 41,
-                'Air-Box Comfort Eco': 26,
-                # 8
-                'Norvind pro': 32,
-                'Norvind optima': 13,
-                'Norvind classic': 16,
-                'Norvind city': 30,
-                'Norvind lite': 26,
-                # 14
-                'Aereco EHT² 5-40': 40,
-                'Aereco EHT² 11-40': 40,
-                'Aereco EHT² 6-30': 30,
-                'Aereco EFT² 24': 24,
-                'Aereco EFT² 40': 40,
-                'Aereco EFTO² 40': 40,
-                # 21
-                'Aereco EHT 5-40': 40,
-                'Aereco EHT 11-40': 40,
-                'Aereco EHT 11-40': 40,
-                'Aereco EFT 40': 40,
-                # 25
-                'Aereco EHA² 5-35': 35,
-                'Aereco EHA² 11-35': 35,
-                'Aereco EHA² 17-35': 35,
-                # 29
-                'Aereco EMM² 5-35': 35,
-                'Aereco EMM² 11-35': 35,
-                'Aereco EMM² 24': 24,
-                'Aereco EMM² 35': 35,
-                'Aereco EMM² 5-35\nс проставкой': 45,
-                'Aereco EMM² 11-35\nс проставкой': 45,
-                'Aereco EMM² 24\nс проставкой': 36,
-                'Aereco EMM² 35\nс проставкой': 45,
-                # 38
-                'Aereco EAH² 5-35': 35,
-                'Aereco EAH² 11-35': 35,
-                'Aereco EAH² 24': 24,
-                'Aereco EAH² 35': 35,
-                'Aereco EAH² 5-35\nс проставкой': 50,
-                'Aereco EAH² 11-35\nс проставкой': 50,
-                'Aereco EAH² 24\nс проставкой': 38,
-                'Aereco EAH² 35\nс проставкой': 50,
-                # 47
-                'Aereco EMM 5-35': 35,
-                'Aereco EMM 11-35': 35,
-                'Aereco EMF 35': 35,
-                # 51
-                'Другой': '--',
-            }
+        KLAPAN_ITEMS = reference.KLAPAN_ITEMS
         KLAPAN_INPUT_LABEL_1 = 'Расход воздуха через клапан при перепаде\nдавления 10 Па'
         KLAPAN_INPUT_TOOLTIP = 'Активируется при выборе\nвоздушного клапана <Другой>'
         SURFACE_INPUT_TOOLTIP = '''<html>
@@ -144,46 +93,13 @@ class CONSTANTS:
         NAME = 'cap'
         LABEL_1 = 'Тип оголовка шахты:'
         LINE_HEIGHT = 30
-        TYPES = (
-            'Выбрать',
-            'Без оголовка',
-            'Зонт',
-            'Плоский экран',
-            'Дефлектор',
-        )
+        TYPES = reference.CAP_TYPES
         TYPES_IMG = (
             'icons/zont.png',
             'icons/plate.png',
         )
-        RELATIONS = {
-            'Зонт': {
-                'Выбрать': '',
-                'h/Do: ζ': '',
-                '0.10: 4.00': 4.00,
-                '0.20: 2.30': 2.30,
-                '0.25: 1.90': 1.90,
-                '0.30: 1.60': 1.60,
-                '0.35: 1.40': 1.40,
-                '0.40: 1.30': 1.30,
-                '0.50: 1.15': 1.15,
-                '0.60: 1.10': 1.10,
-                '0.80: 1.00': 1.00,
-                '1.00: 1.00': 1.00,
-            },
-            'Плоский экран': {
-                'Выбрать': '',
-                'h/Do: ζ': '',
-                '0.25: 3.40': 3.40,
-                '0.30: 2.60': 2.60,
-                '0.35: 2.10': 2.10,
-                '0.40: 1.70': 1.70,
-                '0.50: 1.40': 1.40,
-                '0.60: 1.20': 1.20,
-                '0.80: 1.10': 1.10,
-                '1.00: 1.00': 1.00,
-            }
-        }
-        FACT_RELATION_TOOLTIP = 'Фактическое соотношение'
+        RELATIONS = reference.CAP_RELATIONS
+        FACT_RELATION_TOOLTIP = 'Фактическое соотношение, по нему ζ интерполируется между строками таблицы'
         PRESSURE_TOOLTIP = 'Потери давления на оголовке шахты'
         INPUT_h_TOOLTIP = '0...2 м'
 
@@ -289,27 +205,7 @@ class CONSTANTS:
         }
 
 
-    class REFERENCE_DATA:
-        class M:
-            X = [100, 150, 200, 250, 300, 350, 400, 450, 500, 550, 600, 650, 700, 750, 800, 900, 1000, 1500]  # 18
-            Y = [100, 200, 300, 400, 500, 600, 700, 800, 900, 1000, 1500]  # 11
-            line_1 = [1.13,1.15,1.2,1.25,1.3,1.35,1.4,1.45,1.5,1.55,1.6,1.65,1.7,1.75,1.8,1,1,1]
-            line_2 = [1.2,1.145,1.13,1.145,1.16,1.18,1.2,1.23,1.25,1.27,1.3,1.33,1.36,1.39,1.41,1.46,1.51,1.75]
-            line_3 = [1.3,1.2,1.16,1.14,1.13,1.14,1.148,1.165,1.175,1.195,1.21,1.22,1.245,1.26,1.275,1.32,1.355,1.54]
-            line_4 = [1.4,1.265,1.2,1.17,1.148,1.137,1.13,1.137,1.145,1.149,1.16,1.165,1.17,1.185,1.2,1.225,1.25,1.38]
-            line_5 = [1.5,1.345,1.25,1.205,1.175,1.1505,1.145,1.135,1.13,1.135,1.14,1.145,1.15,1.155,1.165,1.18,1.2,1.3]
-            line_6 = [1.6,1.405,1.3,1.25,1.21,1.18,1.16,1.148,1.14,1.135,1.13,1.135,1.138,1.144,1.148,1.155,1.17,1.25]
-            line_7 = [1.7,1.48,1.36,1.29,1.245,1.21,1.17,1.16,1.15,1.145,1.138,1.135,1.13,1.132,1.138,1.145,1.15,1.22]
-            line_8 = [1.8,1.55,1.41,1.33,1.275,1.24,1.2,1.18,1.165,1.15,1.148,1.141,1.138,1.138,1.13,1.138,1.146,1.2]
-            line_9 = [1,1.6,1.46,1.38,1.32,1.27,1.225,1.2,1.18,1.17,1.155,1.149,1.145,1.147,1.138,1.13,1.137,1.17]
-            line_10 = [1,1.68,1.51,1.42,1.355,1.3,1.25,1.225,1.2,1.18,1.17,1.16,1.15,1.146,1.146,1.137,1.13,1.155]
-            line_11 = [1,1,1.75,1.62,1.54,1.46,1.38,1.345,1.3,1.275,1.25,1.23,1.22,1.2,1.2,1.17,1.155,1.13]
-            TABLE = [line_1, line_2, line_3, line_4, line_5, line_6, line_7, line_8, line_9, line_10, line_11]
-
-
-        class DEFLECTOR_PRESSURE_RELATION:
-            X = [0, 0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5]
-            TABLE = [0.55, 0.48, 0.43, 0.38, 0.35, 0.32, 0.28, 0.24, 0.21, 0.16, 0.1]
+    REFERENCE_DATA = reference.REFERENCE_DATA
 
 
     class DEFLECTOR:
@@ -326,24 +222,235 @@ class CONSTANTS:
             'Отношение Pд / Pв',
             'Разрежение в патрубке дефлектора Pд [Па]',
         )
-        DIAMETERS = {
-            0.007854: '100',
-            0.012272: '125',
-            0.020106: '160',
-            0.031416: '200',
-            0.049087: '250',
-            0.077931: '315',
-            0.125664: '400',
-            0.19635: '500',
-            0.311725: '710',
-            0.395919: '800',
+        DIAMETERS = reference.DEFLECTOR_DIAMETERS
+
+
+    class RECOVERY:
+        DIR = ('akudja.technology', 'natural-air-system', 'recovery')
+        DEBOUNCE = 2_000  # milliseconds
+        COMPACT_RECORDS = 50
+        COMPACT_INTERVAL = 300  # seconds
+        TITLE = 'Восстановление расчёта'
+        QUESTION = '''<html>
+            <center>
+                Предыдущий сеанс работы был завершён аварийно.<br>
+                Восстановить несохранённый расчёт?<br>
+                <font color="grey">{}</font>
+            </center>
+        </html>
+        '''
+        UNTITLED = 'Без названия'
+
+
+    class LIBRARY:
+        DIR = ('akudja.technology', 'natural-air-system')
+        DATABASE = 'library.sqlite3'
+        SCAN_INTERVAL = 10  # seconds
+        REFRESH = 1_000  # ms
+        TITLE = 'Библиотека проектов'
+        ICON = './icons/open.png'
+        SHORTCUT = 'Ctrl+L'
+        CHOOSE_DIR = 'Каталог...'
+        NO_DIR = 'Каталог не выбран'
+        ANY = 'Любой'
+        KLAPAN_HINT = 'Клапан, например Air-Box'
+        DRAFT = (
+            'Тяга: любая',
+            'Есть этажи без тяги',
+            'Нет тяги на верхнем этаже',
+            'Тяга на всех этажах',
+        )
+        HEADERS = (
+            'Файл',
+            'Этажей',
+            'Hш, м',
+            'tв, °C',
+            'Клапан',
+            'Оголовок',
+            'Сечение, мм',
+            'Мин. запас, Па',
+            'Без тяги',
+        )
+        STATUS = 'В библиотеке: {}, найдено: {}'
+
+
+    class SIZING:
+        TITLE = 'Подбор сечения основного канала'
+        BUTTON = 'Подобрать\nсечение'
+        BEST = 'Наименьшее сечение с тягой на всех этажах (проверено {} сечений):'
+        NONE = 'Ни одно из {} сечений не даёт тягу на всех этажах, ближайшие варианты:'
+        NO_FLOORS = 'Сначала добавьте этажи основного канала'
+        SPUTNIK_TITLE = 'Подбор сечения канала-спутника'
+        SPUTNIK_BUTTON = 'Подобрать'
+        NO_TWO_SIDE_FLOW = 'Для двухстороннего блока укажите расход на участке 1*-2*'
+        APPLY = 'Применить'
+        HEADERS = (
+            'Сечение, мм',
+            'F, м2',
+            'v, м/с',
+            'Мин. запас, Па',
+            'Без тяги',
+        )
+
+
+    class SUGGEST:
+        DEBOUNCE = 300  # ms
+        ITEM = '{:>9}  v {:>5} м/с  R {:>6} Па/м  запас {:>8} Па'
+        FAILING = '  без тяги: {}'
+
+
+    class ZONING:
+        TITLE = 'Участки основного канала с разными сечениями'
+        BUTTON = 'Участки\nканала'
+        BEST = 'Наименьшая площадь стенок канала с тягой на всех этажах (сечений в каталоге: {}):'
+        NONE = 'Ни одно разбиение по {} сечениям не даёт тягу на всех этажах'
+        NO_HEIGHTS = 'Укажите высоту этажей'
+        RUNNING = 'Подбор участков...'
+        HEADERS = (
+            'Участков',
+            'Стенки, м2',
+            'Мин. запас, Па',
+            'Этажи: сечение, мм',
+        )
+
+
+    class SEARCH:
+        TITLE = 'Поиск вариантов: площадь сечений и запас давления'
+        BUTTON = 'Поиск\nвариантов'
+        START = 'Рассчитать'
+        SAMPLES = 'Вариантов не более '
+        HINT = 'Оголовок × клапан × сечение канала × сечение спутника; двойной щелчок — применить вариант'
+        STATUS = 'Вариантов: {}, рассчитано: {}, с тягой на всех этажах: {}, на фронте Парето: {}'
+        HEADERS = (
+            'F, м2',
+            'Мин. запас, Па',
+            'Без тяги',
+            'Оголовок',
+            'Клапан',
+            'Канал, мм',
+            'Спутник, мм',
+        )
+
+
+    class WHAT_IF:
+        TITLE = 'Что если: модель шахты'
+        BUTTON = 'Что\nесли'
+        NO_INPUTS = 'Укажите tв, сечение канала, Hш и расход клапана'
+        UNDEFINED = 'ΔP или Ррасп части этажей не определены при tв, a×b, Hш или Lкл в пределах модели, проверьте исходные данные'
+        MODEL = 'Модель по {} точкам: ΔP ≤ {:.3f} Па, Ррасп ≤ {:.3f} Па, тяга совпадает в {:.1%}; расчёт {:.0f} мкс'
+        EXACT = 'Вне области модели — точный расчёт, {:.0f} мкс'
+        INACCURATE = 'Модель неточна (ΔP ≤ {:.3f} Па, Ррасп ≤ {:.3f} Па, тяга совпадает в {:.1%}) — точный расчёт, {:.0f} мкс'
+        # above these errors on the check points the model is not used
+        MAX_ERROR = 0.5
+        MIN_AGREEMENT = 0.98
+        INPUTS = {
+            'temperature': 'tв, °C',
+            'a': 'a, мм',
+            'b': 'b, мм',
+            'shaft_height': 'Hш, м',
+            'klapan_flow': 'Lкл, м3/ч',
+        }
+        # the sliders go this share of the domain beyond it, there the exact calculation is used
+        OUTSIDE = 0.25
+        STEPS = 400
+        HEADERS = (
+            'Этаж',
+            'ΔP, Па',
+            'Ррасп, Па',
+            'Запас, Па',
+            'Тяга',
+        )
+        DRAFT = ('нет', 'есть')
+
+
+    class GOAL_SEEK:
+        TITLE = 'Подбор значения исходных данных по запасу давления'
+        BUTTON = 'Подбор\nзначения'
+        INPUTS = {
+            'temperature': 'tв, °C',
+            'surface': 'Kэ, мм',
+            'floor_height': 'hэ, м',
+            'shaft_height': 'Hш, м',
+            'klapan_capacity': 'Lкл другого клапана, м3/ч',
+            'klapan_flow': 'Lкл, м3/ч',
+            'one_side_flow': 'L спутника 1-2, м3/ч',
+            'one_side_length': 'l спутника 1-2, м',
+            'one_side_a': 'a спутника, мм',
+            'one_side_b': 'b спутника, мм',
+            'one_side_kms': 'Σζ спутника 1-2',
+            'two_side_flow': 'L спутника 1*-2*, м3/ч',
+            'two_side_length': 'l спутника 1*-2*, м',
+            'two_side_kms': 'Σζ спутника 1*-2*',
         }
+        TARGET = 'Запас на худшем этаже '
+        LOW = 'от '
+        HIGH = 'до '
+        START = 'Найти'
+        VALUE = '{} = {}: запас {:.3f} Па, этажей без тяги: {}; проходов {}, расчётов {}'
+        NONE = 'На {:g}…{:g} запас {:g} Па не достигается'
+        EVERYWHERE = 'Запас больше {2:g} Па при всех значениях {0:g}…{1:g}, где расчёт определён'
+        BEST = '; наибольший запас {:.3f} Па при {}'
+        HEADERS = (
+            'Этаж',
+            'ΔP, Па',
+            'Ррасп, Па',
+            'Запас, Па',
+            'Тяга',
+        )
+        DRAFT = ('нет', 'есть')
+
+
+    class CAP_HEIGHT:
+        TITLE = 'Подбор высоты h оголовка'
+        BUTTON = 'Подобрать'
+        MAX_HEIGHT = 'h не более '
+        TOLERANCE = 'Допуск к наименьшим потерям '
+        BEST = 'Наименьшие потери на оголовке: h = {:.2f} м'
+        DRAFT = 'тяга на всех этажах с h = {:.2f} м'
+        NO_DRAFT = 'ни одна высота не даёт тягу на всех этажах'
+        NONE = 'Потери на оголовке не определены ни при одной высоте h'
+        HINT = 'Двойной щелчок — выбрать высоту'
+        HEADERS = (
+            'h, м',
+            'h/Do',
+            'ζ',
+            'Pоголовка, Па',
+            'Мин. запас, Па',
+            'Без тяги',
+        )
+
+
+    class VALVES:
+        TITLE = 'Сравнение приточных клапанов'
+        BUTTON = 'Сравнить'
+        HINT = 'Двойной щелчок — выбрать клапан'
+        HEADERS = (
+            'Клапан',
+            'Lкл, м3/ч',
+            'Pкл, Па',
+            'Мин. запас, Па',
+            'Этажей с тягой',
+        )
+
+
+    class PREVIEW:
+        DEBOUNCE = 300  # ms
+        STYLE = 'body { font-family: "Times New Roman"; font-size: 12pt; } td { padding: 3px; }'
 
 
     class EXPORT:
         TITLE = 'Результаты расчёта естественной вентиляции'
         FORMULA = 'Расчётная формула:'
         FORMULA_IMG = './icons/formula.png'
+        TEMPLATE = './report_template.docx'
+        TABLES_TITLE = 'Экспорт таблиц (CSV, NPZ, Parquet)'
+        TABLES_SHORTCUT = 'Ctrl+Shift+E'
+        TABLES_FILTERS = {
+            'csv': 'CSV (*.csv)',
+            'npz': 'NumPy (*.npz)',
+            'parquet': 'Parquet (*.parquet)',
+        }
+        TABLES_DONE = 'Таблицы сохранены:\n{}'
 
 
 
@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import queue
+import shutil
+import threading
+
+
+SNAPSHOT_FILE = 'snapshot.json'
+JOURNAL_FILE = 'journal.jsonl'
+LOCK_FILE = 'session.lock'
+
+
+def write_atomic(path, data) -> None:
+    # temp file + fsync + rename: the target is either the old or the new version, never a torn one
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = os.path.join(directory, f'.{os.path.basename(path)}.{os.getpid()}.tmp')
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def diff_state(old, new, path=()) -> tuple:
+    changed, deleted = [], []
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in new:
+            if key in old:
+                c, d = diff_state(old[key], new[key], path + (key,))
+                changed.extend(c)
+                deleted.extend(d)
+            else:
+                changed.append((list(path + (key,)), new[key]))
+        for key in old:
+            if key not in new:
+                deleted.append(list(path + (key,)))
+    elif isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        for i in range(len(new)):
+            c, d = diff_state(old[i], new[i], path + (i,))
+            changed.extend(c)
+            deleted.extend(d)
+    elif old != new:
+        changed.append((list(path), new))
+    return changed, deleted
+
+
+def apply_changes(state, changed, deleted) -> object:
+    for path in deleted:
+        target = state
+        for key in path[:-1]:
+            target = target[key]
+        target.pop(path[-1], None)
+    for path, value in changed:
+        if not path:
+            state = value
+            continue
+        target = state
+        for key in path[:-1]:
+            target = target[key]
+        target[path[-1]] = value
+    return state
+
+
+def read_session(session_dir) -> object:
+    state, last_seq = {}, 0
+    snapshot_path = os.path.join(session_dir, SNAPSHOT_FILE)
+    if os.path.exists(snapshot_path):
+        try:
+            with open(snapshot_path, encoding='utf-8') as file:
+                snapshot = json.load(file)
+            state, last_seq = snapshot['state'], snapshot['seq']
+        except (OSError, ValueError, KeyError):
+            state, last_seq = {}, 0
+
+    journal_path = os.path.join(session_dir, JOURNAL_FILE)
+    if os.path.exists(journal_path):
+        with open(journal_path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # torn tail of a killed process
+                    break
+                # records older than the snapshot survive a crash between compaction and truncation
+                if record['seq'] > last_seq:
+                    state = apply_changes(state, record['set'], record['del'])
+                    last_seq = record['seq']
+    return state or None
+
+
+def find_sessions(recovery_dir) -> list:
+    if not os.path.isdir(recovery_dir):
+        return []
+    sessions = []
+    for name in sorted(os.listdir(recovery_dir)):
+        path = os.path.join(recovery_dir, name)
+        if os.path.isdir(path):
+            sessions.append(path)
+    return sessions
+
+
+def remove_session(session_dir) -> None:
+    shutil.rmtree(session_dir, ignore_errors=True)
+
+
+class RecoveryJournal:
+    def __init__(self, recovery_dir, compact_records=50, compact_interval=300) -> None:
+        self.session_dir = os.path.join(recovery_dir, f'{time.strftime("%Y%m%d_%H%M%S")}_{os.getpid()}')
+        os.makedirs(self.session_dir, exist_ok=True)
+        self.lock_path = os.path.join(self.session_dir, LOCK_FILE)
+        self.compact_records = compact_records
+        self.compact_interval = compact_interval
+
+        self._queue = queue.Queue()
+        self._state = {}
+        self._seq = 0
+        self._records_since_snapshot = 0
+        self._last_snapshot = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name='recovery-journal', daemon=True)
+        self._thread.start()
+
+
+    def record(self, data, file_path) -> None:
+        self._queue.put({'file': file_path, 'data': data})
+
+
+    def close(self, discard=True) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        if discard:
+            remove_session(self.session_dir)
+
+
+    def _run(self) -> None:
+        while True:
+            try:
+                state = self._queue.get(timeout=self.compact_interval)
+            except queue.Empty:
+                state = False
+            if state is None:
+                break
+            # only the latest of several queued states matters
+            while state is not False:
+                try:
+                    newer = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if newer is None:
+                    self._write(state)
+                    return
+                state = newer
+            try:
+                if state is not False:
+                    self._write(state)
+                if self._records_since_snapshot and (
+                    self._records_since_snapshot >= self.compact_records
+                    or time.monotonic() - self._last_snapshot >= self.compact_interval
+                ):
+                    self._compact()
+            except OSError:
+                # the journal is best effort, a full disk must not take the calculation down
+                pass
+
+
+    def _write(self, state) -> None:
+        changed, deleted = diff_state(self._state, state)
+        if not any([changed, deleted]):
+            return
+        self._seq += 1
+        record = {'seq': self._seq, 'set': changed, 'del': deleted}
+        with open(os.path.join(self.session_dir, JOURNAL_FILE), 'a', encoding='utf-8') as file:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        self._state = state
+        self._records_since_snapshot += 1
+
+
+    def _compact(self) -> None:
+        write_atomic(os.path.join(self.session_dir, SNAPSHOT_FILE), {'seq': self._seq, 'state': self._state})
+        with open(os.path.join(self.session_dir, JOURNAL_FILE), 'w', encoding='utf-8') as file:
+            file.flush()
+            os.fsync(file.fileno())
+        self._records_since_snapshot = 0
+        self._last_snapshot = time.monotonic()
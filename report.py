@@ -0,0 +1,464 @@
+import os
+import threading
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+import docx
+from docx.enum.section import WD_ORIENT
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.shared import Cm, Emu, Mm, Pt
+from docx.table import Table as DocxTable
+
+from constants import CONSTANTS
+
+
+basedir = os.path.dirname(__file__)
+
+ROW_HEIGHT = 7  # mm
+# the export reports progress and checks for cancellation after this many rows of a table
+PROGRESS_ROWS = 20
+TBL_LOOK = (
+    '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" '
+    'w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/>'
+)
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class Paragraph:
+    def __init__(self, text, center=False, size=None) -> None:
+        self.text = text
+        self.center = center
+        self.size = size
+
+
+class Cell:
+    def __init__(self) -> None:
+        # a cell that was never written keeps the bare <w:p/> python-docx creates
+        self.paragraphs = []
+        self.center = False
+        self.span = 1
+        self.merge = None
+        self.covered = False
+        self.picture = None
+
+
+class Table:
+    def __init__(self, title, rows, cols, blank_after=True) -> None:
+        self.title = title
+        self.blank_after = blank_after
+        self.cells = [[Cell() for _ in range(cols)] for _ in range(rows)]
+        self.widths = [None] * cols
+        self.heights = [None] * rows
+        self.align_left = False
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.cells)
+
+    @property
+    def n_cols(self) -> int:
+        return len(self.widths)
+
+    def write(self, row, col, text, center=False, size=None) -> None:
+        cell = self.cells[row][col]
+        cell.paragraphs = [Paragraph(text, center, size)]
+        cell.center = center
+
+    def write_row(self, row, texts, center=False, size=None, start=0) -> None:
+        for col, text in enumerate(texts, start):
+            self.write(row, col, text, center, size)
+
+    def write_column(self, col, texts, center=False, size=None) -> None:
+        for row, text in enumerate(texts):
+            self.write(row, col, text, center, size)
+
+    def set_heights(self, height, start=0) -> None:
+        for row in range(start, self.n_rows):
+            self.heights[row] = height
+
+    def merge_right(self, row, col_from, col_to) -> None:
+        # same content handling as python-docx merge(): non-empty cells move into the first one
+        first = self.cells[row][col_from]
+        for col in range(col_from + 1, col_to + 1):
+            cell = self.cells[row][col]
+            first.paragraphs.extend(cell.paragraphs)
+            cell.paragraphs = []
+            cell.covered = True
+        first.span = col_to - col_from + 1
+
+    def merge_down(self, col, row_from, row_to) -> None:
+        if row_to <= row_from:
+            return
+        top = self.cells[row_from][col]
+        top.merge = 'restart'
+        for row in range(row_from + 1, row_to + 1):
+            cell = self.cells[row][col]
+            top.paragraphs.extend(cell.paragraphs)
+            cell.paragraphs = []
+            cell.merge = 'continue'
+
+
+class Figure:
+    def __init__(self, title, path, width, blank_after=True) -> None:
+        self.title = title
+        self.path = path
+        self.width = width  # cm
+        self.blank_after = blank_after
+
+
+FORMULA = Figure(CONSTANTS.EXPORT.FORMULA, os.path.join(basedir, CONSTANTS.EXPORT.FORMULA_IMG), 12)
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def create_template() -> docx.document.Document:
+    doc = docx.Document()
+
+    doc_style = doc.styles.add_style('DocStyle', 1)
+    doc_style.font.name = 'Times New Roman'
+    doc_style.font.size = Pt(12)
+    doc.styles['Normal'].base_style = doc_style
+
+    title_style = doc.styles.add_style('TitleStyle', 1)
+    title_style.font.name = 'Times New Roman'
+    title_style.font.size = Pt(12)
+    title_style.font.bold = True
+    title = doc.add_paragraph(CONSTANTS.EXPORT.TITLE, style='TitleStyle')
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    table_title = doc.styles.add_style('TableTitleStyle', 1)
+    table_title.font.name = 'Times New Roman'
+    table_title.font.size = Pt(12)
+    table_title.font.bold = True
+
+    header_style = doc.styles.add_style('HeaderStyle', 1)
+    header_style.font.bold = True
+
+    # setup fields
+    for section in doc.sections:
+        section.orientation = WD_ORIENT.LANDSCAPE
+        section.left_margin = Cm(2)
+        section.right_margin = Cm(1)
+        section.top_margin = Cm(1)
+        section.bottom_margin = Cm(1)
+        section.page_width = Mm(420)
+        section.page_height = Mm(297)
+
+    # the formula block is the same in every report, data tables are inserted around it
+    doc.add_paragraph(FORMULA.title, style='TableTitleStyle')
+    doc.add_paragraph().add_run().add_picture(FORMULA.path, width=Cm(FORMULA.width))
+    if FORMULA.blank_after:
+        doc.add_paragraph()
+    return doc
+
+
+def load_template() -> bytes:
+    global _template
+    with _template_lock:
+        if _template is None:
+            path = os.path.join(basedir, CONSTANTS.EXPORT.TEMPLATE)
+            if os.path.exists(path):
+                with open(path, 'rb') as file:
+                    _template = file.read()
+            else:
+                stream = BytesIO()
+                create_template().save(stream)
+                _template = stream.getvalue()
+    return _template
+
+
+def new_document() -> docx.document.Document:
+    # every export gets its own copy of the cached package
+    return docx.Document(BytesIO(load_template()))
+
+
+def build_report(data) -> list:
+    report = [
+        init_data_table(data['init_data']),
+        sputnik_table(data['sputnik_data']),
+        main_table(data['main_data']),
+        FORMULA,
+    ]
+    if data.get('cap_0'):
+        report.append(cap_table(data['cap_0']))
+    if data.get('cap_1'):
+        report.append(cap_relation_table(data['cap_1']))
+    if data.get('deflector_data'):
+        report.append(deflector_table(data['deflector_data']))
+    return report
+
+
+def init_data_table(init_data) -> Table:
+    table = Table(CONSTANTS.EXPORT.INIT_DATA.TITLE, 7, 3)
+    table.write_column(0, CONSTANTS.EXPORT.INIT_DATA.HEADER)
+    table.write_column(2, CONSTANTS.EXPORT.INIT_DATA.UNITS, center=True)
+    table.widths = [110, 90, 27]
+    table.set_heights(ROW_HEIGHT)
+    table.write_column(1, init_data[:7], center=True)
+    return table
+
+
+def sputnik_table(sputnik_data) -> Table:
+    n_rows = len(sputnik_data)
+    table = Table(CONSTANTS.EXPORT.SPUTNIK.TITLE, n_rows, 13)
+    table.write_row(0, sputnik_data['headers'][:13], center=True)
+    table.set_heights(ROW_HEIGHT, start=1)
+    for row in range(1, n_rows):
+        line = sputnik_data[f'line_{row}']
+        if row in (1, 3):
+            table.write_row(row, line[:13], center=True)
+        else:
+            table.write(row, 12, line, center=True)
+    for row in range(2, n_rows, 2):
+        table.merge_right(row, 0, 11)
+    table.widths = [25] * 13
+    return table
+
+
+def main_table(main_data) -> Table:
+    n_rows, n_cols = main_data['num_rows'], main_data['num_cols']
+    size = Pt(10)
+    table = Table(CONSTANTS.EXPORT.MAIN_TABLE.TITLE, n_rows, n_cols)
+    table.write_row(0, main_data['headers'][:n_cols], center=True, size=size)
+    table.set_heights(ROW_HEIGHT, start=1)
+    for row in range(1, n_rows):
+        table.write_row(row, main_data[f'line_{row - 1}'][:n_cols], center=True, size=size)
+    if n_cols == 22:
+        # deflector pressure is one value for the whole shaft
+        table.merge_down(6, 2, n_rows - 1)
+    table.widths[0] = 15
+    table.widths[1] = 15
+    table.widths[n_cols - 1] = 25
+    return table
+
+
+def cap_table(cap_data) -> Table:
+    table = Table(CONSTANTS.EXPORT.CAP.TITLE, 2, 2)
+    table.widths = [50, 20]
+    table.set_heights(ROW_HEIGHT)
+    table.write_column(0, CONSTANTS.EXPORT.CAP.HEADER_1)
+    table.write_column(1, cap_data[:2], center=True)
+    return table
+
+
+def cap_relation_table(cap_data) -> Table:
+    table = Table(CONSTANTS.EXPORT.CAP.TITLE, 5, 4, blank_after=False)
+    table.align_left = True
+    table.widths = [90, 37, 20, 25]
+    table.set_heights(ROW_HEIGHT)
+    table.write_column(0, CONSTANTS.EXPORT.CAP.HEADER_2)
+    table.write_column(2, CONSTANTS.EXPORT.CAP.UNITS_2, center=True)
+    relation, _, kms = cap_data[2].partition(':')
+    table.write_column(1, [cap_data[0], cap_data[1], relation, kms, cap_data[3]], center=True)
+    table.merge_down(3, 0, 4)
+    image = CONSTANTS.CAP.TYPES_IMG[0] if cap_data[0] == CONSTANTS.CAP.TYPES[2] else CONSTANTS.CAP.TYPES_IMG[1]
+    table.cells[0][3].paragraphs = []
+    table.cells[0][3].picture = (os.path.join(basedir, image), 3.5)
+    return table
+
+
+def deflector_table(deflector_data) -> Table:
+    table = Table(CONSTANTS.EXPORT.CAP.DEFLECTOR_TITLE, 9, 2, blank_after=False)
+    table.write_column(0, deflector_data[0][:9])
+    table.widths = [120, 27]
+    table.set_heights(ROW_HEIGHT)
+    table.write_column(1, deflector_data[1][:9], center=True)
+    return table
+
+
+def run_xml(text) -> str:
+    parts, chunk = [], []
+
+    def flush():
+        if chunk:
+            value = ''.join(chunk)
+            space = ' xml:space="preserve"' if len(value.strip()) < len(value) else ''
+            parts.append(f'<w:t{space}>{escape(value)}</w:t>')
+            chunk.clear()
+
+    for char in text:
+        if char == '\t':
+            flush()
+            parts.append('<w:tab/>')
+        elif char in '\r\n':
+            flush()
+            parts.append('<w:br/>')
+        else:
+            chunk.append(char)
+    flush()
+    return ''.join(parts)
+
+
+def paragraph_xml(paragraph) -> str:
+    ppr = '<w:pPr><w:jc w:val="center"/></w:pPr>' if paragraph.center else ''
+    rpr = f'<w:rPr><w:sz w:val="{int(paragraph.size.pt * 2)}"/></w:rPr>' if paragraph.size else ''
+    return f'<w:p>{ppr}<w:r>{rpr}{run_xml(paragraph.text)}</w:r></w:p>'
+
+
+def table_xml(table, block_width, progress=None) -> str:
+    default_width = Emu(block_width // table.n_cols).twips
+    widths = [Mm(w).twips if w else default_width for w in table.widths]
+
+    parts = [f'<w:tbl {nsdecls("w")}><w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:type="auto" w:w="0"/>']
+    if table.align_left:
+        parts.append('<w:jc w:val="left"/>')
+    parts.append(f'{TBL_LOOK}</w:tblPr><w:tblGrid>')
+    parts.extend(f'<w:gridCol w:w="{w}"/>' for w in widths)
+    parts.append('</w:tblGrid>')
+
+    for row, cells in enumerate(table.cells):
+        if progress and row and row % PROGRESS_ROWS == 0:
+            progress(row)
+        parts.append('<w:tr>')
+        if table.heights[row]:
+            parts.append(f'<w:trPr><w:trHeight w:val="{Mm(table.heights[row]).twips}"/></w:trPr>')
+        for col, cell in enumerate(cells):
+            if cell.covered:
+                continue
+            parts.append(f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{widths[col]}"/>')
+            if cell.span > 1:
+                parts.append(f'<w:gridSpan w:val="{cell.span}"/>')
+            if cell.merge == 'restart':
+                parts.append('<w:vMerge w:val="restart"/>')
+            elif cell.merge:
+                parts.append('<w:vMerge/>')
+            if cell.center:
+                parts.append('<w:vAlign w:val="center"/>')
+            parts.append('</w:tcPr>')
+            if cell.paragraphs:
+                parts.extend(paragraph_xml(p) for p in cell.paragraphs)
+            elif not cell.picture:
+                parts.append('<w:p/>')
+            parts.append('</w:tc>')
+        parts.append('</w:tr>')
+    parts.append('</w:tbl>')
+    return ''.join(parts)
+
+
+def mm_to_px(value) -> int:
+    return round(value * 96 / 25.4)
+
+
+def paragraph_html(paragraph) -> str:
+    text = escape(paragraph.text).replace('\t', ' ').replace('\r\n', '<br/>').replace('\n', '<br/>')
+    if paragraph.size:
+        text = f'<span style="font-size: {paragraph.size.pt:g}pt">{text}</span>'
+    return text
+
+
+def table_html(table) -> str:
+    parts = ['<table border="1" cellspacing="0" cellpadding="3" style="border-collapse: collapse">']
+    for row, cells in enumerate(table.cells):
+        parts.append('<tr>')
+        for col, cell in enumerate(cells):
+            if cell.covered or cell.merge == 'continue':
+                continue
+            attrs = ''
+            if table.widths[col]:
+                attrs += f' width="{mm_to_px(sum(table.widths[col:col + cell.span]))}"'
+            if cell.span > 1:
+                attrs += f' colspan="{cell.span}"'
+            if cell.merge == 'restart':
+                span = 1
+                while row + span < table.n_rows and table.cells[row + span][col].merge == 'continue':
+                    span += 1
+                attrs += f' rowspan="{span}"'
+            if cell.center:
+                attrs += ' align="center" valign="middle"'
+            content = '<br/>'.join(paragraph_html(p) for p in cell.paragraphs)
+            if cell.picture:
+                path, height = cell.picture
+                content += f'<img src="{escape(path)}" height="{mm_to_px(height * 10)}"/>'
+            parts.append(f'<td{attrs}>{content}</td>')
+        parts.append('</tr>')
+    parts.append('</table>')
+    return ''.join(parts)
+
+
+def section_html(item) -> str:
+    parts = [f'<p><b>{escape(item.title)}</b></p>']
+    if isinstance(item, Figure):
+        parts.append(f'<p><img src="{escape(item.path)}" width="{mm_to_px(item.width * 10)}"/></p>')
+    else:
+        parts.append(table_html(item))
+    if item.blank_after:
+        parts.append('<p></p>')
+    return ''.join(parts)
+
+
+def steps(item) -> int:
+    # a table is as much work as its rows, the main table of a tall shaft is most of the report
+    return item.n_rows if isinstance(item, Table) else 1
+
+
+def report_steps(report) -> int:
+    # the sections and the saving of the file
+    return sum(steps(item) for item in report) + 1
+
+
+def write_docx(doc, report, progress=None) -> None:
+    section = doc.sections[-1]
+    block_width = section.page_width - section.left_margin - section.right_margin
+    body = doc.element.body
+    total = report_steps(report)
+    # tables that precede the formula go above the block taken from the template
+    anchor = next(p._p for p in doc.paragraphs if p.text == FORMULA.title)
+    done = 0
+    for item in report:
+        if progress:
+            progress(done, total)
+        start, done = done, done + steps(item)
+        if item is FORMULA:
+            anchor = None
+            continue
+        elements = [doc.add_paragraph(item.title, style='TableTitleStyle')._p]
+        if isinstance(item, Figure):
+            picture = doc.add_paragraph()
+            picture.add_run().add_picture(item.path, width=Cm(item.width))
+            elements.append(picture._p)
+        else:
+            rows_done = (lambda row, start=start: progress(start + row, total)) if progress else None
+            tbl = parse_xml(table_xml(item, block_width, rows_done))
+            body._insert_tbl(tbl)
+            elements.append(tbl)
+            for row, cells in enumerate(item.cells):
+                for col, cell in enumerate(cells):
+                    if cell.picture:
+                        path, height = cell.picture
+                        docx_cell = DocxTable(tbl, doc._body).cell(row, col)
+                        docx_cell.add_paragraph().add_run().add_picture(path, height=Cm(height))
+        if item.blank_after:
+            elements.append(doc.add_paragraph()._p)
+        if anchor is not None:
+            for element in elements:
+                anchor.addprevious(element)
+
+
+def export_docx(data, path, progress=None) -> None:
+    # progress(done, total) may raise ExportCancelled, the target file is then left untouched
+    report = build_report(data)
+    doc = new_document()
+    write_docx(doc, report, progress)
+    total = report_steps(report)
+    if progress:
+        progress(total - 1, total)
+    tmp_path = os.path.join(os.path.dirname(path), f'.{os.path.basename(path)}.{os.getpid()}.tmp')
+    try:
+        doc.save(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    if progress:
+        progress(total, total)
+
+
+if __name__ == '__main__':
+    # regenerates the template shipped next to the application
+    create_template().save(os.path.join(basedir, CONSTANTS.EXPORT.TEMPLATE))